@@ -0,0 +1,212 @@
+"""
+Perceptual Analysis
+Lightness (CIELAB L*) profile and CIEDE2000 step sizes of colormaps, with
+flags for lightness reversals and uneven steps; vectorized over whole
+libraries so they can be audited in CI
+
+    python colormap_analysis.py specs/ build/*.cmap --max-unevenness 0.5 --monotonic
+"""
+
+import argparse
+import os
+import sys
+from collections import namedtuple
+
+import numpy as np
+
+from colormap_spaces import srgb_to_lab
+
+# Steps further than this fraction from the median ΔE are flagged as uneven
+UNEVEN_TOLERANCE = 0.5
+
+# L* drop per step against the overall direction that counts as a reversal
+# (small, since dense samples make real reversals tiny per step)
+REVERSAL_TOLERANCE = 1e-3
+
+Analysis = namedtuple('Analysis', 'lightness delta_e reversals uneven monotonic unevenness')
+Analysis.__doc__ = """Per-colormap analysis from analyze()
+
+lightness: L* of each sample; delta_e: CIEDE2000 between neighbors;
+reversals/uneven: boolean masks over the steps; monotonic: no reversals;
+unevenness: coefficient of variation of delta_e (0 is perfectly uniform).
+"""
+
+
+def ciede2000(lab1, lab2):
+    """CIEDE2000 color difference between broadcastable (..., 3) Lab arrays"""
+    lab1 = np.asarray(lab1, dtype=float)
+    lab2 = np.asarray(lab2, dtype=float)
+    L1, a1, b1 = lab1[..., 0], lab1[..., 1], lab1[..., 2]
+    L2, a2, b2 = lab2[..., 0], lab2[..., 1], lab2[..., 2]
+
+    c_bar7 = ((np.hypot(a1, b1) + np.hypot(a2, b2)) / 2) ** 7
+    g = 0.5 * (1 - np.sqrt(c_bar7 / (c_bar7 + 25.0 ** 7)))
+    a1p, a2p = (1 + g) * a1, (1 + g) * a2
+    c1p, c2p = np.hypot(a1p, b1), np.hypot(a2p, b2)
+    h1p = np.mod(np.arctan2(b1, a1p), 2 * np.pi)
+    h2p = np.mod(np.arctan2(b2, a2p), 2 * np.pi)
+    chroma_zero = c1p * c2p == 0
+
+    dlp = L2 - L1
+    dcp = c2p - c1p
+    dhp = h2p - h1p
+    dhp = np.where(dhp > np.pi, dhp - 2 * np.pi, np.where(dhp < -np.pi, dhp + 2 * np.pi, dhp))
+    dhp = np.where(chroma_zero, 0.0, dhp)
+    dHp = 2 * np.sqrt(c1p * c2p) * np.sin(dhp / 2)
+
+    lbp = (L1 + L2) / 2
+    cbp = (c1p + c2p) / 2
+    hsum = h1p + h2p
+    hbp = np.where(np.abs(h1p - h2p) <= np.pi, hsum / 2,
+                   np.where(hsum < 2 * np.pi, (hsum + 2 * np.pi) / 2, (hsum - 2 * np.pi) / 2))
+    hbp = np.where(chroma_zero, hsum, hbp)
+
+    t = (1 - 0.17 * np.cos(hbp - np.radians(30)) + 0.24 * np.cos(2 * hbp)
+         + 0.32 * np.cos(3 * hbp + np.radians(6)) - 0.20 * np.cos(4 * hbp - np.radians(63)))
+    d_theta = np.radians(30) * np.exp(-((np.degrees(hbp) - 275) / 25) ** 2)
+    cbp7 = cbp ** 7
+    r_c = 2 * np.sqrt(cbp7 / (cbp7 + 25.0 ** 7))
+    s_l = 1 + 0.015 * (lbp - 50) ** 2 / np.sqrt(20 + (lbp - 50) ** 2)
+    s_c = 1 + 0.045 * cbp
+    s_h = 1 + 0.015 * cbp * t
+    r_t = -np.sin(2 * d_theta) * r_c
+
+    dl, dc, dh = dlp / s_l, dcp / s_c, dHp / s_h
+    return np.sqrt(np.maximum(dl ** 2 + dc ** 2 + dh ** 2 + r_t * dc * dh, 0.0))
+
+
+def _scores(samples, uneven_tolerance, reversal_tolerance):
+    """Analysis arrays for (..., n, 3) sRGB samples, batched over leading axes"""
+    lab = srgb_to_lab(samples)
+    lightness = lab[..., 0]
+    delta_e = ciede2000(lab[..., :-1, :], lab[..., 1:, :])
+
+    # Reversals are steps against the overall lightness direction
+    direction = np.sign(lightness[..., -1:] - lightness[..., :1])
+    direction = np.where(direction == 0, 1.0, direction)
+    reversals = np.diff(lightness, axis=-1) * direction < -reversal_tolerance
+
+    median = np.median(delta_e, axis=-1, keepdims=True)
+    uneven = np.abs(delta_e - median) > uneven_tolerance * median
+    mean = delta_e.mean(axis=-1)
+    unevenness = np.divide(delta_e.std(axis=-1), mean,
+                           out=np.zeros_like(mean), where=mean > 0)
+    return lightness, delta_e, reversals, uneven, ~reversals.any(axis=-1), unevenness
+
+
+def analyze(samples, uneven_tolerance=UNEVEN_TOLERANCE,
+            reversal_tolerance=REVERSAL_TOLERANCE):
+    """Analysis of one colormap given as (n, 3) sRGB samples"""
+    samples = np.asarray(samples, dtype=float)
+    if samples.ndim != 2 or len(samples) < 2:
+        raise ValueError("Expected at least 2 samples shaped (n, 3)")
+    lightness, delta_e, reversals, uneven, monotonic, unevenness = _scores(
+        samples, uneven_tolerance, reversal_tolerance)
+    return Analysis(lightness, delta_e, reversals, uneven, bool(monotonic), float(unevenness))
+
+
+def analyze_colormap(cmap, n=256, **kwargs):
+    """analyze() on n cached samples of a Colormap"""
+    return analyze(cmap.sample(n), **kwargs)
+
+
+def score_batch(samples, uneven_tolerance=UNEVEN_TOLERANCE,
+                reversal_tolerance=REVERSAL_TOLERANCE):
+    """Scores for (m, n, 3) samples of m colormaps in one vectorized pass
+
+    Returns a structured array with fields monotonic, reversal_steps,
+    uneven_steps, unevenness, lightness_range and mean_delta_e.
+    """
+    samples = np.asarray(samples, dtype=float)
+    lightness, delta_e, reversals, uneven, monotonic, unevenness = _scores(
+        samples, uneven_tolerance, reversal_tolerance)
+    scores = np.empty(len(samples), dtype=[
+        ('monotonic', bool), ('reversal_steps', np.int32), ('uneven_steps', np.int32),
+        ('unevenness', float), ('lightness_range', float), ('mean_delta_e', float)])
+    scores['monotonic'] = monotonic
+    scores['reversal_steps'] = reversals.sum(axis=-1)
+    scores['uneven_steps'] = uneven.sum(axis=-1)
+    scores['unevenness'] = unevenness
+    scores['lightness_range'] = lightness.max(axis=-1) - lightness.min(axis=-1)
+    scores['mean_delta_e'] = delta_e.mean(axis=-1)
+    return scores
+
+
+def flagged_regions(mask):
+    """(start, stop) index ranges of the True runs in a 1D mask"""
+    edges = np.diff(np.concatenate([[0], np.asarray(mask, dtype=np.int8), [0]]))
+    return list(zip(np.flatnonzero(edges == 1).tolist(), np.flatnonzero(edges == -1).tolist()))
+
+
+def _load_any(filename):
+    """Colormap from a .cmap file or a CLI spec"""
+    if filename.endswith('.cmap'):
+        from colormap_engine import load_colormap
+        return load_colormap(filename)
+    from colormap_cli import load_spec
+    return load_spec(filename)
+
+
+def find_colormaps(paths):
+    """.cmap and spec files named directly or found under directories"""
+    from colormap_cli import SPEC_EXTENSIONS
+
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            for folder, _, names in os.walk(path):
+                files.extend(os.path.join(folder, name) for name in sorted(names)
+                             if name.lower().endswith(SPEC_EXTENSIONS + ('.cmap',)))
+        else:
+            files.append(path)
+    return sorted(set(files))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Score colormaps for perceptual uniformity")
+    parser.add_argument('paths', nargs='+', help=".cmap files, spec files or directories")
+    parser.add_argument('-n', '--samples', type=int, default=256, help="Samples per colormap")
+    parser.add_argument('--max-unevenness', type=float, default=None,
+                        help="Fail colormaps whose ΔE coefficient of variation exceeds this")
+    parser.add_argument('--monotonic', action='store_true',
+                        help="Fail colormaps whose lightness reverses direction")
+    parser.add_argument('--cvd', action='store_true',
+                        help="Also score each colormap as seen with color vision deficiencies")
+    args = parser.parse_args(argv)
+
+    names, samples, failed = [], [], 0
+    for filename in find_colormaps(args.paths):
+        try:
+            samples.append(_load_any(filename).sample(args.samples))
+        except (OSError, ValueError) as e:
+            print(f"error   {filename}: {e}")
+            failed += 1
+            continue
+        names.append(filename)
+    if not names:
+        return 1
+
+    samples = np.stack(samples)
+    views = [('', score_batch(samples))]
+    if args.cvd:
+        from colormap_cvd import DEFICIENCIES, simulate_all
+        views += zip((f"  {name}" for name in DEFICIENCIES),
+                     (score_batch(simulated) for simulated in simulate_all(samples)))
+
+    print(f"{'colormap':<40} {'monotonic':>9} {'unevenness':>10} {'L* range':>8} {'mean ΔE':>8}")
+    for i, filename in enumerate(names):
+        for suffix, scores in views:
+            score = scores[i]
+            bad = ((args.monotonic and not score['monotonic'])
+                   or (args.max_unevenness is not None
+                       and score['unevenness'] > args.max_unevenness))
+            failed += bad
+            label = suffix if suffix else filename
+            print(f"{label:<40} {str(score['monotonic']):>9} {score['unevenness']:>10.3f} "
+                  f"{score['lightness_range']:>8.1f} {score['mean_delta_e']:>8.3f}"
+                  f"{'   FAIL' if bad else ''}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,302 @@
+"""
+Batch Colormap Builder
+Build .cmap files, images and Python code from stop spec files without the
+GUI, in parallel, skipping specs that have not changed since the last run
+
+    python colormap_cli.py specs/ -o build/ --formats cmap,png,py
+"""
+
+import argparse
+import csv
+import hashlib
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from colormap_engine import Colormap
+from colormap_export import export_images, export_lut, parse_size
+
+try:
+    import tomllib
+except ImportError:  # Python < 3.11
+    tomllib = None
+
+SPEC_EXTENSIONS = ('.json', '.toml', '.csv')
+FORMATS = ('cmap', 'png', 'py')
+# Precompiled LUTs (--lut-size entries), see colormap_export.export_lut
+LUT_FORMATS = ('npy', 'h', 'glsl', 'xml')
+MANIFEST_NAME = '.colormap-manifest.json'
+
+# Part of every build hash; bump when outputs for the same spec change
+BUILD_VERSION = 1
+
+
+class SpecError(ValueError):
+    """A spec file that cannot be turned into a colormap"""
+
+
+def parse_color(value):
+    """'#rrggbb' or an [r, g, b] list of 0-1 floats, returned as a float tuple"""
+    if isinstance(value, str):
+        text = value.strip().lstrip('#')
+        if len(text) != 6:
+            raise SpecError(f"Bad hex color {value!r}")
+        try:
+            return tuple(int(text[i:i + 2], 16) / 255 for i in (0, 2, 4))
+        except ValueError:
+            raise SpecError(f"Bad hex color {value!r}") from None
+    color = tuple(float(c) for c in value)
+    if len(color) != 3 or not all(0.0 <= c <= 1.0 for c in color):
+        raise SpecError(f"Colors must be 3 floats in [0, 1], got {value!r}")
+    return color
+
+
+def _parse_stops(entries):
+    """Stops from [{'position': p, 'color': c}] or [[p, c]] entries"""
+    stops = []
+    for entry in entries:
+        if isinstance(entry, dict):
+            position, color = entry['position'], entry['color']
+        else:
+            position, color = entry
+        position = float(position)
+        if not 0.0 <= position <= 1.0:
+            raise SpecError(f"Stop position {position} is outside [0, 1]")
+        stops.append((position, parse_color(color)))
+    return stops
+
+
+def _read_csv(filename):
+    """Rows of position,#rrggbb or position,r,g,b; non-numeric rows are headers"""
+    entries = []
+    with open(filename, newline='') as f:
+        for row in csv.reader(f):
+            row = [cell.strip() for cell in row if cell.strip()]
+            if not row or row[0].startswith('#'):
+                continue
+            try:
+                position = float(row[0])
+            except ValueError:
+                continue
+            entries.append((position, row[1] if len(row) == 2 else row[1:4]))
+    return {'stops': entries}
+
+
+def load_spec(filename):
+    """Read a JSON, TOML or CSV spec into a Colormap
+
+    JSON/TOML specs hold 'stops' (or 'colors', as written by
+    Colormap.to_dict), an optional 'name' (defaulting to the file name) and
+    an optional 'interpolation' space, and optionally one of 'bands',
+    'boundaries' or 'hard_steps' for a discrete colormap. CSV specs are one
+    stop per row.
+    """
+    ext = os.path.splitext(filename)[1].lower()
+    try:
+        if ext == '.json':
+            with open(filename) as f:
+                data = json.load(f)
+        elif ext == '.toml':
+            if tomllib is None:
+                raise SpecError("TOML specs need Python 3.11+ (tomllib)")
+            with open(filename, 'rb') as f:
+                data = tomllib.load(f)
+        elif ext == '.csv':
+            data = _read_csv(filename)
+        else:
+            raise SpecError(f"Unknown spec type {ext!r}")
+        if not isinstance(data, dict):
+            raise SpecError("Spec must be a table/object")
+        entries = data.get('stops', data.get('colors'))
+        if entries is None:
+            raise SpecError("Spec has no 'stops'")
+        stops = _parse_stops(entries)
+    except SpecError:
+        raise
+    except (KeyError, TypeError, ValueError) as e:
+        raise SpecError(f"Malformed spec: {e}") from e
+
+    name = data.get('name') or os.path.splitext(os.path.basename(filename))[0]
+    # The name becomes the output file names, so it must stay inside -o
+    if not isinstance(name, str):
+        raise SpecError("Spec 'name' must be a string")
+    if (name in ('.', '..') or os.path.isabs(name) or os.sep in name
+            or (os.altsep and os.altsep in name)):
+        raise SpecError(f"Spec name {name!r} must be a plain file name")
+    try:
+        cmap = Colormap(stops, name=name, interpolation=data.get('interpolation', 'srgb'))
+        cmap.set_discrete(bands=data.get('bands'), boundaries=data.get('boundaries'),
+                          hard_steps=bool(data.get('hard_steps', False)))
+    except (TypeError, ValueError) as e:
+        raise SpecError(str(e)) from e
+    if not cmap.is_complete():
+        raise SpecError("A colormap needs at least 2 stops")
+    return cmap
+
+
+def find_specs(paths):
+    """Spec files named directly or found (recursively) under directories"""
+    specs = []
+    for path in paths:
+        if os.path.isdir(path):
+            for folder, _, files in os.walk(path):
+                specs.extend(os.path.join(folder, name) for name in sorted(files)
+                             if name.lower().endswith(SPEC_EXTENSIONS))
+        else:
+            specs.append(path)
+    return sorted(set(specs))
+
+
+def build_hash(cmap, formats, options):
+    """Hash of everything that affects a spec's outputs"""
+    digest = hashlib.sha1(cmap.content_key().encode())
+    digest.update(json.dumps([BUILD_VERSION, cmap.name, sorted(formats), options],
+                             sort_keys=True).encode())
+    return digest.hexdigest()
+
+
+def output_paths(cmap, out_dir, formats, sizes):
+    """Output files by format; png maps to one (filename, width, height) per size"""
+    outputs = {}
+    for fmt in formats:
+        if fmt == 'png':
+            outputs[fmt] = [(os.path.join(out_dir, f"{cmap.name}.png" if len(sizes) == 1
+                                          else f"{cmap.name}_{w}x{h}.png"), w, h)
+                            for w, h in sizes]
+        else:
+            outputs[fmt] = os.path.join(out_dir, f"{cmap.name}.{fmt}")
+    return outputs
+
+
+def output_files(outputs):
+    return sorted(item[0] if isinstance(item, tuple) else item
+                  for value in outputs.values()
+                  for item in (value if isinstance(value, list) else [value]))
+
+
+def build_one(cmap, outputs, options):
+    """Write one colormap's outputs; runs in a worker process"""
+    started = time.perf_counter()
+    for fmt, target in outputs.items():
+        if fmt == 'cmap':
+            cmap.save(target, lut_size=options['lut_size'])
+        elif fmt == 'png':
+            export_images(cmap, target)
+        elif fmt == 'py':
+            with open(target, 'w') as f:
+                f.write(cmap.python_code())
+        elif fmt in LUT_FORMATS:
+            export_lut(cmap, target, n=options['lut_size'])
+    return time.perf_counter() - started
+
+
+def load_manifest(out_dir):
+    try:
+        with open(os.path.join(out_dir, MANIFEST_NAME)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_manifest(out_dir, manifest):
+    path = os.path.join(out_dir, MANIFEST_NAME)
+    temp = f"{path}.tmp"
+    with open(temp, 'w') as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+    os.replace(temp, path)
+
+
+def build(paths, out_dir, formats=FORMATS, jobs=None, force=False,
+          lut_size=256, sizes=((3000, 600),), log=print):
+    """Build every spec under paths into out_dir; returns (built, skipped, failed)
+
+    A spec is skipped when its build hash matches the manifest from the
+    previous run and all its outputs still exist.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    sizes = [tuple(size) for size in sizes]
+    options = {'lut_size': lut_size, 'sizes': sizes}
+    manifest = load_manifest(out_dir)
+    built, skipped, failed = [], [], []
+
+    todo = []
+    names = {}
+    for spec in find_specs(paths):
+        try:
+            cmap = load_spec(spec)
+        except (OSError, SpecError) as e:
+            log(f"error   {spec}: {e}")
+            failed.append(spec)
+            continue
+        if cmap.name in names:
+            log(f"error   {spec}: name {cmap.name!r} already used by {names[cmap.name]}")
+            failed.append(spec)
+            continue
+        names[cmap.name] = spec
+
+        outputs = output_paths(cmap, out_dir, formats, sizes)
+        digest = build_hash(cmap, formats, options)
+        entry = manifest.get(spec)
+        if (not force and entry is not None and entry['hash'] == digest
+                and all(os.path.exists(path) for path in output_files(outputs))):
+            skipped.append(spec)
+            continue
+        todo.append((spec, cmap, outputs, digest))
+
+    if todo:
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            futures = {pool.submit(build_one, cmap, outputs, options): (spec, outputs, digest)
+                       for spec, cmap, outputs, digest in todo}
+            for future in as_completed(futures):
+                spec, outputs, digest = futures[future]
+                try:
+                    seconds = future.result()
+                except Exception as e:
+                    log(f"error   {spec}: {e}")
+                    manifest.pop(spec, None)
+                    failed.append(spec)
+                    continue
+                log(f"built   {spec} ({seconds * 1000:.0f} ms)")
+                manifest[spec] = {'hash': digest, 'outputs': output_files(outputs)}
+                built.append(spec)
+
+    save_manifest(out_dir, manifest)
+    return built, skipped, failed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('specs', nargs='+', help="Spec files (.json/.toml/.csv) or directories")
+    parser.add_argument('-o', '--output', default='build', help="Output directory")
+    parser.add_argument('--formats', default=','.join(FORMATS),
+                        help=f"Comma-separated outputs from {', '.join(FORMATS + LUT_FORMATS)}")
+    parser.add_argument('-j', '--jobs', type=int, default=None,
+                        help="Worker processes (default: CPU count)")
+    parser.add_argument('--force', action='store_true', help="Rebuild unchanged specs too")
+    parser.add_argument('--lut-size', type=int, default=256, help="LUT entries in .cmap and LUT outputs")
+    parser.add_argument('--sizes', default='3000x600',
+                        help="Comma-separated WIDTHxHEIGHT pixel sizes of png outputs")
+    args = parser.parse_args(argv)
+
+    formats = [fmt.strip() for fmt in args.formats.split(',') if fmt.strip()]
+    unknown = set(formats) - set(FORMATS + LUT_FORMATS)
+    if unknown:
+        parser.error(f"Unknown formats: {', '.join(sorted(unknown))}")
+
+    try:
+        sizes = [parse_size(size) for size in args.sizes.split(',') if size.strip()]
+    except ValueError as e:
+        parser.error(str(e))
+
+    started = time.perf_counter()
+    built, skipped, failed = build(args.specs, args.output, formats, args.jobs,
+                                   args.force, args.lut_size, sizes)
+    print(f"{len(built)} built, {len(skipped)} unchanged, {len(failed)} failed "
+          f"in {time.perf_counter() - started:.1f} s")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
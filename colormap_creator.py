@@ -3,40 +3,298 @@ Interactive Colormap Creator with Brightness Control
 Run this script to create custom colormaps with a color wheel picker
 """
 
+import time
+STARTED = time.perf_counter()  # --startup-profile measures from here
+
+import argparse
 import numpy as np
-import matplotlib.pyplot as plt
-from matplotlib.colors import LinearSegmentedColormap
-from matplotlib.patches import Circle, Rectangle
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-import colorsys
 import tkinter as tk
 from tkinter import ttk, messagebox, filedialog, colorchooser, simpledialog
 import pickle
 
+from colormap_engine import Colormap, ColorState, load_colormap, load_legacy_npy
+from colormap_cvd import DEFICIENCIES
+from colormap_spaces import SPACE_LABELS
+from colormap_export import export_image, export_lut
+
+IMPORTED = time.perf_counter()
+
+BACKENDS = ('tk', 'matplotlib')
+
+NORMAL_VISION = 'Normal vision'
+
+DISCRETE_MODES = ('Continuous', 'Bands', 'Boundaries', 'Hard steps')
+
+# Colormap fields every rendering of the colormap depends on
+COLORMAP_FIELDS = {'stops', 'interpolation', 'discrete'}
+
+
+def load_views(backend):
+    """Module providing WheelView, ValueBarView and PreviewView for a backend"""
+    if backend == 'tk':
+        import colormap_views
+        return colormap_views
+    if backend == 'matplotlib':
+        import colormap_mplviews
+        return colormap_mplviews
+    raise ValueError(f"Unknown backend {backend!r}, expected one of {BACKENDS}")
+
+class RedrawScheduler:
+    """Coalesce redraw requests and run them at most once per frame
+    
+    Requests are keyed, so many events arriving between two frames collapse
+    into a single call per key. Callbacks run in first-requested order.
+    """
+    
+    def __init__(self, widget, frame_ms=16):
+        self.widget = widget
+        self.frame_ms = frame_ms
+        self._pending = {}
+        self._after_id = None
+        self._last_frame = 0.0
+    
+    def schedule(self, key, callback):
+        """Request callback for the next frame, replacing any pending one for key"""
+        self._pending[key] = callback
+        if self._after_id is None:
+            elapsed_ms = (time.perf_counter() - self._last_frame) * 1000
+            delay = int(self.frame_ms - elapsed_ms)
+            if delay > 0:
+                self._after_id = self.widget.after(delay, self._run)
+            else:
+                self._after_id = self.widget.after_idle(self._run)
+    
+    def flush(self):
+        """Run pending callbacks now instead of waiting for the next frame"""
+        if self._after_id is not None:
+            self.widget.after_cancel(self._after_id)
+            self._run()
+    
+    def _run(self):
+        self._after_id = None
+        self._last_frame = time.perf_counter()
+        pending, self._pending = self._pending, {}
+        for callback in pending.values():
+            callback()
+
+
+class StopListView:
+    """Virtualized list of colormap stops drawn on a tk.Canvas
+    
+    Only the rows that fit in the window exist as canvas items and they are
+    reused while scrolling. Edits are applied as single-row diffs
+    (row_inserted/row_removed/row_changed), so an edit costs a handful of
+    Tk calls however many stops the colormap has.
+    """
+    
+    ROW_HEIGHT = 20
+    
+    def __init__(self, master, get_colormap, height=8):
+        self.get_colormap = get_colormap
+        self.top = 0
+        self.selected = None
+        self._slots = []
+        
+        self.frame = ttk.Frame(master)
+        self.scrollbar = ttk.Scrollbar(self.frame, command=self.yview)
+        self.scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.canvas = tk.Canvas(self.frame, height=height * self.ROW_HEIGHT,
+                                bg='white', highlightthickness=1,
+                                highlightbackground='gray')
+        self.canvas.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        
+        self.canvas.bind('<Configure>', self._on_configure)
+        self.canvas.bind('<Button-1>', self._on_click)
+        self.canvas.bind('<MouseWheel>', self._on_mousewheel)
+        self.canvas.bind('<Button-4>', lambda e: self.scroll(-3))
+        self.canvas.bind('<Button-5>', lambda e: self.scroll(3))
+    
+    def pack(self, **kwargs):
+        self.frame.pack(**kwargs)
+    
+    def count(self):
+        return len(self.get_colormap())
+    
+    def curselection(self):
+        """Selected row as a tuple, like tk.Listbox.curselection()"""
+        return () if self.selected is None else (self.selected,)
+    
+    def selection_set(self, idx):
+        """Select row idx and scroll it into view"""
+        old, self.selected = self.selected, idx
+        self._draw_row(old)
+        self._draw_row(idx)
+        self.see(idx)
+    
+    def see(self, idx):
+        """Scroll so that row idx is visible"""
+        visible = len(self._slots)
+        if idx < self.top:
+            self._scroll_to(idx)
+        elif visible and idx >= self.top + visible:
+            self._scroll_to(idx - visible + 1)
+    
+    def row_inserted(self, idx):
+        """A stop was inserted at idx"""
+        if self.selected is not None and self.selected >= idx:
+            self.selected += 1
+        if idx < self.top:
+            # Keep the same stops in view
+            self.top += 1
+        else:
+            self._redraw_from(idx)
+        self._update_scrollbar()
+    
+    def row_removed(self, idx):
+        """The stop at idx was removed"""
+        if self.selected == idx:
+            self.selected = None
+        elif self.selected is not None and self.selected > idx:
+            self.selected -= 1
+        if idx < self.top:
+            self.top -= 1
+        elif not self._clamp_top():
+            self._redraw_from(idx)
+        self._update_scrollbar()
+    
+    def row_changed(self, idx):
+        """The stop at idx changed color (its position kept its index)"""
+        self._draw_row(idx)
+    
+    def reset(self):
+        """Redraw from scratch, e.g. after the whole colormap was replaced"""
+        self.selected = None
+        self.top = 0
+        self._redraw_from(0)
+        self._update_scrollbar()
+    
+    def yview(self, *args):
+        """Scrollbar command ('moveto' fraction / 'scroll' n units|pages)"""
+        if args[0] == 'moveto':
+            self._scroll_to(int(round(float(args[1]) * self.count())))
+        elif args[0] == 'scroll':
+            step = int(args[1])
+            if args[2] == 'pages':
+                step *= max(1, len(self._slots) - 1)
+            self.scroll(step)
+    
+    def scroll(self, rows):
+        self._scroll_to(self.top + rows)
+    
+    def _scroll_to(self, top):
+        top = max(0, min(top, self.count() - len(self._slots)))
+        if top != self.top:
+            self.top = top
+            self._redraw_from(top)
+        self._update_scrollbar()
+    
+    def _clamp_top(self):
+        """Pull the view up when rows below it ran out; True if redrawn"""
+        top = max(0, min(self.top, self.count() - len(self._slots)))
+        if top == self.top:
+            return False
+        self.top = top
+        self._redraw_from(top)
+        return True
+    
+    def _update_scrollbar(self):
+        count = self.count()
+        if count == 0:
+            self.scrollbar.set(0.0, 1.0)
+        else:
+            self.scrollbar.set(self.top / count,
+                               min(1.0, (self.top + len(self._slots)) / count))
+    
+    def _redraw_from(self, idx):
+        for slot in range(max(0, idx - self.top), len(self._slots)):
+            self._draw_slot(slot)
+    
+    def _draw_row(self, idx):
+        if idx is not None and self.top <= idx < self.top + len(self._slots):
+            self._draw_slot(idx - self.top)
+    
+    def _draw_slot(self, slot):
+        rect, text = self._slots[slot]
+        idx = self.top + slot
+        colormap = self.get_colormap()
+        if idx >= len(colormap):
+            self.canvas.itemconfig(rect, state='hidden')
+            self.canvas.itemconfig(text, state='hidden')
+            return
+        
+        position, rgb = colormap.stop(idx)
+        color_255 = tuple(int(c*255) for c in rgb)
+        hex_color = '#{:02x}{:02x}{:02x}'.format(*color_255)
+        # Determine if we need dark or light text based on brightness
+        brightness = (rgb[0] * 299 + rgb[1] * 587 + rgb[2] * 114) / 1000
+        fg_color = 'black' if brightness > 0.5 else 'white'
+        
+        selected = idx == self.selected
+        self.canvas.itemconfig(rect, fill=hex_color, state='normal',
+                               outline='#0078d7' if selected else hex_color,
+                               width=3 if selected else 1)
+        prefix = '▶ ' if selected else ''
+        self.canvas.itemconfig(text, fill=fg_color, state='normal',
+                               text=f"{prefix}Pos: {position:.2f} - RGB: {color_255}")
+    
+    def _on_configure(self, event):
+        """Create or drop pooled row items to match the visible height"""
+        visible = max(1, -(-event.height // self.ROW_HEIGHT))
+        while len(self._slots) < visible:
+            y = len(self._slots) * self.ROW_HEIGHT
+            rect = self.canvas.create_rectangle(0, y, 0, y + self.ROW_HEIGHT)
+            text = self.canvas.create_text(6, y + self.ROW_HEIGHT / 2, anchor=tk.W)
+            self._slots.append((rect, text))
+        while len(self._slots) > visible:
+            for item in self._slots.pop():
+                self.canvas.delete(item)
+        for slot, (rect, _) in enumerate(self._slots):
+            y = slot * self.ROW_HEIGHT
+            self.canvas.coords(rect, 1, y + 1, event.width - 2, y + self.ROW_HEIGHT - 1)
+        
+        self.top = max(0, min(self.top, self.count() - visible))
+        self._redraw_from(self.top)
+        self._update_scrollbar()
+    
+    def _on_click(self, event):
+        idx = self.top + int(event.y // self.ROW_HEIGHT)
+        if idx < self.count():
+            self.selection_set(idx)
+    
+    def _on_mousewheel(self, event):
+        self.scroll(-3 if event.delta > 0 else 3)
+
+
 class ColorMapCreator:
-    def __init__(self, root):
+    def __init__(self, root, backend='tk'):
         self.root = root
         self.root.title("Interactive Colormap Creator")
         self.root.geometry("1400x700")
         
 
-        # Store colors as list of dictionaries with position and color
+        # Colormap stops live in the headless engine; the GUI only edits them
         # Add default colors at positions 0 and 1 to prevent preview error
-        self.colors = [
-            {'position': 0.0, 'color': (1.0, 1.0, 1.0)},  # White at start
-            {'position': 1.0, 'color': (0.0, 0.0, 0.0)},  # Black at end
-        ]
-        self.current_color = '#FF0000'
-        self.current_rgb = (1.0, 0.0, 0.0)
-        self.current_hue = 0.0
-        self.current_saturation = 1.0
-        self.current_value = 1.0
-        self.custom_cmap = None
+        self.colormap = Colormap([
+            (0.0, (1.0, 1.0, 1.0)),  # White at start
+            (1.0, (0.0, 0.0, 0.0)),  # Black at end
+        ])
+        # Currently selected color; views subscribe to the fields they show
+        self.color = ColorState((1.0, 0.0, 0.0))
+        # Folder last browsed with the library window
+        self.library_dir = None
+        
+        # Wheel, brightness bar and preview are drawn by the selected backend:
+        # native Tk canvases by default, or the matplotlib figures
+        self.views = load_views(backend)
+        
+        # Per-frame redraw coalescing
+        self.redraw = RedrawScheduler(self.root)
         
         self.setup_ui()
-        self.draw_color_wheel()
-        self.draw_value_bar()
+        self.update_wheel()
+        self.update_value_bar()
         self.update_current_color_display()
+        self.subscribe_views()
         
     def setup_ui(self):
         """Setup the user interface"""
@@ -58,13 +316,10 @@ class ColorMapCreator:
         wheel_frame = ttk.Frame(left_frame)
         wheel_frame.pack(side=tk.LEFT, padx=5)
         
-        # Create matplotlib figure for color wheel
-        self.fig_wheel, self.ax_wheel = plt.subplots(figsize=(5, 5))
-        self.canvas_wheel = FigureCanvasTkAgg(self.fig_wheel, master=wheel_frame)
-        self.canvas_wheel.get_tk_widget().pack()
-        
-        # Bind click event
-        self.canvas_wheel.mpl_connect('button_press_event', self.on_wheel_click)
+        # Color wheel; click and drag to pick
+        self.wheel_view = self.views.WheelView(wheel_frame, self.pick_wheel,
+                                               self.on_drag_release)
+        self.wheel_view.pack()
         
         # Brightness/Value bar frame
         value_frame = ttk.Frame(left_frame)
@@ -72,13 +327,10 @@ class ColorMapCreator:
         
         ttk.Label(value_frame, text="Brightness").pack(pady=5)
         
-        # Create matplotlib figure for value bar
-        self.fig_value, self.ax_value = plt.subplots(figsize=(1, 5))
-        self.canvas_value = FigureCanvasTkAgg(self.fig_value, master=value_frame)
-        self.canvas_value.get_tk_widget().pack()
-        
-        # Bind click event
-        self.canvas_value.mpl_connect('button_press_event', self.on_value_click)
+        # Brightness bar; click and drag to pick
+        self.value_view = self.views.ValueBarView(value_frame, self.pick_value,
+                                                  self.on_drag_release)
+        self.value_view.pack()
         
         # Value slider (alternative to clicking)
         # self.value_var = tk.DoubleVar(value=1.0)
@@ -105,7 +357,7 @@ class ColorMapCreator:
                  font=('TkDefaultFont', 10, 'bold')).pack(pady=5)
         
         self.color_canvas = tk.Canvas(color_display_frame, width=120, height=120, 
-                                      bg=self.current_color, highlightthickness=2,
+                                      bg=self.color.hex, highlightthickness=2,
                                       highlightbackground='black')
         self.color_canvas.pack(pady=10)
         
@@ -114,7 +366,7 @@ class ColorMapCreator:
         info_frame.pack(fill=tk.X, pady=5)
         
         ttk.Label(info_frame, text="HEX:").grid(row=0, column=0, sticky=tk.W, padx=5)
-        self.color_hex_var = tk.StringVar(value=self.current_color)
+        self.color_hex_var = tk.StringVar(value=self.color.hex)
         ttk.Entry(info_frame, textvariable=self.color_hex_var, 
                  width=10, state='readonly').grid(row=0, column=1, padx=5)
         
@@ -179,6 +431,8 @@ class ColorMapCreator:
                 command=self.remove_color).pack(side=tk.LEFT, padx=5)
         ttk.Button(button_row1, text="🗑️ Clear All", 
                 command=self.clear_all).pack(side=tk.LEFT, padx=5)
+        ttk.Button(button_row1, text="✨ Optimize", 
+                command=self.optimize_stops).pack(side=tk.LEFT, padx=5)
 
         # Second row of buttons - for editing selected colors
         button_row2 = ttk.Frame(button_frame)
@@ -196,39 +450,89 @@ class ColorMapCreator:
         
         ttk.Label(list_frame, text="Colors in colormap:").pack(anchor=tk.W)
         
-        # Listbox with scrollbar
-        scrollbar = ttk.Scrollbar(list_frame)
-        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
-        
-        self.color_listbox = tk.Listbox(list_frame, yscrollcommand=scrollbar.set, height=8)
-        self.color_listbox.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
-        scrollbar.config(command=self.color_listbox.yview)
+        # Virtualized stop list with scrollbar
+        self.stop_list = StopListView(list_frame, lambda: self.colormap, height=8)
+        self.stop_list.pack(fill=tk.BOTH, expand=True)
         
         # Colormap preview
         preview_frame = ttk.LabelFrame(right_frame, text="Colormap Preview", padding="5")
         preview_frame.pack(fill=tk.X, pady=10)
         
-        self.fig_preview, self.ax_preview = plt.subplots(figsize=(6, 1))
-        self.fig_preview.subplots_adjust(bottom=0.3, top=0.9)
-        self.canvas_preview = FigureCanvasTkAgg(self.fig_preview, master=preview_frame)
-        self.canvas_preview.get_tk_widget().pack(fill=tk.BOTH, expand=True)
+        # Interpolation space for the stops
+        space_frame = ttk.Frame(preview_frame)
+        space_frame.pack(fill=tk.X)
+        ttk.Label(space_frame, text="Interpolate in:").pack(side=tk.LEFT, padx=5)
+        self.space_var = tk.StringVar(value=SPACE_LABELS[self.colormap.interpolation])
+        space_box = ttk.Combobox(space_frame, textvariable=self.space_var, state='readonly',
+                                 values=list(SPACE_LABELS.values()), width=20)
+        space_box.pack(side=tk.LEFT, padx=5)
+        space_box.bind('<<ComboboxSelected>>', self.on_space_selected)
+        
+        # Color vision deficiency simulation of the preview
+        ttk.Label(space_frame, text="Simulate:").pack(side=tk.LEFT, padx=5)
+        self.cvd_var = tk.StringVar(value=NORMAL_VISION)
+        cvd_box = ttk.Combobox(space_frame, textvariable=self.cvd_var, state='readonly',
+                               values=[NORMAL_VISION] + list(DEFICIENCIES.values()), width=16)
+        cvd_box.pack(side=tk.LEFT, padx=5)
+        cvd_box.bind('<<ComboboxSelected>>', 
+                     lambda event: self.redraw.schedule('preview', self.update_colormap_preview))
+        ttk.Button(space_frame, text="🖼 Sample Image", 
+                  command=self.show_cvd_samples).pack(side=tk.LEFT, padx=5)
+        ttk.Button(space_frame, text="📈 Preview on Data", 
+                  command=self.show_data_preview).pack(side=tk.LEFT, padx=5)
+        
+        # Discrete mode: equal bands, explicit boundaries or hard steps at the stops
+        discrete_frame = ttk.Frame(preview_frame)
+        discrete_frame.pack(fill=tk.X, pady=(5, 0))
+        ttk.Label(discrete_frame, text="Mode:").pack(side=tk.LEFT, padx=5)
+        self.mode_var = tk.StringVar(value=DISCRETE_MODES[0])
+        mode_box = ttk.Combobox(discrete_frame, textvariable=self.mode_var, state='readonly',
+                                values=DISCRETE_MODES, width=12)
+        mode_box.pack(side=tk.LEFT, padx=5)
+        mode_box.bind('<<ComboboxSelected>>', lambda event: self.apply_discrete())
+        ttk.Label(discrete_frame, text="Bands:").pack(side=tk.LEFT, padx=5)
+        self.bands_var = tk.IntVar(value=8)
+        ttk.Spinbox(discrete_frame, from_=1, to=256, textvariable=self.bands_var, width=5,
+                   command=self.apply_discrete).pack(side=tk.LEFT, padx=5)
+        ttk.Label(discrete_frame, text="Boundaries:").pack(side=tk.LEFT, padx=5)
+        self.boundaries_var = tk.StringVar(value="0, 0.25, 0.5, 0.75, 1")
+        boundaries_entry = ttk.Entry(discrete_frame, textvariable=self.boundaries_var, width=24)
+        boundaries_entry.pack(side=tk.LEFT, padx=5)
+        boundaries_entry.bind('<Return>', lambda event: self.apply_discrete())
+        
+        self.preview_view = self.views.PreviewView(preview_frame)
+        self.preview_view.pack(fill=tk.BOTH, expand=True)
+        
+        # Perceptual analysis of the preview
+        analysis_frame = ttk.LabelFrame(right_frame, text="Perceptual Analysis", padding="5")
+        analysis_frame.pack(fill=tk.X, pady=5)
+        self.analysis_view = self.views.AnalysisView(analysis_frame)
+        self.analysis_view.pack(fill=tk.X)
         
         # Save buttons
         save_frame = ttk.Frame(right_frame)
         save_frame.pack(fill=tk.X, pady=10)
         
-        ttk.Button(save_frame, text="💾 Save Colormap (.npy)", 
-                  command=self.save_colormap_npy).pack(side=tk.LEFT, padx=5)
+        ttk.Button(save_frame, text="📂 Open", 
+                  command=self.open_colormap).pack(side=tk.LEFT, padx=5)
+        ttk.Button(save_frame, text="📚 Library", 
+                  command=self.show_library).pack(side=tk.LEFT, padx=5)
+        ttk.Button(save_frame, text="📥 Import", 
+                  command=self.import_colormap).pack(side=tk.LEFT, padx=5)
+        ttk.Button(save_frame, text="💾 Save Colormap (.cmap)", 
+                  command=self.save_colormap).pack(side=tk.LEFT, padx=5)
         ttk.Button(save_frame, text="📊 Save as Image", 
                   command=self.save_colormap_image).pack(side=tk.LEFT, padx=5)
         ttk.Button(save_frame, text="🐍 Export Python Code", 
                   command=self.export_python_code).pack(side=tk.LEFT, padx=5)
+        ttk.Button(save_frame, text="📦 Export LUT", 
+                  command=self.export_lut).pack(side=tk.LEFT, padx=5)
         
         # Instructions
         instructions = """
 INSTRUCTIONS:
-1. Click color wheel to select hue & saturation
-2. Click brightness bar (or slider) to adjust brightness
+1. Click or drag on color wheel to select hue & saturation
+2. Click or drag brightness bar (or slider) to adjust brightness
 3. Set position slider (0.0 = start, 1.0 = end)
 4. Click 'Add Color' to add to colormap
 5. Add at least 2 colors, then save your colormap
@@ -240,155 +544,137 @@ TIP: Center of wheel = white, Edge = vivid colors
         
         self.update_colormap_preview()
     
-    def draw_color_wheel(self):
-        """Draw the color wheel with full spectrum (saturation based)"""
-        self.ax_wheel.clear()
-        self.ax_wheel.set_xlim(-1.2, 1.2)
-        self.ax_wheel.set_ylim(-1.2, 1.2)
-        self.ax_wheel.set_aspect('equal')
-        self.ax_wheel.axis('off')
-        
-        # Create a higher resolution color wheel
-        size = 500
-        wheel_img = np.zeros((size, size, 3))
-        center = size / 2
-        
-        for i in range(size):
-            for j in range(size):
-                # Calculate position relative to center
-                x = j - center
-                y = center - i  # Flip y-axis
-                
-                # Calculate radius and angle
-                radius = np.sqrt(x**2 + y**2) / center
-                
-                if radius <= 1.0:
-                    angle = np.arctan2(y, x)
-                    if angle < 0:
-                        angle += 2 * np.pi
-                    
-                    # Convert to HSV (using current value/brightness)
-                    hue = angle / (2 * np.pi)
-                    saturation = radius
-                    value = 1.0  # Always show full brightness on wheel
-                    
-                    # Convert HSV to RGB
-                    rgb = colorsys.hsv_to_rgb(hue, saturation, value)
-                    wheel_img[i, j] = rgb
-                else:
-                    # White outside the circle
-                    wheel_img[i, j] = [1, 1, 1]
-        
-        # Display the color wheel
-        self.ax_wheel.imshow(wheel_img, extent=[-1, 1, -1, 1], origin='upper')
-        self.ax_wheel.set_title('Hue & Saturation', fontsize=11, fontweight='bold')
-        
-        # Add a circle border
-        circle = Circle((0, 0), 1.0, fill=False, edgecolor='black', linewidth=2)
-        self.ax_wheel.add_patch(circle)
-        
-        self.canvas_wheel.draw()
-    
-    def draw_value_bar(self):
-        """Draw the brightness/value bar"""
-        self.ax_value.clear()
-        self.ax_value.set_xlim(0, 1)
-        self.ax_value.set_ylim(0, 1)
-        self.ax_value.set_aspect('auto')
-        self.ax_value.axis('off')
-        
-        # Create gradient from current color at full brightness to black
-        gradient = np.linspace(0, 1, 256).reshape(-1, 1)
-        
-        # Get current hue and saturation
-        hue = self.current_hue
-        saturation = self.current_saturation
-        
-        # Create color gradient
-        colors = np.zeros((256, 1, 3))
-        for i in range(256):
-            value = gradient[i, 0]
-            rgb = colorsys.hsv_to_rgb(hue, saturation, value)
-            colors[i, 0] = rgb
-        
-        self.ax_value.imshow(colors, extent=[0, 1, 0, 1], origin='lower', aspect='auto')
-        
-        # Add border
-        rect = Rectangle((0, 0), 1, 1, fill=False, edgecolor='black', linewidth=2)
-        self.ax_value.add_patch(rect)
-        
-        # Add marker for current value
-        marker_y = self.current_value
-        self.ax_value.plot([0, 1], [marker_y, marker_y], 'w-', linewidth=2)
-        self.ax_value.plot([0, 1], [marker_y, marker_y], 'k--', linewidth=1)
-        
-        self.canvas_value.draw()
-
-    def on_wheel_click(self, event):
-        """Handle click on color wheel"""
-        if event.inaxes == self.ax_wheel and event.xdata and event.ydata:
-            x, y = event.xdata, event.ydata
-            radius = np.sqrt(x**2 + y**2)
-            
-            if radius <= 1.0:
-                angle = np.arctan2(y, x)
-                if angle < 0:
-                    angle += 2*np.pi
-                
-                self.current_hue = angle / (2*np.pi)
-                self.current_saturation = radius
-                # Keep current value/brightness
-                
-                self.update_color_from_hsv()
-                
-                # Visual feedback - add a small marker
-                self.draw_color_wheel()
-                marker = Circle((x, y), 0.05, color='black', fill=True)
-                self.ax_wheel.add_patch(marker)
-                marker2 = Circle((x, y), 0.03, color='white', fill=True)
-                self.ax_wheel.add_patch(marker2)
-                self.canvas_wheel.draw()
-                self.draw_value_bar()
-    
-    def on_value_click(self, event):
-        """Handle click on value bar"""
-        if event.inaxes == self.ax_value and event.ydata:
-            self.current_value = max(0.0, min(1.0, event.ydata))
-            self.value_var.set(self.current_value)
-            self.update_color_from_hsv()
-            self.draw_value_bar()
+    def update_wheel(self):
+        """Move the wheel marker to the current hue/saturation"""
+        self.wheel_view.set_marker(self.color.hue, self.color.saturation)
+    
+    def update_value_bar(self):
+        """Update the brightness bar for the current hue/saturation and value"""
+        self.value_view.set_gradient(self.color.hue, self.color.saturation)
+        self.value_view.set_marker(self.color.value)
+    
+    def on_drag_release(self):
+        """End of a drag: draw its final state right away"""
+        self.redraw.flush()
+    
+    def pick_wheel(self, x, y, clamp):
+        """Set hue/saturation from wheel coordinates; returns False if outside the wheel"""
+        radius = np.sqrt(x**2 + y**2)
+        
+        if radius > 1.0:
+            if not clamp:
+                return False
+            radius = 1.0
+        
+        angle = np.arctan2(y, x)
+        if angle < 0:
+            angle += 2*np.pi
+        
+        # Keep current value/brightness
+        self.color.set_hsv(hue=angle / (2*np.pi), saturation=radius)
+        return True
+    
+    def pick_value(self, value):
+        """Set brightness from a value bar pick"""
+        self.color.set_hsv(value=max(0.0, min(1.0, value)))
     
     def on_value_slider_change(self, value):
         """Handle value slider change"""
-        self.current_value = float(value)
-        self.update_color_from_hsv()
-        self.draw_value_bar()
-    
-    def update_color_from_hsv(self):
-        """Update current color from HSV values"""
-        self.current_rgb = colorsys.hsv_to_rgb(
-            self.current_hue, 
-            self.current_saturation, 
-            self.current_value
-        )
-        self.current_color = '#{:02x}{:02x}{:02x}'.format(
-            int(self.current_rgb[0]*255), 
-            int(self.current_rgb[1]*255), 
-            int(self.current_rgb[2]*255)
-        )
-        self.update_current_color_display()
+        value = float(value)
+        # Echoes of value_var.set() come back rounded to the slider's 0.01
+        # resolution; ignore them so they do not snap the picked value
+        if abs(value - self.color.value) < 0.005:
+            return
+        self.color.set_hsv(value=value)
+    
+    def subscribe_views(self):
+        """Redraw each view once per frame, only when fields it shows change"""
+        self.watch(self.color, 'wheel', self.update_wheel,
+                   {'hue', 'saturation'})
+        self.watch(self.color, 'value_bar', self.update_value_bar,
+                   {'hue', 'saturation', 'value'})
+        self.watch(self.color, 'slider', lambda: self.value_var.set(self.color.value),
+                   {'value'})
+        self.watch(self.color, 'color_display', self.update_current_color_display)
+        self.watch(self.colormap, 'preview', self.update_colormap_preview, COLORMAP_FIELDS)
+        self.watch(self.colormap, 'analysis', lambda: self.analysis_view.show(self.colormap),
+                   COLORMAP_FIELDS)
+        self.watch(self.colormap, 'space_box',
+                   lambda: self.space_var.set(SPACE_LABELS[self.colormap.interpolation]),
+                   {'interpolation'})
+        self.watch(self.colormap, 'mode_box', self.update_discrete_controls, {'discrete'})
+        # The stop list applies each diff as it happens (they are cheap and
+        # must not be merged)
+        self.colormap.subscribe(self.on_stops_changed, {'stops'})
+    
+    def watch(self, model, view, render, fields=None):
+        """Mark view dirty when model changes; it renders on the next frame"""
+        return model.subscribe(lambda changed, info: self.redraw.schedule(view, render),
+                               fields)
+    
+    def on_stops_changed(self, changed, info):
+        """Forward a colormap diff to the stop list"""
+        op = info['op']
+        if op == 'insert':
+            self.stop_list.row_inserted(info['index'])
+        elif op == 'remove':
+            self.stop_list.row_removed(info['index'])
+        elif op == 'change':
+            self.stop_list.row_changed(info['index'])
+        elif op == 'move':
+            self.stop_list.row_removed(info['index'])
+            self.stop_list.row_inserted(info['new_index'])
+        else:
+            self.stop_list.reset()
+    
+    def on_space_selected(self, event):
+        """Switch the interpolation space picked in the combobox"""
+        labels = {label: space for space, label in SPACE_LABELS.items()}
+        self.colormap.set_interpolation(labels[self.space_var.get()])
+    
+    def apply_discrete(self):
+        """Set the colormap's discrete mode from the mode controls"""
+        mode = self.mode_var.get()
+        try:
+            if mode == 'Bands':
+                self.colormap.set_discrete(bands=self.bands_var.get())
+            elif mode == 'Boundaries':
+                boundaries = [float(b) for b in self.boundaries_var.get().split(',') if b.strip()]
+                self.colormap.set_discrete(boundaries=boundaries)
+            elif mode == 'Hard steps':
+                self.colormap.set_discrete(hard_steps=True)
+            else:
+                self.colormap.set_discrete()
+        except (tk.TclError, ValueError) as e:
+            messagebox.showerror("Invalid Discrete Mode", str(e))
+            self.update_discrete_controls()
+    
+    def update_discrete_controls(self):
+        """Show the colormap's discrete mode in the mode controls"""
+        cmap = self.colormap
+        if cmap.bands is not None:
+            self.mode_var.set('Bands')
+            self.bands_var.set(cmap.bands)
+        elif cmap.boundaries is not None:
+            self.mode_var.set('Boundaries')
+            self.boundaries_var.set(", ".join(f"{b:g}" for b in cmap.boundaries))
+        elif cmap.hard_steps:
+            self.mode_var.set('Hard steps')
+        else:
+            self.mode_var.set(DISCRETE_MODES[0])
     
     def update_current_color_display(self):
         """Update the current color display"""
-        self.color_canvas.config(bg=self.current_color)
-        self.color_hex_var.set(self.current_color)
+        color = self.color
+        self.color_canvas.config(bg=color.hex)
+        self.color_hex_var.set(color.hex)
         
         # Update RGB display
-        rgb_text = f"{int(self.current_rgb[0]*255)}, {int(self.current_rgb[1]*255)}, {int(self.current_rgb[2]*255)}"
+        rgb_text = f"{int(color.rgb[0]*255)}, {int(color.rgb[1]*255)}, {int(color.rgb[2]*255)}"
         self.color_rgb_var.set(rgb_text)
         
         # Update HSV display
-        hsv_text = f"{int(self.current_hue*360)}°, {int(self.current_saturation*100)}%, {int(self.current_value*100)}%"
+        hsv_text = f"{int(color.hue*360)}°, {int(color.saturation*100)}%, {int(color.value*100)}%"
         self.color_hsv_var.set(hsv_text)
     
     def update_position_label(self, value):
@@ -399,71 +685,34 @@ TIP: Center of wheel = white, Edge = vivid colors
         """Add current color to colormap"""
         position = self.position_var.get()
         
-        # Use the current color from the color wheel (normalized RGB)
-        rgb_normalized = self.current_rgb
-        
-        # Check if a color already exists at this exact position
-        replaced = False
-        for i, color_data in enumerate(self.colors):
-            if abs(color_data['position'] - position) < 0.001:  # Use small tolerance for float comparison
-                # Replace the existing color at this position
-                self.colors[i]['color'] = rgb_normalized
-                replaced = True
-                break
-        
-        # If no color was replaced, add a new one
-        if not replaced:
-            self.colors.append({'position': position, 'color': rgb_normalized})
-            self.colors.sort(key=lambda x: x['position'])
-        
-        self.update_color_list()
-        self.update_colormap_preview()
+        # Use the current color from the color wheel (normalized RGB);
+        # a color already at this position (within tolerance) is replaced
+        idx, _ = self.colormap.add_stop(position, self.color.rgb)
+        self.stop_list.see(idx)
 
     def remove_color(self):
         """Remove selected color"""
-        selection = self.color_listbox.curselection()
+        selection = self.stop_list.curselection()
         if selection:
             idx = selection[0]
-            self.colors.pop(idx)
-            self.update_color_list()
-            self.update_colormap_preview()
+            self.colormap.remove_stop(idx)
         else:
             messagebox.showinfo("No Selection", "Please select a color to remove.")
     
     def clear_all(self):
         """Clear all colors"""
         if messagebox.askyesno("Clear All", "Remove all colors from the colormap?"):
-            self.colors = []
-            self.update_color_list()
-            self.update_colormap_preview()
-    
-    def update_color_list(self):
-        """Update the listbox with colors"""
-        self.color_listbox.delete(0, tk.END)
-        for i, color_data in enumerate(self.colors):
-            color_255 = tuple(int(c*255) for c in color_data['color'])
-            hex_color = '#{:02x}{:02x}{:02x}'.format(*color_255)
-            
-            self.color_listbox.insert(tk.END, 
-                f"Pos: {color_data['position']:.2f} - RGB: {color_255}")
-            
-            # Color the listbox item
-            idx = self.color_listbox.size() - 1
-            # Determine if we need dark or light text based on brightness
-            rgb = color_data['color']
-            brightness = (rgb[0] * 299 + rgb[1] * 587 + rgb[2] * 114) / 1000
-            fg_color = 'black' if brightness > 0.5 else 'white'
-            self.color_listbox.itemconfig(idx, {'bg': hex_color, 'fg': fg_color})
+            self.colormap.clear()
     
     def edit_color_position(self):
         """Edit the position of selected color"""
-        selection = self.color_listbox.curselection()
+        selection = self.stop_list.curselection()
         if not selection:
             messagebox.showwarning("No Selection", "Please select a color to edit")
             return
         
         idx = selection[0]
-        current_pos = self.colors[idx]['position']
+        current_pos, _ = self.colormap.stop(idx)
         
         new_position = simpledialog.askfloat("Edit Position", 
                                             f"Current position: {current_pos:.2f}\nEnter new position (0-1):",
@@ -471,14 +720,12 @@ TIP: Center of wheel = white, Edge = vivid colors
                                             initialvalue=current_pos)
         
         if new_position is not None:
-            self.colors[idx]['position'] = new_position
-            self.colors.sort(key=lambda x: x['position'])
-            self.update_color_list()
-            self.update_colormap_preview()
+            new_idx = self.colormap.set_position(idx, new_position)
+            self.stop_list.selection_set(new_idx)
 
     # def edit_color_rgb(self):
     #     """Edit the color of selected item using color wheel"""
-    #     selection = self.color_listbox.curselection()
+    #     selection = self.stop_list.curselection()
     #     if not selection:
     #         messagebox.showwarning("No Selection", "Please select a color to edit")
     #         return
@@ -491,7 +738,7 @@ TIP: Center of wheel = white, Edge = vivid colors
         
     #     if result:
     #         # Use the current color from the color wheel
-    #         rgb_normalized = self.current_rgb
+    #         rgb_normalized = self.color.rgb
             
     #         self.colors[idx]['color'] = rgb_normalized
     #         self.update_color_list()
@@ -499,7 +746,7 @@ TIP: Center of wheel = white, Edge = vivid colors
 
     def edit_color_rgb(self):
         """Edit the color of selected item using color wheel"""
-        selection = self.color_listbox.curselection()
+        selection = self.stop_list.curselection()
         if not selection:
             messagebox.showwarning("No Selection", "Please select a color to edit")
             return
@@ -507,28 +754,11 @@ TIP: Center of wheel = white, Edge = vivid colors
         idx = selection[0]
         
         # Store the original color in case of cancel
-        original_color = self.colors[idx]['color']
-        
-        # Load the selected color into the color wheel first
-        selected_color = self.colors[idx]['color']
-        
-        # Convert RGB to HSV
-        h, s, v = colorsys.rgb_to_hsv(*selected_color)
-        self.current_hue = h
-        self.current_saturation = s
-        self.current_value = v
-        self.current_rgb = selected_color
-        self.current_color = '#{:02x}{:02x}{:02x}'.format(
-            int(selected_color[0]*255), 
-            int(selected_color[1]*255), 
-            int(selected_color[2]*255)
-        )
+        _, original_color = self.colormap.stop(idx)
         
-        # Update displays
-        self.update_current_color_display()
-        self.value_var.set(self.current_value)
-        self.draw_color_wheel()
-        self.draw_value_bar()
+        # Load the selected color into the color wheel first; the wheel,
+        # bar, slider and display follow through their subscriptions
+        self.color.set_rgb(original_color)
         
         # Create a dialog window for color editing
         edit_window = tk.Toplevel(self.root)
@@ -568,7 +798,7 @@ TIP: Center of wheel = white, Edge = vivid colors
         ttk.Label(preview_frame, text="Current selection:").pack(side=tk.LEFT, padx=5)
         
         color_preview = tk.Canvas(preview_frame, width=80, height=80, 
-                                bg=self.current_color, highlightthickness=2,
+                                bg=self.color.hex, highlightthickness=2,
                                 highlightbackground='black')
         color_preview.pack(side=tk.LEFT, padx=5)
         
@@ -576,16 +806,21 @@ TIP: Center of wheel = white, Edge = vivid colors
         color_info = ttk.Label(preview_frame, text="", justify=tk.LEFT)
         color_info.pack(side=tk.LEFT, padx=10)
         
-        # Update preview as user changes color
+        # Update preview when the selected color changes (no polling)
         def update_preview():
             if edit_window.winfo_exists():
-                color_preview.config(bg=self.current_color)
-                rgb_255 = tuple(int(c*255) for c in self.current_rgb)
-                info_text = f"RGB: {rgb_255}\nHEX: {self.current_color}"
+                color_preview.config(bg=self.color.hex)
+                rgb_255 = tuple(int(c*255) for c in self.color.rgb)
+                info_text = f"RGB: {rgb_255}\nHEX: {self.color.hex}"
                 color_info.config(text=info_text)
-                edit_window.after(100, update_preview)
         
         update_preview()
+        unsubscribe = self.watch(self.color, f'edit_dialog_{id(edit_window)}', update_preview,
+                                 {'rgb'})
+        
+        def close_dialog():
+            unsubscribe()
+            edit_window.destroy()
         
         # Buttons
         button_frame = ttk.Frame(frame)
@@ -593,28 +828,13 @@ TIP: Center of wheel = white, Edge = vivid colors
         
         def apply_color():
             # Apply the current color from the wheel
-            self.colors[idx]['color'] = self.current_rgb
-            self.update_color_list()
-            self.update_colormap_preview()
-            edit_window.destroy()
+            self.colormap.set_color(idx, self.color.rgb)
+            close_dialog()
         
         def cancel_edit():
             # Restore original color
-            self.current_rgb = original_color
-            h, s, v = colorsys.rgb_to_hsv(*original_color)
-            self.current_hue = h
-            self.current_saturation = s
-            self.current_value = v
-            self.current_color = '#{:02x}{:02x}{:02x}'.format(
-                int(original_color[0]*255), 
-                int(original_color[1]*255), 
-                int(original_color[2]*255)
-            )
-            self.update_current_color_display()
-            self.value_var.set(self.current_value)
-            self.draw_color_wheel()
-            self.draw_value_bar()
-            edit_window.destroy()
+            self.color.set_rgb(original_color)
+            close_dialog()
         
         ttk.Button(button_frame, text="✓ Apply", 
                 command=apply_color, width=15).pack(side=tk.LEFT, padx=5)
@@ -625,67 +845,389 @@ TIP: Center of wheel = white, Edge = vivid colors
         edit_window.protocol("WM_DELETE_WINDOW", cancel_edit)
 
 
+    def optimize_stops(self):
+        """Search for more perceptually uniform stop positions (and lightness)
+
+        The search runs on a process pool; each improvement is applied to the
+        colormap as it arrives, so the preview and analysis follow along.
+        Keep stops the search with the best result so far, Revert restores
+        the original stops.
+        """
+        from colormap_optimize import Optimizer
+
+        # Positions need 3 stops, lightness alone only 2; start() reports the
+        # optimizer's ValueError once the checkbox is known
+        if not self.colormap.is_complete():
+            messagebox.showwarning("Not Enough Colors", 
+                                  "Please add at least 2 colors to create a colormap.")
+            return
+        
+        original = self.colormap.copy()
+        state = {'optimizer': None, 'poll': None}
+        
+        window = tk.Toplevel(self.root)
+        window.title("Optimize Stops")
+        window.transient(self.root)
+        
+        frame = ttk.Frame(window, padding="20")
+        frame.pack(fill=tk.BOTH, expand=True)
+        
+        ttk.Label(frame, text="Make steps perceptually even, keeping your hues", 
+                 font=('TkDefaultFont', 11, 'bold')).pack(pady=(0, 10))
+        lightness_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(frame, text="Also adjust stop lightness", 
+                       variable=lightness_var).pack(anchor=tk.W)
+        status_var = tk.StringVar(value="Press Start to search")
+        ttk.Label(frame, textvariable=status_var, justify=tk.LEFT).pack(anchor=tk.W, pady=10)
+        
+        def stop_search():
+            if state['poll'] is not None:
+                self.root.after_cancel(state['poll'])
+                state['poll'] = None
+            if state['optimizer'] is not None:
+                state['optimizer'].cancel()
+        
+        def poll():
+            optimizer = state['optimizer']
+            progress = optimizer.poll()
+            if progress is not None:
+                self.colormap.assign(progress.colormap)
+                status_var.set(f"Unevenness {start_value:.3f} → {progress.value:.3f}\n"
+                              f"{progress.generations} generations, {progress.elapsed:.1f} s")
+            if optimizer.done:
+                state['poll'] = None
+                if optimizer.error is None:
+                    ending = "Finished"
+                else:
+                    error = optimizer.error
+                    ending = f"Search failed: {type(error).__name__}: {error}"
+                status_var.set(status_var.get().split('\n')[0] + "\n" + ending)
+                start_button.config(state=tk.NORMAL)
+            else:
+                state['poll'] = self.root.after(100, poll)
+        
+        def start():
+            nonlocal start_value
+            stop_search()
+            self.colormap.assign(original)
+            try:
+                state['optimizer'] = Optimizer(original, optimize_lightness=lightness_var.get())
+            except ValueError as e:
+                messagebox.showerror("Optimize Failed", 
+                                     f"{e}\n\nTick \"Also adjust stop lightness\" to "
+                                     "optimize a 2-stop colormap.", parent=window)
+                return
+            start_value = state['optimizer'].best[0]
+            status_var.set(f"Unevenness {start_value:.3f}, searching…")
+            start_button.config(state=tk.DISABLED)
+            state['poll'] = self.root.after(100, poll)
+        
+        def keep():
+            stop_search()
+            window.destroy()
+        
+        def revert():
+            stop_search()
+            self.colormap.assign(original)
+            window.destroy()
+        
+        start_value = None
+        button_frame = ttk.Frame(frame)
+        button_frame.pack(pady=10)
+        start_button = ttk.Button(button_frame, text="▶ Start", command=start, width=12)
+        start_button.pack(side=tk.LEFT, padx=5)
+        ttk.Button(button_frame, text="✓ Keep", command=keep, width=12).pack(side=tk.LEFT, padx=5)
+        ttk.Button(button_frame, text="↺ Revert", command=revert, width=12).pack(side=tk.LEFT, padx=5)
+        
+        window.protocol("WM_DELETE_WINDOW", revert)
+
+    @property
+    def deficiency(self):
+        """Deficiency picked for the preview, or None for normal vision"""
+        labels = {label: name for name, label in DEFICIENCIES.items()}
+        return labels.get(self.cvd_var.get())
+    
     def update_colormap_preview(self):
         """Update colormap preview"""
-        self.ax_preview.clear()
+        self.preview_view.show(self.colormap, self.deficiency)
+    
+    def show_cvd_samples(self):
+        """Window with sample data as seen with each color vision deficiency"""
+        window = tk.Toplevel(self.root)
+        window.title("Color Vision Deficiency Preview")
+        view = self.views.CVDSampleView(window)
+        view.pack(padx=10, pady=10)
+        view.show(self.colormap)
+        unsubscribe = self.watch(self.colormap, f'cvd_samples_{id(window)}', 
+                                 lambda: view.show(self.colormap), COLORMAP_FIELDS)
+        
+        def close():
+            unsubscribe()
+            window.destroy()
+        
+        window.protocol("WM_DELETE_WINDOW", close)
+    
+    def show_data_preview(self):
+        """Window showing a 2D .npy raster colorized by the working colormap
+
+        The pyramid is built (or loaded from the cache) on a worker thread;
+        afterwards stop edits only recolor what is on screen.
+        """
+        from concurrent.futures import ThreadPoolExecutor
+        from colormap_pyramid import Pyramid
         
-        if len(self.colors) >= 2:
-            # Create colormap from colors list
-            positions = [c['position'] for c in self.colors]
-            colors = [c['color'] for c in self.colors]
-            
-            cmap = LinearSegmentedColormap.from_list(
-                'custom_cmap',
-                list(zip(positions, colors))
-            )
-            self.custom_cmap = cmap
-            
-            # Create gradient
-            gradient = np.linspace(0, 1, 256).reshape(1, -1)
-            self.ax_preview.imshow(gradient, aspect='auto', cmap=cmap, extent=[0, 1, 0, 1])
-            self.ax_preview.set_xlim(0, 1)
-            self.ax_preview.set_ylim(0, 1)
-            self.ax_preview.set_xticks([0, 0.25, 0.5, 0.75, 1.0])
-            self.ax_preview.set_xticklabels(['0.0', '0.25', '0.5', '0.75', '1.0'])
-            self.ax_preview.set_yticks([])
-            self.ax_preview.set_xlabel('Position', fontsize=9)
-            
-        else:
-            self.custom_cmap = None
-            self.ax_preview.text(0.5, 0.5, 'Add at least 2 colors to preview', 
-                               ha='center', va='center', transform=self.ax_preview.transAxes,
-                               fontsize=10)
-            self.ax_preview.set_xticks([])
-            self.ax_preview.set_yticks([])
-        
-        self.fig_preview.tight_layout()
-        self.canvas_preview.draw()
-    
-    def save_colormap_npy(self):
-        """Save colormap as numpy array"""
-        if self.custom_cmap is None:
+        filename = filedialog.askopenfilename(
+            filetypes=[("NumPy arrays", "*.npy"), ("All files", "*.*")],
+            title="Preview on Data"
+        )
+        if not filename:
+            return
+        
+        window = tk.Toplevel(self.root)
+        window.title(f"Data Preview — {filename}")
+        status_var = tk.StringVar(value="Building pyramid…")
+        ttk.Label(window, textvariable=status_var).pack(anchor=tk.W, padx=10, pady=5)
+        
+        # The worker only records progress; Tk is touched from this thread
+        built = []
+        executor = ThreadPoolExecutor(max_workers=1)
+        future = executor.submit(Pyramid, filename, progress=built.append)
+        executor.shutdown(wait=False)
+        state = {'view': None, 'unsubscribe': None, 'poll': None}
+        
+        def lut(pyramid):
+            if not self.colormap.is_complete():
+                return None
+            return self.colormap.compile(256, vmin=pyramid.vmin, vmax=pyramid.vmax)
+        
+        def ready():
+            if not future.done():
+                if built:
+                    status_var.set(f"Building pyramid level {built[-1]}…")
+                state['poll'] = self.root.after(100, ready)
+                return
+            state['poll'] = None
+            try:
+                pyramid = future.result()
+            except (OSError, ValueError) as e:
+                window.destroy()
+                messagebox.showerror("Open Failed", f"Could not open data:\n{e}")
+                return
+            rows, cols = pyramid.shape
+            status_var.set(f"{cols}×{rows}, {pyramid.vmin:g} to {pyramid.vmax:g} — "
+                           "scroll to zoom, drag to pan")
+            kind_var = tk.StringVar(value='mean')
+            kind_frame = ttk.Frame(window)
+            kind_frame.pack(anchor=tk.W, padx=10)
+            for kind in ('mean', 'min'):
+                ttk.Radiobutton(kind_frame, text=f"Downsample by {kind}", value=kind, 
+                               variable=kind_var, 
+                               command=lambda: view.set_kind(kind_var.get())).pack(side=tk.LEFT)
+            view = self.views.DataView(
+                window, pyramid, 
+                on_error=lambda e: status_var.set(f"Could not read data: {e}"))
+            view.pack(padx=10, pady=10)
+            view.set_lut(lut(pyramid))
+            state['view'] = view
+            state['unsubscribe'] = self.watch(
+                self.colormap, f'data_preview_{id(window)}', 
+                lambda: view.set_lut(lut(pyramid)), COLORMAP_FIELDS)
+        
+        def close():
+            if state['poll'] is not None:
+                self.root.after_cancel(state['poll'])
+            if state['unsubscribe'] is not None:
+                state['unsubscribe']()
+            if state['view'] is not None:
+                state['view'].close()
+            window.destroy()
+        
+        window.protocol("WM_DELETE_WINDOW", close)
+        ready()
+    
+    def show_library(self):
+        """Browse a folder of saved colormaps; clicking one loads it
+        
+        Thumbnails come from the on-disk cache; new and changed files are
+        read in the background and appear as they are done.
+        """
+        from colormap_library import SORT_ORDERS, Library
+        
+        directory = filedialog.askdirectory(title="Colormap Library", 
+                                            initialdir=self.library_dir)
+        if not directory:
+            return
+        self.library_dir = directory
+        
+        library = Library(directory)
+        window = tk.Toplevel(self.root)
+        window.title(f"Colormap Library — {directory}")
+        
+        toolbar = ttk.Frame(window)
+        toolbar.pack(fill=tk.X, padx=10, pady=5)
+        ttk.Label(toolbar, text="Search:").pack(side=tk.LEFT)
+        search_var = tk.StringVar()
+        ttk.Entry(toolbar, textvariable=search_var, width=24).pack(side=tk.LEFT, padx=5)
+        ttk.Label(toolbar, text="Sort:").pack(side=tk.LEFT, padx=(10, 0))
+        order_var = tk.StringVar(value='Name')
+        order_box = ttk.Combobox(toolbar, textvariable=order_var, state='readonly',
+                                 values=list(SORT_ORDERS), width=8)
+        order_box.pack(side=tk.LEFT, padx=5)
+        status_var = tk.StringVar()
+        
+        def update_status():
+            status = f"{len(view.entries)} of {len(library.entries)} colormaps"
+            if not library.done:
+                status += f", reading {library.pending}…"
+            if library.errors:
+                status += f", {len(library.errors)} unreadable"
+            status_var.set(status)
+        
+        def select(entry):
+            try:
+                colormap = library.load(entry)
+            except (OSError, ValueError, KeyError) as e:
+                messagebox.showerror("Open Failed", f"Could not open colormap:\n{e}", 
+                                     parent=window)
+                return
+            self.colormap.assign(colormap)
+            status_var.set(f"{entry.path}: {entry.stops} stops, {entry.interpolation}"
+                           f"{', discrete' if entry.discrete else ''}")
+        
+        def refilter(*args):
+            view.set_filter(search_var.get(), order_var.get())
+            update_status()
+        
+        def rescan():
+            view.rescan()
+            update_status()
+        
+        ttk.Button(toolbar, text="🔄 Rescan", command=rescan).pack(side=tk.LEFT, padx=5)
+        ttk.Label(toolbar, textvariable=status_var).pack(side=tk.LEFT, padx=10)
+        view = self.views.LibraryView(window, library, select, on_update=update_status)
+        view.pack(fill=tk.BOTH, expand=True, padx=10, pady=(0, 10))
+        search_var.trace_add('write', refilter)
+        order_box.bind('<<ComboboxSelected>>', refilter)
+        update_status()
+        
+        def close():
+            view.close()
+            window.destroy()
+        
+        window.protocol("WM_DELETE_WINDOW", close)
+    
+    @property
+    def custom_cmap(self):
+        """Matplotlib colormap of the current stops (cached), or None if incomplete"""
+        if not self.colormap.is_complete():
+            return None
+        return self.colormap.to_matplotlib()
+    
+    def save_colormap(self):
+        """Save colormap as a .cmap file"""
+        if not self.colormap.is_complete():
             messagebox.showwarning("No Colormap", 
                                   "Please add at least 2 colors to create a colormap.")
             return
         
         filename = filedialog.asksaveasfilename(
-            defaultextension=".npy",
-            filetypes=[("NumPy files", "*.npy"), ("All files", "*.*")],
+            defaultextension=".cmap",
+            filetypes=[("Colormap files", "*.cmap"), ("All files", "*.*")],
             title="Save Colormap"
         )
         
         if filename:
-            # Save color data as dictionary
-            colormap_data = {
-                'colors': self.colors,
-                'name': 'custom_cmap'
-            }
-            np.save(filename, colormap_data, allow_pickle=True)
-            messagebox.showinfo("Saved", f"Colormap saved to:\n{filename}\n\nLoad with:\ndata = np.load('{filename}', allow_pickle=True).item()")
+            # Stops plus a precompiled 256-entry LUT, no pickle
+            self.colormap.save(filename)
+            messagebox.showinfo("Saved", f"Colormap saved to:\n{filename}\n\nLoad with:\nfrom colormap_engine import load_colormap\ncmap = load_colormap('{filename}')")
+    
+    def open_colormap(self):
+        """Load a saved colormap, replacing the current stops"""
+        filename = filedialog.askopenfilename(
+            filetypes=[("Colormap files", "*.cmap"), 
+                      ("Legacy NumPy colormaps", "*.npy"), ("All files", "*.*")],
+            title="Open Colormap"
+        )
+        if not filename:
+            return
+        
+        try:
+            if filename.endswith('.npy'):
+                # Old pickled format; unpickling runs code, so ask first
+                if not messagebox.askyesno("Legacy Colormap", 
+                                           "This is an old pickled .npy colormap. Only open "
+                                           "files you trust.\n\nOpen it anyway?"):
+                    return
+                colormap = load_legacy_npy(filename)
+            else:
+                colormap = load_colormap(filename)
+        except (OSError, ValueError, KeyError) as e:
+            messagebox.showerror("Open Failed", f"Could not open colormap:\n{e}")
+            return
+        
+        # Replace in place so subscribed views refresh themselves
+        self.colormap.assign(colormap)
+    
+    def import_colormap(self):
+        """Fit a compact stop list to a matplotlib colormap, array, CSV or image"""
+        from colormap_simplify import IMAGE_EXTENSIONS, fit_colormap
+        
+        window = tk.Toplevel(self.root)
+        window.title("Import Colormap")
+        window.transient(self.root)
+        
+        frame = ttk.Frame(window, padding="20")
+        frame.pack(fill=tk.BOTH, expand=True)
+        
+        ttk.Label(frame, text="matplotlib colormap name or file:").pack(anchor=tk.W)
+        source_row = ttk.Frame(frame)
+        source_row.pack(fill=tk.X, pady=5)
+        source_var = tk.StringVar(value='viridis')
+        ttk.Entry(source_row, textvariable=source_var, width=40).pack(side=tk.LEFT, padx=(0, 5))
+        
+        def browse():
+            patterns = ' '.join(f"*{ext}" for ext in IMAGE_EXTENSIONS)
+            filename = filedialog.askopenfilename(
+                parent=window,
+                filetypes=[("Colormap data", f"*.npy *.csv {patterns}"), ("All files", "*.*")],
+                title="Import Colormap"
+            )
+            if filename:
+                source_var.set(filename)
+        
+        ttk.Button(source_row, text="Browse…", command=browse).pack(side=tk.LEFT)
+        
+        tolerance_row = ttk.Frame(frame)
+        tolerance_row.pack(fill=tk.X, pady=5)
+        ttk.Label(tolerance_row, text="Max ΔE (CIEDE2000):").pack(side=tk.LEFT)
+        tolerance_var = tk.DoubleVar(value=1.0)
+        ttk.Spinbox(tolerance_row, from_=0.1, to=10.0, increment=0.1, width=6, 
+                   textvariable=tolerance_var).pack(side=tk.LEFT, padx=5)
+        
+        def fit():
+            source = source_var.get().strip()
+            try:
+                colormap = fit_colormap(source, tolerance_var.get(), self.colormap.interpolation)
+            except (OSError, ValueError, tk.TclError) as e:
+                messagebox.showerror("Import Failed", f"Could not import colormap:\n{e}", 
+                                    parent=window)
+                return
+            self.colormap.assign(colormap)
+            window.destroy()
+            messagebox.showinfo("Imported", 
+                               f"{colormap.metadata['fit_entries']} entries fitted with "
+                               f"{len(colormap)} stops\n(max ΔE "
+                               f"{colormap.metadata['fit_max_delta_e']:.2f})")
+        
+        button_frame = ttk.Frame(frame)
+        button_frame.pack(pady=10)
+        ttk.Button(button_frame, text="✓ Fit & Load", command=fit, width=15).pack(side=tk.LEFT, padx=5)
+        ttk.Button(button_frame, text="✗ Cancel", command=window.destroy, 
+                  width=15).pack(side=tk.LEFT, padx=5)
     
     def save_colormap_image(self):
         """Save colormap preview as image"""
-        if self.custom_cmap is None:
+        if not self.colormap.is_complete():
             messagebox.showwarning("No Colormap", 
                                   "Please add at least 2 colors to create a colormap.")
             return
@@ -698,61 +1240,22 @@ TIP: Center of wheel = white, Edge = vivid colors
         )
         
         if filename:
-            # Create a high-quality figure
-            fig, ax = plt.subplots(figsize=(10, 2))
-            gradient = np.linspace(0, 1, 1000).reshape(1, -1)
-            ax.imshow(gradient, aspect='auto', cmap=self.custom_cmap)
-            ax.set_xticks([])
-            ax.set_yticks([])
-            ax.set_position([0, 0, 1, 1])  # Make axis fill the entire figure
-            ax.axis('off')  # Turn off the axis frame
-
-            plt.savefig(filename, dpi=300, bbox_inches='tight', pad_inches=0)
-            plt.close(fig)
+            if filename.lower().endswith('.png'):
+                # Same 3000x600 pixels as the 10x2 inch, 300 dpi figure,
+                # written straight from the samples
+                export_image(self.colormap, filename, 3000, 600)
+            else:
+                self.colormap.save_image(filename)
             messagebox.showinfo("Saved", f"Colormap image saved to:\n{filename}")
     
     def export_python_code(self):
         """Export colormap as Python code"""
-        if len(self.colors) < 2:
+        if not self.colormap.is_complete():
             messagebox.showwarning("Not Enough Colors", 
                                   "Please add at least 2 colors to create a colormap.")
             return
         
-        # Extract positions and colors
-        positions = [c['position'] for c in self.colors]
-        colors = [c['color'] for c in self.colors]
-        
-        code = f"""# Custom Colormap
-from matplotlib.colors import LinearSegmentedColormap
-import matplotlib.pyplot as plt
-import numpy as np
-
-# Define colors and positions
-colors = {colors}
-positions = {positions}
-
-# Create colormap
-custom_cmap = LinearSegmentedColormap.from_list(
-    'custom_cmap', 
-    list(zip(positions, colors))
-)
-
-# Example usage:
-# Create sample data
-data = np.random.rand(10, 10)
-
-# Plot with custom colormap
-plt.figure(figsize=(8, 6))
-plt.imshow(data, cmap=custom_cmap)
-plt.colorbar(label='Value')
-plt.title('Data with Custom Colormap')
-plt.show()
-
-# You can also use it with other plot types:
-# plt.contourf(X, Y, Z, cmap=custom_cmap)
-# plt.pcolormesh(X, Y, Z, cmap=custom_cmap)
-# plt.scatter(x, y, c=values, cmap=custom_cmap)
-"""
+        code = self.colormap.python_code()
         
         # Ask where to save
         filename = filedialog.asksaveasfilename(
@@ -769,6 +1272,29 @@ plt.show()
             # Show in window if user cancels save
             self.show_code_window(code)
     
+    def export_lut(self):
+        """Export a precompiled 256-entry LUT for other runtimes"""
+        if not self.colormap.is_complete():
+            messagebox.showwarning("Not Enough Colors", 
+                                  "Please add at least 2 colors to create a colormap.")
+            return
+        
+        filename = filedialog.asksaveasfilename(
+            defaultextension=".npy",
+            filetypes=[("NumPy array", "*.npy"), ("C/C++ header", "*.h *.hpp"),
+                      ("GLSL source", "*.glsl"), ("ParaView/VTK XML", "*.xml"),
+                      ("PNG texture", "*.png")],
+            title="Export LUT"
+        )
+        
+        if filename:
+            try:
+                export_lut(self.colormap, filename)
+            except (OSError, ValueError) as e:
+                messagebox.showerror("Export Failed", f"Could not export LUT:\n{e}")
+                return
+            messagebox.showinfo("Saved", f"LUT saved to:\n{filename}")
+    
     def show_code_window(self, code):
         """Show code in a popup window"""
         code_window = tk.Toplevel(self.root)
@@ -812,10 +1338,33 @@ plt.show()
         ttk.Button(button_frame, text="✖ Close", 
                   command=code_window.destroy).pack(side=tk.LEFT, padx=5)
 
+def report_startup(root, marks):
+    """Paint the first frame, then print the time spent in each startup phase"""
+    root.update()
+    marks.append(('first frame', time.perf_counter()))
+    previous = STARTED
+    for name, stamp in marks:
+        print(f"{name:<12} {(stamp - previous) * 1000:8.1f} ms"
+              f"   (total {(stamp - STARTED) * 1000:8.1f} ms)")
+        previous = stamp
+
 def main():
     """Main function to run the application"""
+    parser = argparse.ArgumentParser(description="Interactive Colormap Creator")
+    parser.add_argument('--backend', choices=BACKENDS, default='tk',
+                        help="How the wheel, brightness bar and preview are drawn")
+    parser.add_argument('--startup-profile', action='store_true',
+                        help="Print time to first frame by phase, then exit")
+    args = parser.parse_args()
+    
     root = tk.Tk()
-    app = ColorMapCreator(root)
+    marks = [('imports', IMPORTED), ('tk init', time.perf_counter())]
+    app = ColorMapCreator(root, backend=args.backend)
+    marks.append(('build ui', time.perf_counter()))
+    if args.startup_profile:
+        report_startup(root, marks)
+        root.destroy()
+        return
     root.mainloop()
 
 if __name__ == "__main__":
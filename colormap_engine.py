@@ -0,0 +1,1118 @@
+"""
+Headless Colormap Engine
+Build, sample, save and load colormaps without Tk or pyplot, so batch
+jobs on display-less machines can use the same stops as the GUI
+"""
+
+import colorsys
+import copy
+import hashlib
+import json
+import os
+import struct
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from colormap_spaces import SPACES, interpolate
+
+# Stops closer than this are treated as the same position
+MERGE_TOLERANCE = 0.001
+
+DEFAULT_NAME = 'custom_cmap'
+
+# .cmap file layout, see save_colormap()
+CMAP_MAGIC = b'CMAP'
+CMAP_VERSION = 1
+CMAP_ALIGN = 64
+STOP_DTYPE = np.dtype([('position', '<f8'), ('color', '<f8', (3,))])
+
+# Elements processed per block by CompiledLUT.apply; bounds temporary memory
+APPLY_CHUNK = 1 << 18
+
+# Memory cap for default_cache
+CACHE_MAX_BYTES = 64 * 1024 * 1024
+
+
+def asset_cache_dir():
+    """Per-user directory for pre-rendered assets ($XDG_CACHE_HOME aware)"""
+    base = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(base, 'colormap_creator')
+
+
+class CompiledCache:
+    """Thread-safe LRU cache of compiled tables, bounded by total size in bytes
+
+    Keys are built from Colormap.content_key(), so two colormaps with the
+    same stops and settings share entries no matter how they were edited.
+    """
+
+    def __init__(self, max_bytes=CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, build):
+        """Return the cached value for key, calling build() on a miss"""
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key][0]
+            self.misses += 1
+
+        value = build()
+        nbytes = _nbytes(value)
+        with self._lock:
+            if key not in self._entries:
+                self._entries[key] = (value, nbytes)
+                self.current_bytes += nbytes
+            while self.current_bytes > self.max_bytes and len(self._entries) > 1:
+                _, (_, evicted_bytes) = self._entries.popitem(last=False)
+                self.current_bytes -= evicted_bytes
+        return value
+
+    def clear(self):
+        """Drop all entries and reset the counters"""
+        with self._lock:
+            self._entries.clear()
+            self.current_bytes = 0
+            self.hits = 0
+            self.misses = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def stats(self):
+        """Hit/miss counters and current size"""
+        return {'hits': self.hits, 'misses': self.misses,
+                'entries': len(self._entries), 'bytes': self.current_bytes}
+
+
+def _nbytes(value):
+    """Approximate memory held by a cached value"""
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    if isinstance(value, (CompiledLUT, CompiledPalette)):
+        return value.table_f32.nbytes + value.table_u8.nbytes
+    # matplotlib colormaps: float64 RGBA lookup table plus segment data
+    return getattr(value, 'N', 256) * 4 * 8 * 2
+
+
+default_cache = CompiledCache()
+
+
+class Observable:
+    """Minimal change notification for models shared by several views
+
+    Subscribers are called as callback(changed, info) where changed is the
+    frozenset of field names that changed and info holds event details.
+    A subscriber that names fields is only called when one of them changed.
+    """
+
+    def __init__(self):
+        self._subscribers = []
+
+    def subscribe(self, callback, fields=None):
+        """Register callback; returns a function that unsubscribes it"""
+        entry = (frozenset(fields) if fields else None, callback)
+        self._subscribers.append(entry)
+
+        def unsubscribe():
+            if entry in self._subscribers:
+                self._subscribers.remove(entry)
+        return unsubscribe
+
+    def notify(self, changed, **info):
+        """Call the subscribers interested in any of the changed fields"""
+        changed = frozenset(changed)
+        if not changed:
+            return
+        for fields, callback in list(self._subscribers):
+            if fields is None or fields & changed:
+                callback(changed, info)
+
+    def __getstate__(self):
+        # Subscribers are usually bound to GUI objects; never pickle them
+        state = self.__dict__.copy()
+        state['_subscribers'] = []
+        return state
+
+
+class ColorState(Observable):
+    """Currently selected color, kept as HSV and RGB together
+
+    Fields: 'hue', 'saturation', 'value' and 'rgb'. Setting a component to
+    its current value notifies nobody.
+    """
+
+    def __init__(self, rgb=(1.0, 0.0, 0.0)):
+        super().__init__()
+        self.rgb = tuple(float(c) for c in rgb)
+        self.hue, self.saturation, self.value = colorsys.rgb_to_hsv(*self.rgb)
+
+    @property
+    def hex(self):
+        return '#{:02x}{:02x}{:02x}'.format(*(int(c*255) for c in self.rgb))
+
+    def set_hsv(self, hue=None, saturation=None, value=None):
+        """Change any of hue/saturation/value; RGB follows"""
+        new = {'hue': hue, 'saturation': saturation, 'value': value}
+        changed = {field for field, v in new.items()
+                   if v is not None and float(v) != getattr(self, field)}
+        if not changed:
+            return
+        for field in changed:
+            setattr(self, field, float(new[field]))
+        rgb = colorsys.hsv_to_rgb(self.hue, self.saturation, self.value)
+        if rgb != self.rgb:
+            self.rgb = rgb
+            changed.add('rgb')
+        self.notify(changed)
+
+    def set_rgb(self, rgb):
+        """Set an exact RGB color; HSV follows"""
+        rgb = tuple(float(c) for c in rgb)
+        hsv = colorsys.rgb_to_hsv(*rgb)
+        changed = {field for field, v in zip(('hue', 'saturation', 'value'), hsv)
+                   if v != getattr(self, field)}
+        if rgb != self.rgb:
+            changed.add('rgb')
+        self.rgb = rgb
+        self.hue, self.saturation, self.value = hsv
+        self.notify(changed)
+
+
+class CompiledLUT:
+    """Quantized RGBA lookup table for colorizing large scalar arrays
+
+    The table holds n colormap entries followed by the under, over and bad
+    (NaN) colors, both as float32 and as uint8. apply() maps data to table
+    indices in fixed-size blocks with reused float32/index buffers and writes
+    straight into the output array, so no full-size float64 RGBA temporary is
+    ever allocated (unlike Colormap.__call__ in matplotlib).
+    """
+
+    def __init__(self, rgba, under=None, over=None, bad=(0.0, 0.0, 0.0, 0.0),
+                 vmin=0.0, vmax=1.0):
+        rgba = np.asarray(rgba)
+        rgba = rgba / 255.0 if rgba.dtype == np.uint8 else rgba.astype(float)
+        if rgba.shape[1] == 3:
+            rgba = np.concatenate([rgba, np.ones((len(rgba), 1))], axis=1)
+        self.n = len(rgba)
+        self.i_under, self.i_over, self.i_bad = self.n, self.n + 1, self.n + 2
+
+        table = np.empty((self.n + 3, 4), dtype=np.float32)
+        table[:self.n] = rgba
+        table[self.i_under] = rgba[0] if under is None else _to_rgba(under)
+        table[self.i_over] = rgba[-1] if over is None else _to_rgba(over)
+        table[self.i_bad] = _to_rgba(bad)
+        self.table_f32 = table
+        self.table_u8 = np.round(table * 255).astype(np.uint8)
+        self._tables = {}
+        self.set_norm(vmin, vmax)
+
+    def with_norm(self, vmin, vmax):
+        """Copy sharing this table but normalizing over [vmin, vmax]"""
+        lut = copy.copy(self)
+        lut.set_norm(vmin, vmax)
+        return lut
+
+    def set_norm(self, vmin, vmax):
+        """Precompute the linear data -> index transform for [vmin, vmax]"""
+        if not vmax > vmin:
+            raise ValueError("vmax must be greater than vmin")
+        self.vmin, self.vmax = float(vmin), float(vmax)
+        self._scale = self.n / (self.vmax - self.vmin)
+
+    def table(self, dtype=np.uint8, alpha=True):
+        """Contiguous (n + 3, 4 or 3) table in the requested dtype"""
+        key = (np.dtype(dtype), alpha)
+        if key not in self._tables:
+            base = self.table_u8 if key[0] == np.uint8 else self.table_f32
+            self._tables[key] = np.ascontiguousarray(base if alpha else base[:, :3])
+        return self._tables[key]
+
+    def indices(self, data, out=None, chunk_size=APPLY_CHUNK):
+        """Table index for every element of data (intp array of data's shape)"""
+        data = np.asarray(data)
+        if out is None:
+            out = np.empty(data.shape, dtype=np.intp)
+        flat_in = data.reshape(-1)
+        flat_out = out.reshape(-1)
+        buf = np.empty(min(chunk_size, flat_in.size), dtype=np.float32)
+        wide = _wide_buffer(data.dtype, len(buf))
+        for start in range(0, flat_in.size, chunk_size):
+            stop = min(start + chunk_size, flat_in.size)
+            self._indices_block(flat_in[start:stop], buf[:stop - start],
+                                flat_out[start:stop], wide)
+        return out
+
+    def apply(self, data, out=None, dtype=np.uint8, alpha=True,
+              chunk_size=APPLY_CHUNK):
+        """Colorize data into out (shape data.shape + (4 or 3,), C-contiguous)
+
+        out is allocated when omitted; dtype is uint8 (0-255) or float32 (0-1).
+        """
+        data = np.asarray(data)
+        table = self.table(dtype, alpha)
+        channels = table.shape[1]
+        if out is None:
+            out = np.empty(data.shape + (channels,), dtype=table.dtype)
+        elif (out.shape != data.shape + (channels,) or out.dtype != table.dtype
+              or not out.flags.c_contiguous):
+            raise ValueError(f"out must be a C-contiguous {table.dtype} array "
+                             f"of shape {data.shape + (channels,)}")
+
+        flat_in = data.reshape(-1)
+        flat_out = out.reshape(-1, channels)
+        size = flat_in.size
+        buf = np.empty(min(chunk_size, size), dtype=np.float32)
+        idx = np.empty(min(chunk_size, size), dtype=np.intp)
+        wide = _wide_buffer(data.dtype, len(buf))
+        for start in range(0, size, chunk_size):
+            stop = min(start + chunk_size, size)
+            block_idx = idx[:stop - start]
+            self._indices_block(flat_in[start:stop], buf[:stop - start], block_idx, wide)
+            np.take(table, block_idx, axis=0, out=flat_out[start:stop])
+        return out
+
+    def _indices_block(self, block, buf, idx, wide=None):
+        """Fill idx with table indices for one block, using buf (and wide) as scratch"""
+        # index = (data - vmin) * n / (vmax - vmin). vmin is subtracted before
+        # scaling and in the data's own precision (float64 in wide, when given),
+        # so narrow windows at large magnitudes keep every table entry
+        if wide is None:
+            np.subtract(block, self.vmin, out=buf, dtype=np.float32, casting='unsafe')
+            buf *= np.float32(self._scale)
+        else:
+            wide = wide[:len(block)]
+            np.subtract(block, self.vmin, out=wide, dtype=np.float64, casting='unsafe')
+            np.multiply(wide, self._scale, out=buf, casting='unsafe')
+
+        bad = np.isnan(buf) if block.dtype.kind in 'fc' else None
+        under = buf < 0
+        # vmax itself maps to the last entry, like matplotlib
+        over = buf > self.n
+        if bad is not None:
+            np.putmask(buf, bad, 0)
+        np.clip(buf, 0, self.n - 1, out=buf)
+        idx[...] = buf
+
+        if under.any():
+            np.putmask(idx, under, self.i_under)
+        if over.any():
+            np.putmask(idx, over, self.i_over)
+        if bad is not None and bad.any():
+            np.putmask(idx, bad, self.i_bad)
+
+
+def _wide_buffer(dtype, size):
+    """float64 scratch for data float32 cannot hold exactly (float64, 32/64-bit ints)"""
+    if np.result_type(dtype, np.float32) == np.float32:
+        return None
+    return np.empty(size, dtype=np.float64)
+
+
+class CompiledPalette:
+    """RGBA band colors of a discrete colormap, for integer class arrays
+
+    apply() maps class indices straight to colors with one np.take into the
+    palette: no float normalization, no index arithmetic. Out-of-range
+    classes get the bad color; for uint8/uint16 data the palette is padded
+    with bad rows to cover every possible value, so not even a range check
+    is needed.
+    """
+
+    def __init__(self, colors, bad=(0.0, 0.0, 0.0, 0.0)):
+        colors = np.asarray(colors)
+        colors = colors / 255.0 if colors.dtype == np.uint8 else colors.astype(float)
+        if colors.shape[1] == 3:
+            colors = np.concatenate([colors, np.ones((len(colors), 1))], axis=1)
+        self.n = len(colors)
+        self.i_bad = self.n
+        table = np.empty((self.n + 1, 4), dtype=np.float32)
+        table[:self.n] = colors
+        table[self.i_bad] = _to_rgba(bad)
+        self.table_f32 = table
+        self.table_u8 = np.round(table * 255).astype(np.uint8)
+        self._tables = {}
+
+    def table(self, dtype=np.uint8, alpha=True, rows=None):
+        """Contiguous (n + 1, 4 or 3) table, or padded/cut to rows entries"""
+        key = (np.dtype(dtype), alpha, rows)
+        if key not in self._tables:
+            base = self.table_u8 if key[0] == np.uint8 else self.table_f32
+            base = base if alpha else base[:, :3]
+            if rows is not None:
+                padded = np.repeat(base[self.i_bad:], rows, axis=0)
+                count = min(rows, self.n)
+                padded[:count] = base[:count]
+                base = padded
+            self._tables[key] = np.ascontiguousarray(base)
+        return self._tables[key]
+
+    def apply(self, labels, out=None, dtype=np.uint8, alpha=True):
+        """Colorize integer labels into out (shape labels.shape + (4 or 3,))"""
+        labels = np.asarray(labels)
+        if labels.dtype.kind not in 'iu':
+            raise TypeError("Class arrays must have an integer dtype")
+        small = labels.dtype in (np.uint8, np.uint16)
+        table = self.table(dtype, alpha, 1 << (8 * labels.dtype.itemsize) if small else None)
+        channels = table.shape[1]
+        if out is None:
+            out = np.empty(labels.shape + (channels,), dtype=table.dtype)
+        elif (out.shape != labels.shape + (channels,) or out.dtype != table.dtype
+              or not out.flags.c_contiguous):
+            raise ValueError(f"out must be a C-contiguous {table.dtype} array "
+                             f"of shape {labels.shape + (channels,)}")
+
+        # mode='clip' writes straight into out ('raise' would buffer it)
+        np.take(table, labels, axis=0, out=out, mode='clip')
+        if not small:
+            invalid = (labels < 0) | (labels >= self.n)
+            if invalid.any():
+                out[invalid] = table[self.i_bad]
+        return out
+
+
+def _check_space(space):
+    if space not in SPACES:
+        raise ValueError(f"Unknown interpolation space {space!r}, "
+                         f"expected one of {', '.join(SPACES)}")
+    return space
+
+
+def _to_rgba(color):
+    """Normalize an RGB or RGBA tuple to 4 floats"""
+    color = tuple(float(c) for c in color)
+    return color + (1.0,) if len(color) == 3 else color
+
+
+class StopStore:
+    """Array-backed stop container kept sorted by position
+
+    Positions (n,) and colors (n, 3) live in preallocated float64 buffers
+    that grow geometrically, so single inserts cost a binary search plus one
+    memmove and the live views can be handed to NumPy without copying.
+    """
+
+    def __init__(self, capacity=8):
+        self._positions = np.empty(capacity)
+        self._colors = np.empty((capacity, 3))
+        self._size = 0
+
+    @classmethod
+    def from_arrays(cls, positions, colors):
+        """Store holding copies of the given stops, sorted by position (stable)"""
+        positions = np.asarray(positions, dtype=float).reshape(-1)
+        colors = np.asarray(colors, dtype=float).reshape(-1, 3)
+        if len(positions) != len(colors):
+            raise ValueError("positions and colors must have the same length")
+        order = np.argsort(positions, kind='stable')
+        store = cls(max(8, len(positions)))
+        store._size = len(positions)
+        store._positions[:store._size] = positions[order]
+        store._colors[:store._size] = colors[order]
+        return store
+
+    def __len__(self):
+        return self._size
+
+    @property
+    def positions(self):
+        """Contiguous view of the sorted positions"""
+        return self._positions[:self._size]
+
+    @property
+    def colors(self):
+        """Contiguous (n, 3) view of the colors, in position order"""
+        return self._colors[:self._size]
+
+    def nearest(self, position):
+        """(index, distance) of the stop closest to position, or (None, inf)"""
+        if not self._size:
+            return None, np.inf
+        positions = self.positions
+        idx = int(np.searchsorted(positions, position))
+        candidates = [i for i in (idx - 1, idx) if 0 <= i < self._size]
+        best = min(candidates, key=lambda i: abs(positions[i] - position))
+        return best, abs(float(positions[best]) - position)
+
+    def find(self, position, tolerance=MERGE_TOLERANCE):
+        """Index of the nearest stop within tolerance of position, or None"""
+        idx, distance = self.nearest(position)
+        return idx if distance < tolerance else None
+
+    def insert(self, position, color):
+        """Insert a stop after any equal positions; returns its index"""
+        self._reserve(self._size + 1)
+        idx = int(np.searchsorted(self.positions, position, side='right'))
+        n = self._size
+        # Overlapping slice assignment is handled as a memmove by NumPy
+        self._positions[idx + 1:n + 1] = self._positions[idx:n]
+        self._colors[idx + 1:n + 1] = self._colors[idx:n]
+        self._positions[idx] = position
+        self._colors[idx] = color
+        self._size += 1
+        return idx
+
+    def insert_many(self, positions, colors, tolerance=MERGE_TOLERANCE):
+        """Bulk insert with tolerance merging
+
+        New stops within tolerance of an existing one replace its color;
+        close new stops among themselves keep the last one. Returns the
+        number of stops that were merged instead of added.
+        """
+        positions = np.asarray(positions, dtype=float).reshape(-1)
+        colors = np.asarray(colors, dtype=float).reshape(-1, 3)
+        if not len(positions):
+            return 0
+        order = np.argsort(positions, kind='stable')
+        positions, colors = positions[order], colors[order]
+
+        # Collapse runs of new stops closer than tolerance, keeping the last
+        keep = np.ones(len(positions), dtype=bool)
+        keep[:-1] = np.diff(positions) >= tolerance
+        merged = int(len(positions) - keep.sum())
+        positions, colors = positions[keep], colors[keep]
+
+        # Nearest existing stop for every new one, by binary search
+        if self._size:
+            existing = self.positions
+            right = np.clip(np.searchsorted(existing, positions), 0, self._size - 1)
+            left = np.clip(right - 1, 0, self._size - 1)
+            use_left = np.abs(existing[left] - positions) <= np.abs(existing[right] - positions)
+            nearest = np.where(use_left, left, right)
+            close = np.abs(existing[nearest] - positions) < tolerance
+            self.colors[nearest[close]] = colors[close]
+            merged += int(close.sum())
+            positions, colors = positions[~close], colors[~close]
+
+        if len(positions):
+            all_positions = np.concatenate([self.positions, positions])
+            all_colors = np.concatenate([self.colors, colors])
+            order = np.argsort(all_positions, kind='stable')
+            self._reserve(len(all_positions))
+            self._size = len(all_positions)
+            self._positions[:self._size] = all_positions[order]
+            self._colors[:self._size] = all_colors[order]
+        return merged
+
+    def remove(self, idx):
+        """Remove the stop at idx"""
+        if idx < 0:
+            idx += self._size
+        if not 0 <= idx < self._size:
+            raise IndexError("stop index out of range")
+        n = self._size
+        self._positions[idx:n - 1] = self._positions[idx + 1:n]
+        self._colors[idx:n - 1] = self._colors[idx + 1:n]
+        self._size -= 1
+
+    def remove_many(self, indices):
+        """Remove the stops at the given indices in one pass"""
+        keep = np.ones(self._size, dtype=bool)
+        keep[np.asarray(indices, dtype=np.intp)] = False
+        n = int(keep.sum())
+        self._positions[:n] = self.positions[keep]
+        self._colors[:n] = self.colors[keep]
+        self._size = n
+
+    def clear(self):
+        """Remove all stops (capacity is kept)"""
+        self._size = 0
+
+    def _reserve(self, size):
+        if size <= len(self._positions):
+            return
+        capacity = max(size, 2 * len(self._positions))
+        positions = np.empty(capacity)
+        colors = np.empty((capacity, 3))
+        positions[:self._size] = self.positions
+        colors[:self._size] = self.colors
+        self._positions, self._colors = positions, colors
+
+
+class Colormap(Observable):
+    """Piecewise-linear colormap defined by (position, RGB) stops sorted by position
+
+    Stops are interpolated in the color space named by interpolation (see
+    colormap_spaces.SPACES). Edits notify subscribers with the 'stops' field
+    and info describing the diff: op 'insert', 'remove' or 'change' with an
+    index, 'move' with index and new_index, or 'reset' for bulk changes.
+    Changing the space notifies 'interpolation'.
+
+    A colormap can also be discrete (see set_discrete()): N equal bands,
+    bands between explicit boundaries, or hard steps at the stops. Sampling,
+    LUTs and exports then hold one flat color per band, and changes notify
+    'discrete'.
+    """
+
+    def __init__(self, stops=(), name=DEFAULT_NAME, interpolation='srgb'):
+        super().__init__()
+        self.name = name
+        self.interpolation = _check_space(interpolation)
+        self.bands = None
+        self.boundaries = None
+        self.hard_steps = False
+        # Free-form JSON-serializable info carried through save/load
+        self.metadata = {}
+        self.store = StopStore()
+        for position, color in stops:
+            self.add_stop(position, color)
+
+    @classmethod
+    def from_arrays(cls, positions, colors, name=DEFAULT_NAME, interpolation='srgb'):
+        """Build a colormap from parallel position (N,) and RGB (N, 3) arrays"""
+        cmap = cls(name=name, interpolation=interpolation)
+        cmap.store = StopStore.from_arrays(positions, colors)
+        return cmap
+
+    @property
+    def positions(self):
+        """Sorted stop positions (a live view into the store)"""
+        return self.store.positions
+
+    @property
+    def colors(self):
+        """Stop colors as an (n, 3) array (a live view into the store)"""
+        return self.store.colors
+
+    def __len__(self):
+        return len(self.store)
+
+    def copy(self):
+        """Return an independent copy of this colormap"""
+        cmap = Colormap.from_arrays(self.positions, self.colors, self.name,
+                                    self.interpolation)
+        cmap.metadata = dict(self.metadata)
+        cmap.set_discrete(**self.discrete_settings())
+        return cmap
+
+    def stop(self, idx):
+        """Return (position, (r, g, b)) for the stop at idx"""
+        return float(self.positions[idx]), tuple(float(c) for c in self.colors[idx])
+
+    def stops(self):
+        """Return all stops as a list of (position, (r, g, b)) tuples"""
+        return [self.stop(i) for i in range(len(self))]
+
+    def find_stop(self, position, tolerance=MERGE_TOLERANCE):
+        """Index of the nearest stop within tolerance of position, or None"""
+        return self.store.find(position, tolerance)
+
+    def add_stop(self, position, color, tolerance=MERGE_TOLERANCE):
+        """Insert a stop, replacing the color of one already at this position
+
+        Returns (index, replaced).
+        """
+        color = np.asarray(color, dtype=float).reshape(3)
+        idx = self.store.find(position, tolerance)
+        if idx is not None:
+            self.colors[idx] = color
+            self.notify({'stops'}, op='change', index=idx)
+            return idx, True
+        idx = self.store.insert(position, color)
+        self.notify({'stops'}, op='insert', index=idx)
+        return idx, False
+
+    def add_stops(self, positions, colors, tolerance=MERGE_TOLERANCE):
+        """Bulk add_stop() for arrays of stops; returns how many were merged"""
+        merged = self.store.insert_many(positions, colors, tolerance)
+        self.notify({'stops'}, op='reset')
+        return merged
+
+    def remove_stop(self, idx):
+        """Remove the stop at idx"""
+        idx = range(len(self))[idx]
+        self.store.remove(idx)
+        self.notify({'stops'}, op='remove', index=idx)
+
+    def remove_stops(self, indices):
+        """Remove several stops at once"""
+        self.store.remove_many(indices)
+        self.notify({'stops'}, op='reset')
+
+    def clear(self):
+        """Remove all stops"""
+        self.store.clear()
+        self.notify({'stops'}, op='reset')
+
+    def assign(self, other):
+        """Replace stops, name, settings and metadata with a copy of another colormap's"""
+        self.store = StopStore.from_arrays(other.positions, other.colors)
+        self.name = other.name
+        self.interpolation = other.interpolation
+        self.bands, self.boundaries, self.hard_steps = (
+            other.bands, other.boundaries, other.hard_steps)
+        self.metadata = dict(other.metadata)
+        self.notify({'stops', 'name', 'interpolation', 'discrete'}, op='reset')
+
+    def set_interpolation(self, space):
+        """Interpolate stops in another color space"""
+        space = _check_space(space)
+        if space != self.interpolation:
+            self.interpolation = space
+            self.notify({'interpolation'})
+
+    def set_discrete(self, bands=None, boundaries=None, hard_steps=False):
+        """Make the colormap discrete, or continuous again with no arguments
+
+        bands splits [0, 1] into that many equal bands; boundaries gives the
+        band edges explicitly (increasing positions from 0 to 1). Band colors
+        are the continuous colormap at each band's center. With hard_steps,
+        the stops themselves are the bands instead: each stop's color holds
+        until the next stop (and from the last stop to 1.0).
+        """
+        if sum((bands is not None, boundaries is not None, bool(hard_steps))) > 1:
+            raise ValueError("Use only one of bands, boundaries and hard_steps")
+        if bands is not None:
+            bands = int(bands)
+            if bands < 1:
+                raise ValueError("A discrete colormap needs at least 1 band")
+        if boundaries is not None:
+            boundaries = tuple(float(b) for b in boundaries)
+            if (len(boundaries) < 2 or boundaries[0] != 0.0 or boundaries[-1] != 1.0
+                    or any(low >= high for low, high in zip(boundaries, boundaries[1:]))):
+                raise ValueError("Boundaries must increase from 0.0 to 1.0")
+        hard_steps = bool(hard_steps)
+        if (bands, boundaries, hard_steps) != (self.bands, self.boundaries, self.hard_steps):
+            self.bands, self.boundaries, self.hard_steps = bands, boundaries, hard_steps
+            self.notify({'discrete'})
+
+    def discrete_settings(self):
+        """Keyword arguments for set_discrete() that reproduce this colormap's mode"""
+        return {'bands': self.bands, 'boundaries': self.boundaries,
+                'hard_steps': self.hard_steps}
+
+    @property
+    def is_discrete(self):
+        return self.bands is not None or self.boundaries is not None or self.hard_steps
+
+    def palette(self):
+        """Band edges (N + 1,) and colors (N, 3) of a discrete colormap"""
+        if not self.is_discrete:
+            raise ValueError("The colormap is continuous; see set_discrete()")
+        if self.hard_steps:
+            positions, colors = self.anchored_stops()
+            # A stop at 1.0 closes the last band instead of starting an empty one
+            keep = np.diff(positions) > 0
+            return np.append(positions[:-1][keep], 1.0), colors[:-1][keep]
+        if self.boundaries is not None:
+            edges = np.array(self.boundaries)
+        else:
+            edges = np.linspace(0.0, 1.0, self.bands + 1)
+        positions, colors = self.anchored_stops()
+        centers = (edges[:-1] + edges[1:]) / 2
+        return edges, interpolate(positions, colors, centers, self.interpolation)
+
+    def set_color(self, idx, color):
+        """Change the color of the stop at idx"""
+        idx = range(len(self))[idx]
+        self.colors[idx] = np.asarray(color, dtype=float).reshape(3)
+        self.notify({'stops'}, op='change', index=idx)
+
+    def set_position(self, idx, position):
+        """Move the stop at idx, keeping stops sorted; returns its new index"""
+        idx = range(len(self))[idx]
+        color = self.colors[idx].copy()
+        self.store.remove(idx)
+        new_idx = self.store.insert(position, color)
+        self.notify({'stops'}, op='move', index=idx, new_index=new_idx)
+        return new_idx
+
+    def is_complete(self):
+        """True once there are enough stops to build a colormap"""
+        return len(self) >= 2
+
+    def anchored_stops(self):
+        """Positions and colors extended so they start at 0 and end at 1
+
+        The first and last colors are held constant out to the ends, which is
+        what sample() does and what LinearSegmentedColormap requires.
+        """
+        if not self.is_complete():
+            raise ValueError("At least 2 colors are needed to create a colormap")
+        positions, colors = self.positions, self.colors
+        if positions[0] > 0.0:
+            positions = np.concatenate([[0.0], positions])
+            colors = np.concatenate([colors[:1], colors])
+        if positions[-1] < 1.0:
+            positions = np.concatenate([positions, [1.0]])
+            colors = np.concatenate([colors, colors[-1:]])
+        return positions, colors
+
+    def settings_key(self):
+        """Settings besides the stops that change compiled output"""
+        return (self.interpolation, self.bands, self.boundaries, self.hard_steps)
+
+    def content_key(self):
+        """Digest of the stops and settings, used as the compiled-cache key"""
+        digest = hashlib.sha1()
+        digest.update(np.ascontiguousarray(self.positions, dtype='<f8').tobytes())
+        digest.update(np.ascontiguousarray(self.colors, dtype='<f8').tobytes())
+        digest.update(repr(self.settings_key()).encode('utf-8'))
+        return digest.hexdigest()
+
+    def sample(self, n=256, cache=None):
+        """Sample the colormap at n evenly spaced points, returns (n, 3) floats
+
+        The result is cached and shared, so it is read-only.
+        """
+        cache = default_cache if cache is None else cache
+        return cache.get((self.content_key(), 'sample', n), lambda: self._sample(n))
+
+    def _sample(self, n):
+        x = np.linspace(0.0, 1.0, n)
+        if self.is_discrete:
+            edges, colors = self.palette()
+            band = np.clip(np.searchsorted(edges, x, 'right') - 1, 0, len(colors) - 1)
+            samples = colors[band]
+        else:
+            positions, colors = self.anchored_stops()
+            samples = interpolate(positions, colors, x, self.interpolation)
+        samples.flags.writeable = False
+        return samples
+
+    def compile(self, n=256, under=None, over=None, bad=(0.0, 0.0, 0.0, 0.0),
+                vmin=0.0, vmax=1.0, cache=None):
+        """Quantize the colormap into an n-entry CompiledLUT for apply()
+
+        Tables come from the compiled cache; the returned object is a private
+        copy with its own normalization.
+        """
+        cache = default_cache if cache is None else cache
+        # Normalized so lists work and (r, g, b) shares entries with (r, g, b, 1)
+        under = None if under is None else _to_rgba(under)
+        over = None if over is None else _to_rgba(over)
+        bad = _to_rgba(bad)
+        key = (self.content_key(), 'lut', n, under, over, bad)
+        lut = cache.get(key, lambda: CompiledLUT(self.sample(n, cache), under=under,
+                                                 over=over, bad=bad))
+        return lut.with_norm(vmin, vmax)
+
+    def compile_palette(self, bad=(0.0, 0.0, 0.0, 0.0), cache=None):
+        """CompiledPalette of a discrete colormap's band colors for class arrays"""
+        cache = default_cache if cache is None else cache
+        bad = _to_rgba(bad)  # Hashable, and (r, g, b) shares the (r, g, b, 1) entry
+        key = (self.content_key(), 'palette', bad)
+        return cache.get(key, lambda: CompiledPalette(self.palette()[1], bad=bad))
+
+    def to_matplotlib(self, n=256, cache=None):
+        """Equivalent matplotlib LinearSegmentedColormap
+
+        The object is cached and shared between identical colormaps, so copy()
+        it before changing its under/over/bad colors.
+        """
+        cache = default_cache if cache is None else cache
+        key = (self.content_key(), 'matplotlib', n, self.name)
+        return cache.get(key, lambda: self._to_matplotlib(n))
+
+    def _to_matplotlib(self, n):
+        from matplotlib.colors import LinearSegmentedColormap
+
+        if self.is_discrete:
+            # Steps: each edge jumps from the band below to the band above,
+            # which is exact for uneven bands under a plain Normalize
+            edges, colors = self.palette()
+            below = np.concatenate([colors[:1], colors])
+            above = np.concatenate([colors, colors[-1:]])
+            segmentdata = {
+                channel: np.column_stack([edges, below[:, c], above[:, c]])
+                for c, channel in enumerate(('red', 'green', 'blue'))
+            }
+            return LinearSegmentedColormap(self.name, segmentdata, N=n)
+
+        # Same segment data from_list() would build, without per-stop tuples;
+        # other spaces are not linear in RGB, so use the dense samples instead
+        if self.interpolation == 'srgb':
+            positions, colors = self.anchored_stops()
+        else:
+            positions, colors = np.linspace(0.0, 1.0, n), self.sample(n)
+        segmentdata = {
+            channel: np.column_stack([positions, colors[:, c], colors[:, c]])
+            for c, channel in enumerate(('red', 'green', 'blue'))
+        }
+        return LinearSegmentedColormap(self.name, segmentdata, N=n)
+
+    def to_listed(self, vmin=0.0, vmax=1.0):
+        """matplotlib (ListedColormap, BoundaryNorm) pair of a discrete colormap
+
+        The norm's boundaries are the band edges scaled onto [vmin, vmax].
+        """
+        from matplotlib.colors import BoundaryNorm, ListedColormap
+
+        edges, colors = self.palette()
+        cmap = ListedColormap(colors, name=self.name)
+        return cmap, BoundaryNorm(vmin + edges * (vmax - vmin), len(colors))
+
+    def to_dict(self):
+        """Plain-Python representation (the format written by save())"""
+        return {
+            'colors': [{'position': position, 'color': color}
+                       for position, color in self.stops()],
+            'name': self.name,
+            'interpolation': self.interpolation,
+            **self._discrete_fields(),
+        }
+
+    def _discrete_fields(self):
+        """The discrete settings that are set, for dicts and file headers"""
+        return {key: list(value) if key == 'boundaries' else value
+                for key, value in self.discrete_settings().items() if value}
+
+    @classmethod
+    def from_dict(cls, data):
+        """Inverse of to_dict()"""
+        cmap = cls.from_arrays(
+            [c['position'] for c in data['colors']],
+            [c['color'] for c in data['colors']],
+            name=data.get('name', DEFAULT_NAME),
+            interpolation=data.get('interpolation', 'srgb'),
+        )
+        cmap.set_discrete(data.get('bands'), data.get('boundaries'),
+                          data.get('hard_steps', False))
+        return cmap
+
+    def stop_table(self):
+        """Stops as a structured STOP_DTYPE array (position, color)"""
+        table = np.empty(len(self), dtype=STOP_DTYPE)
+        table['position'] = self.positions
+        table['color'] = self.colors
+        return table
+
+    def save(self, filename, lut_size=256, metadata=None):
+        """Save as a .cmap file, see save_colormap()"""
+        save_colormap(self, filename, lut_size, metadata)
+
+    @classmethod
+    def load(cls, filename, mmap=True):
+        """Load a .cmap file, see load_colormap()"""
+        return load_colormap(filename, mmap)
+
+    def save_image(self, filename, figsize=(10, 2), dpi=300):
+        """Save the gradient as an image; format follows the file extension"""
+        # A bare Figure (not pyplot) keeps no global state and needs no display
+        from matplotlib.figure import Figure
+
+        fig = Figure(figsize=figsize)
+        ax = fig.add_axes([0, 0, 1, 1])  # Make axis fill the entire figure
+        gradient = np.linspace(0, 1, 1000).reshape(1, -1)
+        ax.imshow(gradient, aspect='auto', cmap=self.to_matplotlib())
+        ax.axis('off')
+        fig.savefig(filename, dpi=dpi, bbox_inches='tight', pad_inches=0)
+
+    def python_code(self, vmin=0.0, vmax=1.0):
+        """Python source that recreates this colormap with matplotlib
+
+        Discrete colormaps become a ListedColormap and a BoundaryNorm whose
+        boundaries are the band edges scaled onto [vmin, vmax].
+        """
+        if self.is_discrete:
+            return self._listed_code(vmin, vmax)
+        if self.interpolation == 'srgb':
+            positions, colors = self.anchored_stops()
+            source = "Define colors and positions"
+        else:
+            # matplotlib only interpolates in sRGB, so ship the dense samples
+            positions, colors = np.linspace(0.0, 1.0, 256), self.sample(256)
+            source = f"Colors sampled from {self.interpolation} interpolation of the stops"
+        positions = np.round(positions, 6).tolist()
+        colors = [tuple(c) for c in np.round(colors, 6).tolist()]
+
+        return f"""# Custom Colormap
+from matplotlib.colors import LinearSegmentedColormap
+import matplotlib.pyplot as plt
+import numpy as np
+
+# {source}
+colors = {colors}
+positions = {positions}
+
+# Create colormap
+custom_cmap = LinearSegmentedColormap.from_list(
+    {self.name!r},
+    list(zip(positions, colors))
+)
+
+# Example usage:
+# Create sample data
+data = np.random.rand(10, 10)
+
+# Plot with custom colormap
+plt.figure(figsize=(8, 6))
+plt.imshow(data, cmap=custom_cmap)
+plt.colorbar(label='Value')
+plt.title('Data with Custom Colormap')
+plt.show()
+
+# You can also use it with other plot types:
+# plt.contourf(X, Y, Z, cmap=custom_cmap)
+# plt.pcolormesh(X, Y, Z, cmap=custom_cmap)
+# plt.scatter(x, y, c=values, cmap=custom_cmap)
+"""
+
+
+    def _listed_code(self, vmin, vmax):
+        edges, colors = self.palette()
+        boundaries = np.round(vmin + edges * (vmax - vmin), 6).tolist()
+        colors = [tuple(c) for c in np.round(colors, 6).tolist()]
+
+        return f"""# Custom Discrete Colormap
+from matplotlib.colors import ListedColormap, BoundaryNorm
+import matplotlib.pyplot as plt
+import numpy as np
+
+# One color per band, and the band edges in data units
+colors = {colors}
+boundaries = {boundaries}
+
+# Create colormap and norm
+custom_cmap = ListedColormap(colors, name={self.name!r})
+norm = BoundaryNorm(boundaries, custom_cmap.N)
+
+# Example usage:
+# Create sample data
+data = np.random.uniform({vmin!r}, {vmax!r}, (10, 10))
+
+# Plot with custom colormap and norm
+plt.figure(figsize=(8, 6))
+plt.imshow(data, cmap=custom_cmap, norm=norm)
+plt.colorbar(label='Value')
+plt.title('Data with Custom Discrete Colormap')
+plt.show()
+"""
+
+def _align(offset):
+    return -(-offset // CMAP_ALIGN) * CMAP_ALIGN
+
+
+def save_colormap(cmap, filename, lut_size=256, metadata=None):
+    """Write a colormap to the pickle-free .cmap binary format
+
+    Layout (all integers little-endian):
+
+    - bytes 0-3: magic b'CMAP'
+    - bytes 4-5: uint16 format version (1); bytes 6-7: reserved, zero
+    - bytes 8-11: uint32 length of the JSON header that follows
+    - JSON header (UTF-8): name, interpolation space, discrete settings
+      (bands, boundaries or hard_steps, when set), metadata, and the
+      offset/length of each array section below, padded with spaces to a
+      64-byte boundary
+    - stop table: STOP_DTYPE records, position float64 then RGB float64[3]
+    - LUT: uint8 (lut_size, 4) RGBA, the sampled colormap ready for use
+
+    Array sections start on 64-byte boundaries so load_colormap() can
+    memory-map them directly.
+    """
+    stops = cmap.stop_table()
+    lut = cmap.compile(lut_size).table_u8[:lut_size] if cmap.is_complete() else \
+        np.zeros((0, 4), dtype=np.uint8)
+
+    header = {
+        'name': cmap.name,
+        'interpolation': cmap.interpolation,
+        **cmap._discrete_fields(),
+        'metadata': cmap.metadata if metadata is None else metadata,
+        'stops': {'offset': 0, 'count': len(stops)},
+        'lut': {'offset': 0, 'size': len(lut)},
+    }
+    # Offsets depend on the header length, which depends on the offsets;
+    # reserve a fixed width for them so one pass is enough
+    for section in ('stops', 'lut'):
+        header[section]['offset'] = 10 ** 15
+    header_len = len(json.dumps(header).encode('utf-8'))
+    data_start = _align(12 + header_len)
+    header['stops']['offset'] = data_start
+    header['lut']['offset'] = _align(data_start + stops.nbytes)
+    header_bytes = json.dumps(header).encode('utf-8')
+    header_bytes += b' ' * (data_start - 12 - len(header_bytes))
+
+    with open(filename, 'wb') as f:
+        f.write(CMAP_MAGIC + struct.pack('<HHI', CMAP_VERSION, 0, len(header_bytes)))
+        f.write(header_bytes)
+        f.write(stops.tobytes())
+        f.write(b'\0' * (header['lut']['offset'] - data_start - stops.nbytes))
+        f.write(np.ascontiguousarray(lut).tobytes())
+
+
+def read_cmap_header(filename):
+    """Parse and validate the JSON header of a .cmap file"""
+    with open(filename, 'rb') as f:
+        prefix = f.read(12)
+        if len(prefix) < 12 or prefix[:4] != CMAP_MAGIC:
+            raise ValueError(f"{filename} is not a .cmap file")
+        version, _, header_len = struct.unpack('<HHI', prefix[4:])
+        if version != CMAP_VERSION:
+            raise ValueError(f"Unsupported .cmap version {version}")
+        try:
+            header = json.loads(f.read(header_len).decode('utf-8'))
+        except UnicodeDecodeError as e:
+            raise ValueError(f"{filename} has a corrupt header: {e}") from None
+    # Everything the loaders index, so corrupt files fail here with ValueError
+    sections = {'stops': ('offset', 'count'), 'lut': ('offset', 'size')}
+    if (not isinstance(header, dict) or not isinstance(header.get('name'), str)
+            or any(not isinstance(header.get(section), dict)
+                   or any(type(header[section].get(field)) is not int
+                          or header[section][field] < 0 for field in fields)
+                   for section, fields in sections.items())):
+        raise ValueError(f"{filename} has a corrupt header")
+    return header
+
+
+def _read_section(filename, dtype, offset, shape, mmap):
+    if not np.prod(shape):
+        return np.zeros(shape, dtype=dtype)
+    if mmap:
+        # Copy-on-write: edits stay in memory and never touch the file
+        return np.memmap(filename, dtype=dtype, mode='c', offset=offset, shape=shape)
+    with open(filename, 'rb') as f:
+        f.seek(offset)
+        return np.fromfile(f, dtype=dtype, count=int(np.prod(shape))).reshape(shape)
+
+
+def load_colormap(filename, mmap=True):
+    """Load a .cmap file; with mmap the stop table is memory-mapped, not read
+
+    The stops are then copied once into the colormap's StopStore.
+    """
+    header = read_cmap_header(filename)
+    stops = _read_section(filename, STOP_DTYPE, header['stops']['offset'],
+                          (header['stops']['count'],), mmap)
+    cmap = Colormap.from_arrays(stops['position'], stops['color'], name=header['name'],
+                                interpolation=header.get('interpolation', 'srgb'))
+    try:
+        cmap.set_discrete(header.get('bands'), header.get('boundaries'),
+                          header.get('hard_steps', False))
+    except TypeError as e:
+        raise ValueError(f"{filename} has a corrupt header: {e}") from None
+    cmap.metadata = header.get('metadata', {})
+    return cmap
+
+
+def load_lut(filename, mmap=True, **kwargs):
+    """CompiledLUT from the precompiled table in a .cmap file (no resampling)
+
+    Extra keyword arguments (under, over, bad, vmin, vmax) go to CompiledLUT.
+    Files of incomplete colormaps (under 2 stops) have no LUT to load.
+    """
+    header = read_cmap_header(filename)
+    if header['lut']['size'] < 1:
+        raise ValueError(f"{filename} has no precompiled LUT")
+    table = _read_section(filename, np.uint8, header['lut']['offset'],
+                          (header['lut']['size'], 4), mmap)
+    return CompiledLUT(table, **kwargs)
+
+
+def load_legacy_npy(filename):
+    """Load a pickled .npy dictionary written by older versions
+
+    This unpickles the file, so only use it on files you trust.
+    """
+    return Colormap.from_dict(np.load(filename, allow_pickle=True).item())
+
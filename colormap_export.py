@@ -0,0 +1,242 @@
+"""
+Colormap Export
+Write gradient strips straight from sampled colors to PNG at exact pixel
+sizes, and precompiled LUTs for other runtimes (.npy, C/C++ header, GLSL,
+ParaView/VTK XML), all from the same quantized table
+"""
+
+import os
+import re
+from xml.sax.saxutils import quoteattr
+
+import numpy as np
+
+from colormap_stream import PNGWriter
+
+DEFAULT_TICKS = (0.0, 0.25, 0.5, 0.75, 1.0)
+
+# 3x5 bitmap glyphs for tick labels, one string per row
+GLYPHS = {
+    '0': ('###', '#.#', '#.#', '#.#', '###'),
+    '1': ('.#.', '##.', '.#.', '.#.', '###'),
+    '2': ('###', '..#', '###', '#..', '###'),
+    '3': ('###', '..#', '.##', '..#', '###'),
+    '4': ('#.#', '#.#', '###', '..#', '..#'),
+    '5': ('###', '#..', '###', '..#', '###'),
+    '6': ('###', '#..', '###', '#.#', '###'),
+    '7': ('###', '..#', '..#', '.#.', '.#.'),
+    '8': ('###', '#.#', '###', '#.#', '###'),
+    '9': ('###', '#.#', '###', '..#', '###'),
+    '.': ('...', '...', '...', '...', '.#.'),
+    '-': ('...', '...', '###', '...', '...'),
+}
+GLYPH_WIDTH, GLYPH_HEIGHT = 3, 5
+
+_GLYPH_MASKS = {char: np.array([[c == '#' for c in row] for row in rows])
+                for char, rows in GLYPHS.items()}
+
+
+def text_mask(text, scale=1):
+    """Boolean pixel mask of text in the bitmap font, one column gap between glyphs"""
+    masks = []
+    for char in text:
+        if char not in _GLYPH_MASKS:
+            raise ValueError(f"No glyph for {char!r}; labels may use digits, '.' and '-'")
+        masks.append(_GLYPH_MASKS[char])
+        masks.append(np.zeros((GLYPH_HEIGHT, 1), dtype=bool))
+    mask = np.hstack(masks[:-1]) if masks else np.zeros((GLYPH_HEIGHT, 0), dtype=bool)
+    return np.kron(mask, np.ones((scale, scale), dtype=bool))
+
+
+def format_tick(position):
+    return f"{position:g}"
+
+
+def lut_table(cmap, n=256, dtype=np.uint8, alpha=False, cache=None):
+    """The n-entry table every exporter writes: (n, 3 or 4) uint8 or float32
+
+    It is the compiled (and cached, in cache or the default one) CompiledLUT
+    table without the under/over/bad rows, so all formats hold bit-identical
+    values.
+    """
+    dtype = np.dtype(dtype)
+    if dtype not in (np.uint8, np.float32):
+        raise ValueError("LUTs are exported as uint8 or float32")
+    if n < 2:
+        raise ValueError("A LUT needs at least 2 entries")
+    return cmap.compile(n, cache=cache).table(dtype, alpha)[:n]
+
+
+def gradient_pixels(cmap, width, height, ticks=None, labels=None, vertical=False):
+    """RGB uint8 image of exactly (height, width, 3) pixels
+
+    Each pixel column (row, when vertical) is one sample of the colormap, so
+    no resampling or interpolation by an image library is involved. With
+    ticks, the bottom of the image becomes a white band with tick marks and
+    bitmap-font labels (formatted positions unless labels are given).
+    """
+    if width < 1 or height < 1:
+        raise ValueError("Image size must be at least 1x1 pixels")
+    length = height if vertical else width
+    colors = lut_table(cmap, length) if length > 1 else lut_table(cmap, 2)[:1]
+    if vertical:
+        colors = colors[::-1]  # Position 0 at the bottom
+
+    image = np.empty((height, width, 3), dtype=np.uint8)
+    if ticks is None:
+        if vertical:
+            image[:] = colors[:, np.newaxis]
+        else:
+            image[:] = colors
+        return image
+
+    if vertical:
+        raise ValueError("Tick annotations are only supported on horizontal strips")
+    labels = [format_tick(t) for t in ticks] if labels is None else list(labels)
+    scale = max(1, height // 40)
+    band = scale * (GLYPH_HEIGHT + 6)
+    if band >= height:
+        raise ValueError(f"Image is too short for tick labels (needs > {band} pixels)")
+
+    strip = height - band
+    image[:strip] = colors
+    image[strip:] = 255
+    for position, label in zip(ticks, labels):
+        x = int(round(position * (width - 1)))
+        x0 = min(max(0, x - scale // 2), width - scale)
+        image[strip:strip + 2 * scale, x0:x0 + scale] = 0
+
+        mask = text_mask(label, scale)
+        left = min(max(0, x - mask.shape[1] // 2), max(0, width - mask.shape[1]))
+        top = strip + 3 * scale
+        mask = mask[:, :width - left]
+        region = image[top:top + mask.shape[0], left:left + mask.shape[1]]
+        region[mask] = 0
+    return image
+
+
+def export_image(cmap, filename, width, height, ticks=None, labels=None,
+                 vertical=False, compress_level=6):
+    """Write the colormap as an exactly width x height RGB PNG"""
+    image = gradient_pixels(cmap, width, height, ticks, labels, vertical)
+    with PNGWriter(filename, width, height, channels=3,
+                   compress_level=compress_level) as writer:
+        writer.write_rows(image)
+
+
+def export_images(cmap, targets, **kwargs):
+    """Write several sizes in one pass; targets are (filename, width, height)
+
+    Samples are cached by length, so sizes sharing a width (or height, for
+    vertical strips) sample the colormap once.
+    """
+    for filename, width, height in targets:
+        export_image(cmap, filename, width, height, **kwargs)
+
+
+def parse_size(text):
+    """'WIDTHxHEIGHT' as an (int, int) tuple"""
+    try:
+        width, height = (int(part) for part in text.lower().split('x'))
+    except ValueError:
+        raise ValueError(f"Size must look like 3000x600, got {text!r}") from None
+    return width, height
+
+
+def c_identifier(name):
+    """name made safe for C and GLSL identifiers"""
+    ident = re.sub(r'\W', '_', name)
+    return f"_{ident}" if not ident or ident[0].isdigit() else ident
+
+
+def _format_values(table):
+    """Table entries as text: integers, or the shortest float32 round-trip form"""
+    if table.dtype == np.uint8:
+        return [[str(v) for v in row] for row in table.tolist()]
+    return [[np.format_float_positional(v, unique=True, trim='0') for v in row]
+            for row in table]
+
+
+def c_header(cmap, n=256, dtype=np.uint8, alpha=False):
+    """C/C++ header declaring the LUT as a static const 2D array"""
+    table = lut_table(cmap, n, dtype, alpha)
+    ident = c_identifier(cmap.name)
+    macro = ident.upper()
+    ctype = 'uint8_t' if table.dtype == np.uint8 else 'float'
+    suffix = '' if table.dtype == np.uint8 else 'f'
+    rows = ',\n'.join('    {' + ', '.join(v + suffix for v in row) + '}'
+                       for row in _format_values(table))
+    return (f"/* {cmap.name}: {n}-entry {'RGBA' if alpha else 'RGB'} {ctype} colormap LUT */\n"
+            f"#ifndef {macro}_LUT_H\n"
+            f"#define {macro}_LUT_H\n\n"
+            f"#include <stdint.h>\n\n"
+            f"#define {macro}_LUT_SIZE {n}\n\n"
+            f"static const {ctype} {ident}_lut[{n}][{table.shape[1]}] = {{\n"
+            f"{rows}\n}};\n\n"
+            f"#endif /* {macro}_LUT_H */\n")
+
+
+def glsl_source(cmap, n=256, alpha=False):
+    """GLSL (ES 3.0 / WebGL2) const array plus a lookup function
+
+    Entries are float32 copies of the uint8 table divided by 255, matching
+    what sampling the PNG texture from export_lut() returns.
+    """
+    table = lut_table(cmap, n, np.uint8, alpha).astype(np.float32) / np.float32(255)
+    ident = c_identifier(cmap.name)
+    vec = 'vec4' if alpha else 'vec3'
+    values = ',\n'.join(f'    {vec}(' + ', '.join(row) + ')' for row in _format_values(table))
+    return (f"// {cmap.name}: {n}-entry colormap LUT\n"
+            f"const int {ident.upper()}_LUT_SIZE = {n};\n"
+            f"const {vec} {ident}_lut[{n}] = {vec}[{n}](\n{values}\n);\n\n"
+            f"// Nearest entry for t in [0, 1]\n"
+            f"{vec} {ident}(float t) {{\n"
+            f"    int i = int(clamp(t, 0.0, 1.0) * float({n}));\n"
+            f"    return {ident}_lut[min(i, {n - 1})];\n"
+            f"}}\n")
+
+
+def paraview_xml(cmap, n=256):
+    """ParaView/VTK color map XML with one point per LUT entry"""
+    table = lut_table(cmap, n, np.uint8) / 255.0
+    x = np.linspace(0.0, 1.0, n)
+    points = '\n'.join(
+        f'    <Point x="{x[i]:.9g}" o="1" r="{r:.9g}" g="{g:.9g}" b="{b:.9g}"/>'
+        for i, (r, g, b) in enumerate(table))
+    return (f'<ColorMaps>\n'
+            f'  <ColorMap name={quoteattr(cmap.name)} space="RGB">\n'
+            f'{points}\n'
+            f'  </ColorMap>\n'
+            f'</ColorMaps>\n')
+
+
+LUT_FORMATS = ('.npy', '.h', '.hpp', '.glsl', '.xml', '.png')
+
+
+def export_lut(cmap, filename, n=256, dtype=np.uint8, alpha=False):
+    """Write an n-entry LUT in the format given by the file extension
+
+    .npy holds the (n, 3 or 4) array, .h/.hpp a C/C++ array, .glsl a GLSL
+    const array and lookup function, .xml a ParaView/VTK color map, and .png
+    an n x 1 image to upload as a 1D (or n x 1 2D) texture. dtype applies to
+    .npy and C headers; the other formats are derived from the uint8 table.
+    """
+    ext = os.path.splitext(filename)[1].lower()
+    if ext == '.npy':
+        np.save(filename, lut_table(cmap, n, dtype, alpha))
+        return
+    if ext == '.png':
+        table = lut_table(cmap, n, np.uint8, alpha)
+        with PNGWriter(filename, n, 1, channels=table.shape[1]) as writer:
+            writer.write_rows(table[np.newaxis])
+        return
+    if ext in ('.h', '.hpp'):
+        text = c_header(cmap, n, dtype, alpha)
+    elif ext == '.glsl':
+        text = glsl_source(cmap, n, alpha)
+    elif ext == '.xml':
+        text = paraview_xml(cmap, n)
+    else:
+        raise ValueError(f"Unknown LUT format {ext!r}, expected one of {', '.join(LUT_FORMATS)}")
+    with open(filename, 'w') as f:
+        f.write(text)
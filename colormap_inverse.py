@@ -0,0 +1,176 @@
+"""
+Inverse Colormap Lookup
+Recover scalar values from an image rendered with a colormap, with the
+per-pixel color error, through a quantized RGB grid cached per colormap
+
+    python colormap_inverse.py render.png colormap.cmap -o values.npy --vmin 0 --vmax 50
+"""
+
+import argparse
+import sys
+
+import numpy as np
+
+from colormap_engine import default_cache
+
+# Pixels per block; colors are deduplicated within a block, then matched
+# MATCH_CHUNK at a time, which bounds temporary memory for large images
+INVERT_CHUNK = 1 << 20
+MATCH_CHUNK = 1 << 16
+
+# Grid cells per RGB axis are 2 ** GRID_BITS (64**3 int16 cells = 512 KiB)
+GRID_BITS = 6
+
+# Entries of the dense LUT values are read from, and of the coarser one the
+# grid is built against
+INVERSE_SIZE = 1024
+GRID_TABLE_SIZE = 256
+
+
+def _nearest(points, table, chunk=16384):
+    """Index of the nearest table row for each point (squared Euclidean)"""
+    table = table.astype(np.float32)
+    table_t = np.ascontiguousarray(table.T)
+    table_norms = (table ** 2).sum(axis=1)
+    out = np.empty(len(points), dtype=np.int16 if len(table) <= 32767 else np.int32)
+    distance = np.empty((min(chunk, len(points)), len(table)), dtype=np.float32)
+    for start in range(0, len(points), chunk):
+        block = points[start:start + chunk].astype(np.float32)
+        # |p - t|^2 = |p|^2 - 2 p.t + |t|^2; |p|^2 does not change the argmin.
+        # Reuse one buffer: fresh large temporaries cost more than the math
+        buf = distance[:len(block)]
+        np.matmul(block, table_t, out=buf)
+        buf *= -2
+        buf += table_norms
+        out[start:start + chunk] = buf.argmin(axis=1)
+    return out
+
+
+def build_grid(table, bits=GRID_BITS):
+    """Nearest table index for the center of every quantized RGB cell
+
+    table is (n, 3) in 0-255 units; returns a (2**bits,) * 3 index grid.
+    """
+    cells = 1 << bits
+    step = 256 / cells
+    axis = (np.arange(cells) + 0.5) * step
+    centers = np.stack(np.meshgrid(axis, axis, axis, indexing='ij'), axis=-1).reshape(-1, 3)
+    return _nearest(centers, table).reshape(cells, cells, cells)
+
+
+class InverseLUT:
+    """RGB -> scalar lookup for one colormap
+
+    A pixel's grid cell gives an approximate index into the dense LUT,
+    refined by an exact nearest-color search over the entries around it.
+    The grid is built once per colormap content and kept in the compiled
+    cache; pixels are deduplicated first, since rendered images hold few
+    distinct colors.
+    """
+
+    def __init__(self, cmap, n=INVERSE_SIZE, bits=GRID_BITS, window=None, cache=None):
+        cache = default_cache if cache is None else cache
+        self.n = n
+        self.bits = bits
+        self.step = max(1, n // GRID_TABLE_SIZE)
+        # The grid guess is within a couple of coarse entries of the answer
+        self.window = 2 * self.step + 4 if window is None else window
+        self.table = (cmap.sample(n, cache) * 255).astype(np.float32)
+        self.grid = cache.get((cmap.content_key(), 'inverse', n, bits),
+                              lambda: build_grid(self.table[::self.step], bits))
+
+    def match(self, rgb):
+        """(index, error) of the nearest LUT entry for (k, 3) uint8 colors"""
+        index = np.empty(len(rgb), dtype=np.intp)
+        error = np.empty(len(rgb), dtype=np.float32)
+        offsets = np.arange(-self.window, self.window + 1)
+        shift = 8 - self.bits
+        for start in range(0, len(rgb), MATCH_CHUNK):
+            block = rgb[start:start + MATCH_CHUNK]
+            cell = block >> shift
+            guess = self.grid[cell[:, 0], cell[:, 1], cell[:, 2]].astype(np.intp) * self.step
+            candidates = np.clip(guess[:, np.newaxis] + offsets, 0, self.n - 1)
+            diff = self.table[candidates] - block[:, np.newaxis, :].astype(np.float32)
+            distance = np.einsum('ijk,ijk->ij', diff, diff)
+            best = distance.argmin(axis=1)
+            rows = np.arange(len(block))
+            index[start:start + len(block)] = candidates[rows, best]
+            error[start:start + len(block)] = np.sqrt(distance[rows, best])
+        return index, error
+
+    def lookup(self, image, vmin=0.0, vmax=1.0, max_error=None, chunk_size=INVERT_CHUNK):
+        """Scalar values and color errors for an (h, w, 3 or 4) image
+
+        image is uint8, or float in [0, 1]. Returns float32 (values, error)
+        arrays shaped (h, w): values are mapped onto [vmin, vmax], error is
+        the RGB distance (0-255 units) to the matched colormap color. Pixels
+        with error above max_error, or fully transparent ones, get NaN values.
+        """
+        image = np.asarray(image)
+        if image.ndim != 3 or image.shape[2] not in (3, 4):
+            raise ValueError("Expected an image shaped (h, w, 3) or (h, w, 4)")
+        shape = image.shape[:2]
+        pixels = image.reshape(-1, image.shape[2])
+        values = np.empty(len(pixels), dtype=np.float32)
+        error = np.empty(len(pixels), dtype=np.float32)
+        scale = np.float32((vmax - vmin) / (self.n - 1))
+
+        for start in range(0, len(pixels), chunk_size):
+            block = pixels[start:start + chunk_size]
+            rgb = block[:, :3]
+            if rgb.dtype != np.uint8:
+                rgb = np.round(np.clip(rgb, 0.0, 1.0) * 255).astype(np.uint8)
+            keys = ((rgb[:, 0].astype(np.uint32) << 16) | (rgb[:, 1].astype(np.uint32) << 8)
+                    | rgb[:, 2])
+            unique, inverse = np.unique(keys, return_inverse=True)
+            colors = np.stack([unique >> 16, (unique >> 8) & 255, unique & 255],
+                              axis=1).astype(np.uint8)
+            index, distance = self.match(colors)
+
+            stop = start + len(block)
+            values[start:stop] = (index * scale + np.float32(vmin))[inverse]
+            error[start:stop] = distance[inverse]
+            if block.shape[1] == 4:
+                values[start:stop][block[:, 3] == 0] = np.nan
+
+        if max_error is not None:
+            values[error > max_error] = np.nan
+        return values.reshape(shape), error.reshape(shape)
+
+
+def invert_image(image, cmap, vmin=0.0, vmax=1.0, max_error=None, **kwargs):
+    """(values, error) for an image rendered with cmap, see InverseLUT.lookup"""
+    return InverseLUT(cmap, **kwargs).lookup(image, vmin, vmax, max_error)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Recover scalar values from a colorized image")
+    parser.add_argument('image', help="Rendered image (PNG, or anything matplotlib reads)")
+    parser.add_argument('colormap', help=".cmap file or spec the image was rendered with")
+    parser.add_argument('-o', '--output', required=True,
+                        help="Values .npy (the error goes to *_error.npy)")
+    parser.add_argument('--vmin', type=float, default=0.0)
+    parser.add_argument('--vmax', type=float, default=1.0)
+    parser.add_argument('--max-error', type=float, default=None,
+                        help="Set values of pixels further than this (0-255 RGB units) to NaN")
+    args = parser.parse_args(argv)
+
+    from matplotlib.image import imread
+
+    if args.colormap.endswith('.cmap'):
+        from colormap_engine import load_colormap
+        cmap = load_colormap(args.colormap)
+    else:
+        from colormap_cli import load_spec
+        cmap = load_spec(args.colormap)
+    values, error = invert_image(imread(args.image), cmap, args.vmin, args.vmax, args.max_error)
+    np.save(args.output, values)
+    np.save(args.output[:-4] + '_error.npy' if args.output.endswith('.npy')
+            else args.output + '_error.npy', error)
+    print(f"{values.shape[1]}x{values.shape[0]}: mean error {np.nanmean(error):.2f}, "
+          f"{np.isnan(values).sum()} pixels without a match")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,279 @@
+"""
+Colormap Library
+A directory of saved colormaps (.cmap files and specs) indexed for browsing.
+Names, stop counts and gradient thumbnails are cached on disk; thumbnails
+are keyed by each file's content hash, and a rescan only reads files whose
+size or modification time changed, so large libraries reopen instantly
+"""
+
+import hashlib
+import json
+import os
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from colormap_cli import SPEC_EXTENSIONS, load_spec
+from colormap_engine import CompiledCache, asset_cache_dir, load_colormap, load_lut, read_cmap_header
+from colormap_export import lut_table
+
+LIBRARY_EXTENSIONS = ('.cmap',) + SPEC_EXTENSIONS
+
+# Thumbnail strip width (one pixel per column) and the LUT it is taken from
+THUMBNAIL_WIDTH = 128
+THUMBNAIL_LUT_SIZE = 256
+
+# Bump when the index layout or thumbnail rendering changes
+LIBRARY_VERSION = 1
+
+LibraryEntry = namedtuple('LibraryEntry', 'path name stops interpolation discrete size mtime digest')
+LibraryEntry.__doc__ = """One colormap file: path relative to the library, summary and change key"""
+
+# Sort orders by label: key function and whether it is reversed
+SORT_ORDERS = {
+    'Name': (lambda e: (e.name.lower(), e.path), False),
+    'Newest': (lambda e: e.mtime, True),
+    'Stops': (lambda e: (e.stops, e.name.lower()), False),
+    'Folder': (lambda e: e.path.lower(), False),
+}
+
+
+def _walk(directory):
+    """(relative path, stat) of every library file under directory, hidden folders skipped"""
+    stack = [directory]
+    while stack:
+        folder = stack.pop()
+        try:
+            entries = list(os.scandir(folder))
+        except OSError:
+            continue
+        for entry in entries:
+            if entry.name.startswith('.'):
+                continue
+            if entry.is_dir():
+                stack.append(entry.path)
+            elif entry.name.lower().endswith(LIBRARY_EXTENSIONS):
+                try:
+                    stat = entry.stat()
+                except OSError:
+                    continue
+                yield os.path.relpath(entry.path, directory), stat
+
+
+def thumbnail_strip(table, width=THUMBNAIL_WIDTH):
+    """(width, 3) uint8 strip picked (nearest entry) from an (n, 3+) uint8 LUT"""
+    picks = np.round(np.linspace(0, len(table) - 1, width)).astype(np.intp)
+    return np.ascontiguousarray(table[picks, :3])
+
+
+class Library:
+    """Colormap files under a directory, with thumbnails built in the background
+
+    The constructor lists the directory against the cached index: unchanged
+    files (same size and mtime) are available at once; new and changed ones
+    are hashed and read on a thread pool. Call poll() regularly (e.g. from
+    Tk's after()) to collect them; nothing here touches Tk. Thumbnails are
+    stored per content hash, so a touched, renamed or copied file reuses
+    its thumbnail instead of rendering a new one.
+    """
+
+    def __init__(self, directory, width=THUMBNAIL_WIDTH, cache_dir=None, workers=None):
+        self.directory = os.path.abspath(directory)
+        self.width = width
+        if cache_dir is None:
+            cache_dir = os.path.join(asset_cache_dir(), 'thumbnails')
+        self.cache_dir = cache_dir
+        key = hashlib.sha1(self.directory.encode()).hexdigest()[:16]
+        self.index_path = os.path.join(cache_dir, f"index-{key}.json")
+        self.entries = {}
+        self.errors = {}
+        self._strips = {}
+        self._pending = {}
+        self._dirty = False
+        # Thumbnails of specs are compiled here, not in the shared cache
+        self._scratch = CompiledCache(max_bytes=1 << 20)
+        self._executor = ThreadPoolExecutor(max_workers=workers or min(4, os.cpu_count() or 1))
+        self.scan()
+
+    @property
+    def done(self):
+        return not self._pending
+
+    @property
+    def pending(self):
+        return len(self._pending)
+
+    def _load_index(self):
+        try:
+            with open(self.index_path) as f:
+                index = json.load(f)
+            if index['version'] != LIBRARY_VERSION or index['width'] != self.width:
+                return {}
+            return {path: LibraryEntry(path, *fields) for path, fields in index['entries'].items()}
+        except (OSError, ValueError, KeyError, TypeError):
+            return {}
+
+    def _save_index(self):
+        index = {'version': LIBRARY_VERSION, 'width': self.width,
+                 'entries': {path: list(entry[1:]) for path, entry in self.entries.items()}}
+        temp = f"{self.index_path}.tmp-{os.getpid()}"
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            with open(temp, 'w') as f:
+                json.dump(index, f)
+            os.replace(temp, self.index_path)
+        except OSError:
+            pass  # No writable cache: the next open rescans
+        self._dirty = False
+
+    def _thumbnail_path(self, digest):
+        return os.path.join(self.cache_dir, f"{digest}-{self.width}-v{LIBRARY_VERSION}.rgb")
+
+    def scan(self):
+        """Pick up added, changed and removed files; returns how many are being read
+
+        A changed file keeps its old entry until the new one is read.
+        """
+        known = self.entries or self._load_index()
+        found = {}
+        for path, stat in _walk(self.directory):
+            entry = known.get(path)
+            if entry is not None:
+                found[path] = entry
+                if (entry.size, entry.mtime) == (stat.st_size, stat.st_mtime_ns):
+                    continue
+            if path not in self._pending:
+                self._pending[path] = self._executor.submit(self._read, path)
+        if found.keys() != known.keys():
+            self._dirty = True
+        self.entries = found
+        for path in list(self.errors):
+            if path not in self._pending:
+                del self.errors[path]
+        if self._dirty and self.done:
+            self._save_index()
+        return len(self._pending)
+
+    def _read(self, path):
+        """(entry, strip, error) for one file (runs on the pool)"""
+        filename = os.path.join(self.directory, path)
+        try:
+            stat = os.stat(filename)
+            with open(filename, 'rb') as f:
+                digest = hashlib.sha1(f.read()).hexdigest()
+            cmap = None
+            if filename.lower().endswith('.cmap'):
+                header = read_cmap_header(filename)
+                name, stops = header['name'], header['stops']['count']
+                interpolation = header.get('interpolation', 'srgb')
+                discrete = bool(header.get('bands') or header.get('boundaries')
+                                or header.get('hard_steps'))
+            else:
+                cmap = load_spec(filename)
+                name, stops = cmap.name, len(cmap)
+                interpolation, discrete = cmap.interpolation, cmap.is_discrete
+
+            strip = self._load_strip(digest)
+            if strip is None:
+                if cmap is None:
+                    # The LUT precompiled into the file: no resampling
+                    lut = load_lut(filename, mmap=False)
+                    table = lut.table(np.uint8, False)[:lut.n]
+                else:
+                    table = lut_table(cmap, THUMBNAIL_LUT_SIZE, cache=self._scratch)
+                strip = thumbnail_strip(table, self.width)
+                self._store_strip(digest, strip)
+        except Exception as e:  # Any unreadable file is that entry's error, not poll()'s
+            return None, None, str(e)
+        entry = LibraryEntry(path, name, stops, interpolation, discrete,
+                             stat.st_size, stat.st_mtime_ns, digest)
+        return entry, strip, None
+
+    def _load_strip(self, digest):
+        try:
+            with open(self._thumbnail_path(digest), 'rb') as f:
+                data = f.read()
+        except OSError:
+            return None
+        if len(data) != self.width * 3:
+            return None
+        return np.frombuffer(data, dtype=np.uint8).reshape(self.width, 3)
+
+    def _store_strip(self, digest, strip):
+        filename = self._thumbnail_path(digest)
+        temp = f"{filename}.tmp-{os.getpid()}-{id(strip)}"
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            with open(temp, 'wb') as f:
+                f.write(strip.tobytes())
+            os.replace(temp, filename)
+        except OSError:
+            pass
+
+    def poll(self):
+        """Collect finished reads; returns the paths whose entries changed"""
+        changed = []
+        for path, future in list(self._pending.items()):
+            if not future.done():
+                continue
+            del self._pending[path]
+            if future.cancelled():
+                continue
+            entry, strip, error = future.result()
+            if entry is None:
+                self.entries.pop(path, None)
+                self.errors[path] = error
+            else:
+                self.entries[path] = entry
+                self._strips[entry.digest] = strip
+                self.errors.pop(path, None)
+            changed.append(path)
+        if changed:
+            self._dirty = True
+        if self._dirty and self.done:
+            self._save_index()
+        return changed
+
+    def strip(self, entry):
+        """(width, 3) uint8 thumbnail of an entry, read from disk once; None if missing"""
+        strip = self._strips.get(entry.digest)
+        if strip is None:
+            strip = self._load_strip(entry.digest)
+            if strip is None:
+                # Cache cleared behind our back: render it again
+                if entry.path not in self._pending:
+                    self._pending[entry.path] = self._executor.submit(self._read, entry.path)
+                return None
+            self._strips[entry.digest] = strip
+        return strip
+
+    def find(self, query='', order='Name'):
+        """Entries whose name or path contains every word of query, in a SORT_ORDERS order
+
+        The path is matched without its extension, so 'map' does not match every .cmap.
+        """
+        words = query.lower().split()
+        entries = [entry for entry in self.entries.values()
+                   if all(word in entry.name.lower()
+                          or word in os.path.splitext(entry.path)[0].lower()
+                          for word in words)]
+        key, reverse = SORT_ORDERS[order]
+        return sorted(entries, key=key, reverse=reverse)
+
+    def load(self, entry):
+        """The Colormap an entry describes"""
+        filename = os.path.join(self.directory, entry.path)
+        if filename.lower().endswith('.cmap'):
+            return load_colormap(filename, mmap=False)
+        return load_spec(filename)
+
+    def close(self):
+        """Stop reading and keep what was indexed so far"""
+        for future in self._pending.values():
+            future.cancel()
+        self.poll()
+        self._pending.clear()
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        if self._dirty:
+            self._save_index()
@@ -0,0 +1,211 @@
+"""
+Matplotlib Views
+The original FigureCanvasTkAgg color wheel, brightness bar and preview strip,
+with the same interface as colormap_views (select with --backend matplotlib)
+"""
+
+import numpy as np
+import matplotlib.pyplot as plt
+from matplotlib.patches import Circle, Rectangle
+from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+
+from colormap_cvd import simulate
+from colormap_views import WHEEL_SIZE, color_wheel_image, value_bar_image
+# The analysis plot, sample images and data view are plain Tk canvases under
+# both backends
+from colormap_views import AnalysisView, CVDSampleView, DataView, LibraryView  # noqa: F401
+
+
+class MplDragArea:
+    """Press/drag/release handling on a matplotlib canvas
+
+    Picks use pixel coordinates through transData, so drags keep working
+    outside the axes.
+    """
+
+    def __init__(self, canvas, ax, on_pick, on_release):
+        self.ax = ax
+        self._on_pick = on_pick
+        self._on_release = on_release
+        self._dragging = False
+        canvas.mpl_connect('button_press_event', self._press)
+        canvas.mpl_connect('motion_notify_event', self._motion)
+        canvas.mpl_connect('button_release_event', self._release)
+
+    def _data_xy(self, event):
+        return self.ax.transData.inverted().transform((event.x, event.y))
+
+    def _press(self, event):
+        if event.inaxes == self.ax:
+            self._dragging = bool(self._on_pick(*self._data_xy(event), False))
+
+    def _motion(self, event):
+        if self._dragging:
+            self._on_pick(*self._data_xy(event), True)
+
+    def _release(self, event):
+        if self._dragging:
+            self._dragging = False
+            self._on_release()
+
+
+class WheelView:
+    """Color wheel figure; the marker is animated and blitted over a saved background"""
+
+    def __init__(self, master, on_pick, on_release):
+        self._background = None
+        self.fig, self.ax = plt.subplots(figsize=(5, 5))
+        self.canvas = FigureCanvasTkAgg(self.fig, master=master)
+        self.canvas.mpl_connect('draw_event', self.on_draw)
+        MplDragArea(self.canvas, self.ax, on_pick, on_release)
+
+        self.ax.set_xlim(-1.2, 1.2)
+        self.ax.set_ylim(-1.2, 1.2)
+        self.ax.set_aspect('equal')
+        self.ax.axis('off')
+
+        # Color wheel image is cached, so redraws do not recompute it
+        self.ax.imshow(color_wheel_image(WHEEL_SIZE), extent=[-1, 1, -1, 1], origin='upper')
+        self.ax.set_title('Hue & Saturation', fontsize=11, fontweight='bold')
+        self.ax.add_patch(Circle((0, 0), 1.0, fill=False, edgecolor='black', linewidth=2))
+
+        # Selection marker is animated: excluded from full draws and blitted
+        # on top of the saved background instead
+        self.marker_outer = Circle((0, 0), 0.05, color='black', fill=True, animated=True)
+        self.marker_inner = Circle((0, 0), 0.03, color='white', fill=True, animated=True)
+        self.ax.add_patch(self.marker_outer)
+        self.ax.add_patch(self.marker_inner)
+        self.canvas.draw_idle()
+
+    def pack(self, **kwargs):
+        self.canvas.get_tk_widget().pack(**kwargs)
+
+    def set_marker(self, hue, saturation):
+        """Move the marker to hue/saturation and blit it"""
+        angle = hue * 2 * np.pi
+        center = (saturation * np.cos(angle), saturation * np.sin(angle))
+        self.marker_outer.set_center(center)
+        self.marker_inner.set_center(center)
+        self.blit()
+
+    def blit(self):
+        """Restore the background and blit the marker over it"""
+        if self._background is None:
+            # Not drawn yet; on_draw will blit once the background exists
+            self.canvas.draw_idle()
+            return
+        self.canvas.restore_region(self._background)
+        self.ax.draw_artist(self.marker_outer)
+        self.ax.draw_artist(self.marker_inner)
+        self.canvas.blit(self.ax.bbox)
+
+    def on_draw(self, event):
+        """Save the background after every full draw (startup, resize)"""
+        self._background = self.canvas.copy_from_bbox(self.ax.bbox)
+        self.blit()
+
+
+class ValueBarView:
+    """Brightness bar figure; the gradient is swapped per hue, the marker blitted"""
+
+    def __init__(self, master, on_pick, on_release):
+        self._on_pick = on_pick
+        self._background = None
+        self._gradient_key = None
+        self._draw_pending = False
+        self.fig, self.ax = plt.subplots(figsize=(1, 5))
+        self.canvas = FigureCanvasTkAgg(self.fig, master=master)
+        self.canvas.mpl_connect('draw_event', self.on_draw)
+        MplDragArea(self.canvas, self.ax, self._pick, on_release)
+
+        self.ax.set_xlim(0, 1)
+        self.ax.set_ylim(0, 1)
+        self.ax.set_aspect('auto')
+        self.ax.axis('off')
+        self.image = self.ax.imshow(value_bar_image(0.0, 0.0), extent=[0, 1, 0, 1],
+                                    origin='lower', aspect='auto')
+        self.ax.add_patch(Rectangle((0, 0), 1, 1, fill=False, edgecolor='black', linewidth=2))
+
+        self.marker_white, = self.ax.plot([0, 1], [1, 1], 'w-', linewidth=2, animated=True)
+        self.marker_dashed, = self.ax.plot([0, 1], [1, 1], 'k--', linewidth=1, animated=True)
+        self.canvas.draw_idle()
+
+    def pack(self, **kwargs):
+        self.canvas.get_tk_widget().pack(**kwargs)
+
+    def set_gradient(self, hue, saturation):
+        """Swap the gradient when hue/saturation changed; needs a full draw"""
+        key = (hue, saturation)
+        if key == self._gradient_key:
+            return
+        self._gradient_key = key
+        self.image.set_data(value_bar_image(*key))
+        # The full draw re-captures the background and on_draw blits the marker
+        self._draw_pending = True
+        self.canvas.draw_idle()
+
+    def set_marker(self, value):
+        self.marker_white.set_ydata([value, value])
+        self.marker_dashed.set_ydata([value, value])
+        if not self._draw_pending:
+            self.blit()
+
+    def blit(self):
+        """Restore the background and blit the marker over it"""
+        if self._background is None:
+            self.canvas.draw_idle()
+            return
+        self.canvas.restore_region(self._background)
+        self.ax.draw_artist(self.marker_white)
+        self.ax.draw_artist(self.marker_dashed)
+        self.canvas.blit(self.ax.bbox)
+
+    def _pick(self, x, y, clamp):
+        self._on_pick(y)
+        return True
+
+    def on_draw(self, event):
+        """Save the background after every full draw"""
+        self._draw_pending = False
+        self._background = self.canvas.copy_from_bbox(self.ax.bbox)
+        self.blit()
+
+
+class PreviewView:
+    """Colormap preview figure"""
+
+    def __init__(self, master):
+        self.fig, self.ax = plt.subplots(figsize=(6, 1))
+        self.fig.subplots_adjust(bottom=0.3, top=0.9)
+        self.canvas = FigureCanvasTkAgg(self.fig, master=master)
+
+    def pack(self, **kwargs):
+        self.canvas.get_tk_widget().pack(**kwargs)
+
+    def show(self, colormap, deficiency=None):
+        """Draw colormap (as seen with deficiency, if given), or a hint below 2 stops"""
+        self.ax.clear()
+
+        if colormap is not None and colormap.is_complete():
+            if deficiency is None:
+                gradient = np.linspace(0, 1, 256).reshape(1, -1)
+                self.ax.imshow(gradient, aspect='auto', cmap=colormap.to_matplotlib(),
+                               extent=[0, 1, 0, 1])
+            else:
+                self.ax.imshow(simulate(colormap.sample(256), deficiency)[np.newaxis],
+                               aspect='auto', extent=[0, 1, 0, 1])
+            self.ax.set_xlim(0, 1)
+            self.ax.set_ylim(0, 1)
+            self.ax.set_xticks([0, 0.25, 0.5, 0.75, 1.0])
+            self.ax.set_xticklabels(['0.0', '0.25', '0.5', '0.75', '1.0'])
+            self.ax.set_yticks([])
+            self.ax.set_xlabel('Position', fontsize=9)
+        else:
+            self.ax.text(0.5, 0.5, 'Add at least 2 colors to preview',
+                         ha='center', va='center', transform=self.ax.transAxes,
+                         fontsize=10)
+            self.ax.set_xticks([])
+            self.ax.set_yticks([])
+
+        self.fig.tight_layout()
+        self.canvas.draw()
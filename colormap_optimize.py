@@ -0,0 +1,257 @@
+"""
+Stop Optimizer
+Move stop positions (and optionally stop lightness, keeping hue and chroma)
+so a colormap gets as close to perceptually uniform as possible. Several
+evolution-strategy runs start from different points on a process pool and
+report their best result as they improve; the search can be cancelled
+"""
+
+import time
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from colormap_analysis import ciede2000
+from colormap_engine import Colormap
+from colormap_spaces import SPACES, _unwrap_hues, lab_to_srgb, srgb_to_lab
+
+# Samples per candidate when scoring; enough to see lightness bumps
+OBJECTIVE_SAMPLES = 96
+
+# Largest lightness change per stop (L*) and its penalty weight
+MAX_LIGHTNESS_SHIFT = 30.0
+LIGHTNESS_WEIGHT = 0.002
+
+Problem = namedtuple('Problem', 'positions lab space optimize_lightness population')
+Problem.__doc__ = """What one optimization works on; plain arrays so it pickles cheaply"""
+
+RunState = namedtuple('RunState', 'mean sigma rng best_params best_value generation')
+
+Progress = namedtuple('Progress', 'value colormap generations elapsed')
+Progress.__doc__ = """Best result so far: objective value (lower is better) and its Colormap"""
+
+
+def make_problem(cmap, optimize_lightness=False, population=24):
+    """Problem for cmap; needs at least 3 stops (the end positions stay fixed)"""
+    if len(cmap) < 3 and not optimize_lightness:
+        raise ValueError("Position optimization needs at least 3 stops")
+    return Problem(np.array(cmap.positions, dtype=float), srgb_to_lab(cmap.colors),
+                   cmap.interpolation, optimize_lightness, population)
+
+
+def _n_gaps(problem):
+    return len(problem.positions) - 1
+
+
+def decode(problem, params):
+    """(k, p) parameter vectors -> (k, m) positions and (k, m, 3) Lab stop colors
+
+    The first n_gaps parameters are log gap widths between the fixed end
+    positions, so stops always stay sorted; the rest are per-stop L* shifts.
+    """
+    params = np.atleast_2d(params)
+    n_gaps = _n_gaps(problem)
+    start, stop = problem.positions[0], problem.positions[-1]
+    gaps = np.exp(params[:, :n_gaps] - params[:, :n_gaps].max(axis=1, keepdims=True))
+    gaps /= gaps.sum(axis=1, keepdims=True)
+    positions = np.empty((len(params), n_gaps + 1))
+    positions[:, 0] = start
+    positions[:, 1:] = start + np.cumsum(gaps, axis=1) * (stop - start)
+    positions[:, -1] = stop
+
+    lab = np.broadcast_to(problem.lab, (len(params),) + problem.lab.shape).copy()
+    if problem.optimize_lightness:
+        shift = np.clip(params[:, n_gaps:], -MAX_LIGHTNESS_SHIFT, MAX_LIGHTNESS_SHIFT)
+        lab[..., 0] = np.clip(lab[..., 0] + shift, 0.0, 100.0)
+    return positions, lab
+
+
+def initial_params(problem):
+    gaps = np.maximum(np.diff(problem.positions), 1e-6)
+    params = np.log(gaps / gaps.sum())
+    if problem.optimize_lightness:
+        params = np.concatenate([params, np.zeros(len(problem.positions))])
+    return params
+
+
+def sample_batch(positions, coords, x):
+    """Piecewise-linear interpolation of k stop sets at once: (k, n, 3)"""
+    m = positions.shape[1]
+    idx = np.clip((positions[:, np.newaxis, :] <= x[np.newaxis, :, np.newaxis]).sum(-1) - 1,
+                  0, m - 2)
+    p0 = np.take_along_axis(positions, idx, axis=1)
+    p1 = np.take_along_axis(positions, idx + 1, axis=1)
+    width = p1 - p0
+    t = np.clip(np.divide(x - p0, width, out=np.zeros_like(p0), where=width > 0), 0.0, 1.0)
+    c0 = np.take_along_axis(coords, idx[..., np.newaxis], axis=1)
+    c1 = np.take_along_axis(coords, idx[..., np.newaxis] + 1, axis=1)
+    return c0 + (c1 - c0) * t[..., np.newaxis]
+
+
+def objective(problem, params, n=OBJECTIVE_SAMPLES):
+    """Non-uniformity of each candidate (k,) - vectorized over candidates
+
+    Coefficient of variation of CIEDE2000 steps, plus a penalty for steps
+    that reverse the overall lightness direction and a small one for
+    moving stop lightness away from the original.
+    """
+    params = np.atleast_2d(params)
+    positions, lab = decode(problem, params)
+    to_space, from_space = SPACES[problem.space]
+    coords = to_space(np.clip(lab_to_srgb(lab), 0.0, 1.0))
+    if problem.space == 'hsv':
+        coords = np.stack([_unwrap_hues(c) for c in coords])
+    x = np.linspace(0.0, 1.0, n)
+    samples = np.clip(from_space(sample_batch(positions, coords, x)), 0.0, 1.0)
+
+    sample_lab = srgb_to_lab(samples)
+    steps = ciede2000(sample_lab[:, :-1], sample_lab[:, 1:])
+    mean = steps.mean(axis=1)
+    cv = np.divide(steps.std(axis=1), mean, out=np.full_like(mean, np.inf), where=mean > 0)
+
+    lightness = sample_lab[..., 0]
+    direction = np.sign(lightness[:, -1:] - lightness[:, :1])
+    backwards = np.maximum(-np.diff(lightness, axis=1) * direction, 0.0).sum(axis=1)
+    value = cv + backwards / 10.0
+    if problem.optimize_lightness:
+        shift = params[:, _n_gaps(problem):]
+        value += LIGHTNESS_WEIGHT * (shift ** 2).mean(axis=1)
+    return value
+
+
+def start_run(problem, seed, spread=0.5):
+    """RunState for one start: the original stops, or a random perturbation"""
+    rng = np.random.default_rng(seed)
+    mean = initial_params(problem)
+    if seed:
+        mean = mean + rng.normal(0.0, spread, mean.shape)
+    value = float(objective(problem, mean)[0])
+    return RunState(mean, 0.3, rng, mean, value, 0)
+
+
+def run_chunk(problem, state, generations):
+    """Advance one run by some generations of a (mu/mu, lambda) evolution strategy"""
+    mean, sigma, rng = state.mean, state.sigma, state.rng
+    best_params, best_value = state.best_params, state.best_value
+    mu = max(2, problem.population // 4)
+    weights = np.log(mu + 0.5) - np.log(np.arange(1, mu + 1))
+    weights /= weights.sum()
+    for _ in range(generations):
+        candidates = mean + sigma * rng.standard_normal((problem.population, len(mean)))
+        values = objective(problem, candidates)
+        order = np.argsort(values)
+        mean = weights @ candidates[order[:mu]]
+        if values[order[0]] < best_value:
+            best_value, best_params = float(values[order[0]]), candidates[order[0]]
+            sigma = min(sigma * 1.2, 2.0)
+        else:
+            sigma = max(sigma * 0.85, 1e-3)
+    return RunState(mean, sigma, rng, best_params, best_value, state.generation + generations)
+
+
+def to_colormap(problem, params, template):
+    """Colormap for a parameter vector, with template's name and settings"""
+    positions, lab = decode(problem, params)
+    cmap = Colormap.from_arrays(positions[0], np.clip(lab_to_srgb(lab[0]), 0.0, 1.0),
+                                name=template.name, interpolation=template.interpolation)
+    cmap.set_discrete(**template.discrete_settings())
+    cmap.metadata = dict(template.metadata)
+    return cmap
+
+
+class Optimizer:
+    """Multi-start optimization on a process pool, resubmitted in chunks
+
+    Call poll() regularly (e.g. from Tk's after()); it collects finished
+    chunks, resubmits the runs that still have generations left and returns
+    a Progress when the overall best improved. cancel() stops submitting
+    and drops queued chunks; the best result so far stays available. If a
+    chunk fails (e.g. a worker process died), the search stops as if
+    cancelled and the exception is kept in error.
+    """
+
+    def __init__(self, cmap, optimize_lightness=False, starts=4, generations=120,
+                 chunk=10, population=24, executor=None):
+        self.template = cmap.copy()
+        self.problem = make_problem(cmap, optimize_lightness, population)
+        self.starts = starts
+        self.generations = generations
+        self.chunk = chunk
+        self._own_executor = executor is None
+        self.executor = ProcessPoolExecutor(max_workers=starts) if executor is None else executor
+        self.best = None
+        self.started = time.perf_counter()
+        self.cancelled = False
+        self.error = None
+        self._pending = {}
+        for seed in range(starts):
+            state = start_run(self.problem, seed)
+            self._offer(state)
+            self._submit(seed, state)
+
+    @property
+    def done(self):
+        return not self._pending
+
+    def _submit(self, run, state):
+        steps = min(self.chunk, self.generations - state.generation)
+        if steps <= 0 or self.cancelled:
+            return
+        self._pending[run] = self.executor.submit(run_chunk, self.problem, state, steps)
+
+    def _offer(self, state):
+        """Remember state's best if it beats the overall best; True if it did"""
+        if self.best is not None and state.best_value >= self.best[0]:
+            return False
+        self.best = (state.best_value, state.best_params, state.generation)
+        return True
+
+    def progress(self):
+        """Progress for the best result so far"""
+        value, params, generations = self.best
+        return Progress(value, to_colormap(self.problem, params, self.template),
+                        generations, time.perf_counter() - self.started)
+
+    def poll(self):
+        """Collect finished chunks; returns Progress if the best improved, else None"""
+        improved = False
+        for run, future in list(self._pending.items()):
+            if not future.done():
+                continue
+            del self._pending[run]
+            if future.cancelled():
+                continue
+            try:
+                state = future.result()
+            except Exception as e:  # Includes BrokenProcessPool
+                self.error = e
+                self.cancel()
+                break
+            improved |= self._offer(state)
+            self._submit(run, state)
+        if self.done:
+            self.close()
+        return self.progress() if improved else None
+
+    def run(self, callback=None, interval=0.05):
+        """Block until finished, calling callback with each improvement"""
+        while not self.done:
+            progress = self.poll()
+            if progress is not None and callback is not None:
+                callback(progress)
+            time.sleep(interval)
+        if self.error is not None:
+            raise self.error
+        return self.progress()
+
+    def cancel(self):
+        self.cancelled = True
+        for future in self._pending.values():
+            future.cancel()
+        self._pending.clear()
+        self.close()
+
+    def close(self):
+        if self._own_executor:
+            self.executor.shutdown(wait=False, cancel_futures=True)
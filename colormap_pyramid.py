@@ -0,0 +1,267 @@
+"""
+Data Pyramids
+Min/mean downsampled levels of a memory-mapped 2D raster, built once band by
+band and cached on disk, and a viewport that reads just the screen-sized
+window it shows from the right level, so huge rasters stay interactive
+"""
+
+import hashlib
+import json
+import os
+import shutil
+
+import numpy as np
+
+from colormap_engine import asset_cache_dir
+from colormap_stream import open_raster
+
+# Stop halving once both sides are at most this many pixels
+PYRAMID_MIN_SIZE = 256
+
+# Source rows read per band while building level 1
+BUILD_BAND_BYTES = 64 * 1024 * 1024
+
+# Bump when the level layout changes so stale cached pyramids are ignored
+PYRAMID_VERSION = 1
+
+KINDS = ('mean', 'min')
+
+
+def _pairs(block, op):
+    """op over each 2x2 cell of a block with even sides (strided, no copies of cells)"""
+    rows = op(block[0::2], block[1::2])
+    return op(rows[:, 0::2], rows[:, 1::2])
+
+
+def _reduce(block):
+    """2x2 NaN-ignoring mean, min and max of a float32 block with even sides"""
+    low = _pairs(block, np.fmin)
+    high = _pairs(block, np.fmax)
+    valid = ~np.isnan(block)
+    if valid.all():
+        return _pairs(block, np.add) * np.float32(0.25), low, high
+    count = _pairs(valid.astype(np.float32), np.add)
+    total = _pairs(np.where(valid, block, np.float32(0)), np.add)
+    mean = np.divide(total, count, out=np.full(total.shape, np.nan, np.float32), where=count > 0)
+    return mean, low, high
+
+
+def _band(source, start, stop):
+    """Rows [start, stop) as float32, NaN-padded to even sides"""
+    height, width = stop - start, source.shape[1]
+    block = np.full((height + height % 2, width + width % 2), np.nan, dtype=np.float32)
+    block[:height, :width] = source[start:stop]
+    return block
+
+
+def _halve(sources, targets, band_rows):
+    """Write the next mean and min levels from the previous ones, band by band
+
+    The mean level halves the mean level and the min level the min level;
+    when both are the same array (the source) each band is read once.
+    Returns the (min, max) seen, so the first pass also finds the data range.
+    """
+    vmin, vmax = np.inf, -np.inf
+    height = sources['mean'].shape[0]
+    band_rows += band_rows % 2
+    for start in range(0, height, band_rows):
+        stop = min(start + band_rows, height)
+        mean, low, high = _reduce(_band(sources['mean'], start, stop))
+        if sources['min'] is not sources['mean']:
+            low = _reduce(_band(sources['min'], start, stop))[1]
+        rows = slice(start // 2, start // 2 + len(mean))
+        targets['mean'][rows] = mean
+        targets['min'][rows] = low
+        if np.isfinite(low).any():
+            vmin = min(vmin, float(np.nanmin(low)))
+            vmax = max(vmax, float(np.nanmax(high)))
+    return vmin, vmax
+
+
+def pyramid_key(filename):
+    """Cache key from the file's path, size and modification time"""
+    stat = os.stat(filename)
+    text = f"{os.path.abspath(filename)}|{stat.st_size}|{stat.st_mtime_ns}|{PYRAMID_VERSION}"
+    return hashlib.sha1(text.encode()).hexdigest()
+
+
+class Pyramid:
+    """Levels of a 2D raster, each half the size of the one before
+
+    Level 0 is the memory-mapped source itself; higher levels hold the
+    2x2 NaN-ignoring mean and min of the level below. Levels are built on
+    first use and stored as .npy files under the asset cache, keyed by the
+    source's path, size and mtime, so reopening a file maps them instantly.
+    progress, if given, is called with each level number as it is built.
+    """
+
+    def __init__(self, filename, min_size=PYRAMID_MIN_SIZE, cache_dir=None, progress=None):
+        self.filename = filename
+        source = open_raster(filename)
+        if source.ndim != 2:
+            raise ValueError(f"Expected a 2D raster, got shape {source.shape}")
+        self.source = source
+        if cache_dir is None:
+            cache_dir = os.path.join(asset_cache_dir(), 'pyramids')
+        self.path = os.path.join(cache_dir, pyramid_key(filename))
+        self.levels = [{kind: source for kind in KINDS}]
+        if not self._load():
+            self._build(min_size, progress)
+
+    def _load(self):
+        try:
+            with open(os.path.join(self.path, 'meta.json')) as f:
+                meta = json.load(f)
+            for level in range(1, meta['levels']):
+                self.levels.append({kind: np.load(os.path.join(self.path, f"{kind}{level}.npy"),
+                                                  mmap_mode='r') for kind in KINDS})
+        except (OSError, ValueError, KeyError):
+            del self.levels[1:]
+            return False
+        self.vmin, self.vmax = meta['vmin'], meta['vmax']
+        return True
+
+    def _build(self, min_size, progress):
+        """Build the levels into a temporary directory, then move it into place"""
+        temp = f"{self.path}.tmp-{os.getpid()}"
+        try:
+            os.makedirs(temp, exist_ok=True)
+        except OSError:
+            temp = None  # No writable cache: keep the levels in memory
+
+        vmin, vmax = np.inf, -np.inf
+        shape = self.source.shape
+        row_bytes = max(1, shape[1] * 4)
+        while max(shape) > min_size:
+            level = len(self.levels)
+            shape = ((shape[0] + 1) // 2, (shape[1] + 1) // 2)
+            if temp is None:
+                targets = {kind: np.empty(shape, dtype=np.float32) for kind in KINDS}
+            else:
+                targets = {kind: np.lib.format.open_memmap(
+                    os.path.join(temp, f"{kind}{level}.npy"), mode='w+',
+                    dtype=np.float32, shape=shape) for kind in KINDS}
+            low, high = _halve(self.levels[-1], targets, max(2, BUILD_BAND_BYTES // row_bytes))
+            if level == 1:
+                vmin, vmax = low, high
+            self.levels.append(targets)
+            if progress is not None:
+                progress(level)
+        if len(self.levels) == 1:
+            # Already small; no level was built to find the range on the way
+            vmin, vmax = _source_range(self.source)
+        if not vmin <= vmax:
+            raise ValueError("Raster contains no finite values")
+        self.vmin, self.vmax = vmin, (vmax if vmax > vmin else vmin + 1.0)
+
+        if temp is None:
+            return
+        try:
+            for targets in self.levels[1:]:
+                for array in targets.values():
+                    array.flush()
+            with open(os.path.join(temp, 'meta.json'), 'w') as f:
+                json.dump({'levels': len(self.levels), 'vmin': self.vmin, 'vmax': self.vmax,
+                           'shape': list(self.source.shape)}, f)
+            shutil.rmtree(self.path, ignore_errors=True)
+            os.replace(temp, self.path)
+        except OSError:
+            shutil.rmtree(temp, ignore_errors=True)
+            return
+        # Reopen read-only from the final location
+        del self.levels[1:]
+        self._load()
+
+    @property
+    def shape(self):
+        return self.source.shape
+
+    def level_for(self, scale):
+        """Coarsest level with at most scale source pixels per level pixel"""
+        level = int(np.floor(np.log2(max(scale, 1.0))))
+        return min(level, len(self.levels) - 1)
+
+    def sample(self, level, kind, x0, y0, scale, width, height):
+        """(height, width) float32 screen pixels, nearest-neighbor from a level
+
+        Screen pixel (i, j) shows source coordinate (x0 + (j + 0.5) * scale,
+        y0 + (i + 0.5) * scale); pixels outside the raster are NaN. Only the
+        block of the level under the window is read.
+        """
+        data = self.levels[level][kind]
+        factor = 2 ** level
+        cols = np.floor((x0 + (np.arange(width) + 0.5) * scale) / factor).astype(np.intp)
+        rows = np.floor((y0 + (np.arange(height) + 0.5) * scale) / factor).astype(np.intp)
+        col_ok = (cols >= 0) & (cols < data.shape[1])
+        row_ok = (rows >= 0) & (rows < data.shape[0])
+        out = np.full((height, width), np.nan, dtype=np.float32)
+        if not col_ok.any() or not row_ok.any():
+            return out
+        c0, c1 = cols[col_ok].min(), cols[col_ok].max() + 1
+        r0, r1 = rows[row_ok].min(), rows[row_ok].max() + 1
+        block = np.asarray(data[r0:r1, c0:c1], dtype=np.float32)
+        out[np.ix_(row_ok, col_ok)] = block[np.ix_(rows[row_ok] - r0, cols[col_ok] - c0)]
+        return out
+
+
+def _source_range(source):
+    """NaN-ignoring (min, max) of a small raster"""
+    finite = np.asarray(source, dtype=np.float32)
+    finite = finite[np.isfinite(finite)]
+    if not finite.size:
+        return np.inf, -np.inf
+    return float(finite.min()), float(finite.max())
+
+
+class Viewport:
+    """Which part of a pyramid a width x height screen area shows
+
+    x0/y0 are the source coordinates of the top-left corner and scale the
+    source pixels per screen pixel. The screen is split into tiles so a
+    viewer can refine it a piece at a time.
+    """
+
+    def __init__(self, pyramid, width, height, tile=128):
+        self.pyramid = pyramid
+        self.width, self.height, self.tile = width, height, tile
+        self.fit()
+
+    def fit(self):
+        """Show the whole raster, centered"""
+        rows, cols = self.pyramid.shape
+        self.scale = max(cols / self.width, rows / self.height)
+        self.x0 = (cols - self.width * self.scale) / 2
+        self.y0 = (rows - self.height * self.scale) / 2
+
+    def zoom(self, factor, x, y):
+        """Zoom in by factor (out below 1) keeping screen point (x, y) fixed"""
+        rows, cols = self.pyramid.shape
+        fit_scale = max(cols / self.width, rows / self.height)
+        scale = min(max(self.scale / factor, 1 / 16), fit_scale * 2)
+        self.x0 += x * (self.scale - scale)
+        self.y0 += y * (self.scale - scale)
+        self.scale = scale
+
+    def pan(self, dx, dy):
+        """Move the view by screen pixels"""
+        self.x0 -= dx * self.scale
+        self.y0 -= dy * self.scale
+
+    @property
+    def level(self):
+        return self.pyramid.level_for(self.scale)
+
+    def tiles(self):
+        """(left, top, right, bottom) screen rectangles, center first"""
+        rects = [(x, y, min(x + self.tile, self.width), min(y + self.tile, self.height))
+                 for y in range(0, self.height, self.tile)
+                 for x in range(0, self.width, self.tile)]
+        cx, cy = self.width / 2, self.height / 2
+        return sorted(rects, key=lambda r: ((r[0] + r[2]) / 2 - cx) ** 2 + ((r[1] + r[3]) / 2 - cy) ** 2)
+
+    def sample(self, level, kind, rect=None):
+        """Screen pixels of rect (the whole screen by default) from a level"""
+        left, top, right, bottom = rect or (0, 0, self.width, self.height)
+        return self.pyramid.sample(level, kind, self.x0 + left * self.scale,
+                                   self.y0 + top * self.scale, self.scale,
+                                   right - left, bottom - top)
@@ -0,0 +1,224 @@
+"""
+Stop Simplification
+Fit the smallest practical stop list to a dense colormap (a matplotlib
+colormap name, an (N, 3) array, a CSV or a gradient image) so that it
+reproduces every entry within a CIEDE2000 tolerance
+
+    python colormap_simplify.py viridis -t 1.0 -o viridis.cmap
+"""
+
+import argparse
+import csv
+import os
+import sys
+
+import numpy as np
+
+from colormap_analysis import ciede2000
+from colormap_engine import Colormap
+from colormap_spaces import SPACES, srgb_to_lab
+
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.bmp', '.tif', '.tiff')
+
+
+def _as_colors(array):
+    """(N, 3) float colors from an (N, 3/4) float or 0-255 array"""
+    array = np.asarray(array)
+    if array.ndim != 2 or array.shape[1] not in (3, 4) or len(array) < 2:
+        raise ValueError(f"Expected at least 2 colors shaped (N, 3) or (N, 4), got {array.shape}")
+    colors = array[:, :3].astype(float)
+    if array.dtype == np.uint8 or colors.max() > 1.0:
+        colors /= 255.0
+    return np.clip(colors, 0.0, 1.0)
+
+
+def _read_csv(filename):
+    """Rows of r,g,b or position,r,g,b (0-1 or 0-255); non-numeric rows are headers"""
+    rows = []
+    with open(filename, newline='') as f:
+        for row in csv.reader(f):
+            try:
+                values = [float(cell) for cell in row if cell.strip()]
+            except ValueError:
+                continue
+            if values:
+                rows.append(values)
+    array = np.array(rows)
+    if array.ndim != 2 or array.shape[1] not in (3, 4):
+        raise ValueError("CSV rows must be r,g,b or position,r,g,b")
+    if array.shape[1] == 4:
+        return array[:, 0], _as_colors(array[:, 1:])
+    return None, _as_colors(array)
+
+
+def _read_image(filename):
+    """Colors along the long axis of a gradient image, averaged across it
+
+    Vertical gradients are read bottom to top, as colorbars are drawn.
+    """
+    from matplotlib.image import imread
+
+    image = np.asarray(imread(filename))
+    if image.ndim == 2:
+        image = np.repeat(image[..., np.newaxis], 3, axis=-1)
+    if image.dtype != np.uint8:
+        image = np.clip(image, 0.0, 1.0)
+    vertical = image.shape[0] > image.shape[1]
+    strip = image[::-1].mean(axis=1) if vertical else image.mean(axis=0)
+    colors = strip[:, :3] / (255.0 if image.dtype == np.uint8 else 1.0)
+    return np.clip(colors, 0.0, 1.0)
+
+
+def load_dense(source, n=256):
+    """(positions, colors) of a dense colormap from any supported source
+
+    source is an array, a file (.npy, .csv or an image) or the name of a
+    registered matplotlib colormap, sampled at n points.
+    """
+    positions = None
+    if not isinstance(source, str):
+        colors = _as_colors(source)
+    elif os.path.exists(source):
+        ext = os.path.splitext(source)[1].lower()
+        if ext == '.npy':
+            colors = _as_colors(np.load(source))
+        elif ext == '.csv':
+            positions, colors = _read_csv(source)
+        elif ext in IMAGE_EXTENSIONS:
+            colors = _read_image(source)
+        else:
+            raise ValueError(f"Unknown colormap source type {ext!r}")
+    else:
+        import matplotlib
+
+        try:
+            cmap = matplotlib.colormaps[source]
+        except KeyError:
+            raise ValueError(f"{source!r} is neither a file nor a matplotlib colormap") from None
+        colors = cmap(np.linspace(0.0, 1.0, n))[:, :3]
+    if positions is None:
+        positions = np.linspace(0.0, 1.0, len(colors))
+    elif np.any(np.diff(positions) < 0):
+        raise ValueError("Positions must be sorted")
+    return np.asarray(positions, dtype=float), colors
+
+
+class _Fit:
+    """Dense colors prepared once for fast segment error evaluation"""
+
+    def __init__(self, positions, colors, space):
+        to_space, self.from_space = SPACES[space]
+        self.positions = positions
+        self.coords = to_space(colors)
+        self.lab = srgb_to_lab(colors)
+
+    def errors(self, starts, stops):
+        """Max ΔE of each straight segment starts[k] -> stops[k] (k,) and its argmax
+
+        Every dense entry strictly between a segment's ends is compared
+        with the linear interpolation of the ends; segments must not overlap.
+        """
+        lengths = stops - starts - 1
+        if lengths.sum() == 0:
+            return np.zeros(len(starts)), starts.copy()
+        seg = np.repeat(np.arange(len(starts)), lengths)
+        offsets = np.arange(len(seg)) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+        idx = starts[seg] + 1 + offsets
+        a, b = starts[seg], stops[seg]
+        t = (self.positions[idx] - self.positions[a]) / (self.positions[b] - self.positions[a])
+        predicted = self.coords[a] + (self.coords[b] - self.coords[a]) * t[:, np.newaxis]
+        error = ciede2000(self.lab[idx], srgb_to_lab(np.clip(self.from_space(predicted), 0.0, 1.0)))
+
+        worst = np.zeros(len(starts))
+        np.maximum.at(worst, seg, error)
+        # Index of each segment's worst entry (first one on ties)
+        at_worst = error == worst[seg]
+        first = np.full(len(starts), len(idx))
+        np.minimum.at(first, seg[at_worst], np.flatnonzero(at_worst))
+        argmax = np.where(lengths > 0, idx[np.minimum(first, len(idx) - 1)], starts)
+        return worst, argmax
+
+
+def simplify(positions, colors, tolerance=1.0, space='srgb'):
+    """Indices of the dense entries to keep as stops
+
+    Ramer-Douglas-Peucker on the color curve, splitting every segment that
+    is out of tolerance in one vectorized pass per level, followed by a
+    pruning pass that drops stops whose neighbors can be joined directly.
+    """
+    positions = np.asarray(positions, dtype=float)
+    colors = np.asarray(colors, dtype=float)
+    fit = _Fit(positions, colors, space)
+    keep = np.array([0, len(colors) - 1])
+    while True:
+        worst, argmax = fit.errors(keep[:-1], keep[1:])
+        split = worst > tolerance
+        if not split.any():
+            break
+        keep = np.sort(np.concatenate([keep, argmax[split]]))
+
+    # Removing stop k joins keep[k-1] and keep[k+1]; alternate parities so
+    # the joined segments checked together never overlap
+    removed = True
+    while removed and len(keep) > 2:
+        removed = False
+        for parity in (1, 2):
+            candidates = np.arange(parity, len(keep) - 1, 2)
+            if not len(candidates):
+                continue
+            worst, _ = fit.errors(keep[candidates - 1], keep[candidates + 1])
+            drop = candidates[worst <= tolerance]
+            if len(drop):
+                keep = np.delete(keep, drop)
+                removed = True
+    return keep
+
+
+def max_error(positions, colors, keep, space='srgb'):
+    """Largest ΔE between the dense colors and the stops at keep"""
+    fit = _Fit(np.asarray(positions, dtype=float), np.asarray(colors, dtype=float), space)
+    worst, _ = fit.errors(keep[:-1], keep[1:])
+    return float(worst.max())
+
+
+def fit_colormap(source, tolerance=1.0, space='srgb', name=None, n=256):
+    """Compact Colormap reproducing source within tolerance (CIEDE2000)"""
+    positions, colors = load_dense(source, n)
+    keep = simplify(positions, colors, tolerance, space)
+    if name is None:
+        name = (os.path.splitext(os.path.basename(source))[0]
+                if isinstance(source, str) else 'fitted_colormap')
+    cmap = Colormap.from_arrays(positions[keep], colors[keep], name=name, interpolation=space)
+    cmap.metadata = {'fit_tolerance': tolerance, 'fit_entries': len(colors),
+                     'fit_max_delta_e': max_error(positions, colors, keep, space)}
+    return cmap
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Fit a compact stop list to a dense colormap")
+    parser.add_argument('source', help="matplotlib colormap name, .npy, .csv or gradient image")
+    parser.add_argument('-t', '--tolerance', type=float, default=1.0, help="Max CIEDE2000 error")
+    parser.add_argument('--space', default='srgb', choices=list(SPACES),
+                        help="Space the stops are interpolated in")
+    parser.add_argument('-n', '--samples', type=int, default=256,
+                        help="Samples taken from matplotlib colormaps")
+    parser.add_argument('-o', '--output', help="Write the fitted .cmap here")
+    args = parser.parse_args(argv)
+
+    try:
+        cmap = fit_colormap(args.source, args.tolerance, args.space, n=args.samples)
+    except (OSError, ValueError) as e:
+        print(f"error: {e}")
+        return 1
+    print(f"{cmap.name}: {cmap.metadata['fit_entries']} entries -> {len(cmap)} stops, "
+          f"max ΔE {cmap.metadata['fit_max_delta_e']:.3f}")
+    if args.output:
+        cmap.save(args.output)
+    else:
+        for position, color in cmap.stops():
+            print(f"{position:.6f}  #{''.join(f'{round(c * 255):02x}' for c in color)}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
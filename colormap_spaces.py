@@ -0,0 +1,183 @@
+"""
+Color Spaces
+Vectorized conversions between sRGB and the spaces colormap stops can be
+interpolated in (linear RGB, CIELAB, OKLab, HSV); every kernel takes and
+returns (..., 3) float arrays
+"""
+
+import numpy as np
+
+# Interpolation spaces by name, with labels for the GUI
+SPACE_LABELS = {
+    'srgb': 'sRGB',
+    'linear': 'Linear RGB',
+    'lab': 'CIELAB',
+    'oklab': 'OKLab',
+    'hsv': 'HSV (shortest hue)',
+}
+
+# Linear sRGB -> CIE XYZ, D65 white point
+RGB_TO_XYZ = np.array([[0.4124564, 0.3575761, 0.1804375],
+                       [0.2126729, 0.7151522, 0.0721750],
+                       [0.0193339, 0.1191920, 0.9503041]])
+XYZ_TO_RGB = np.linalg.inv(RGB_TO_XYZ)
+D65_WHITE = RGB_TO_XYZ.sum(axis=1)
+
+# OKLab (Ottosson 2020): linear sRGB -> LMS, and cube-rooted LMS -> Lab
+OKLAB_M1 = np.array([[0.4122214708, 0.5363325363, 0.0514459929],
+                     [0.2119034982, 0.6806995451, 0.1073969566],
+                     [0.0883024619, 0.2817188376, 0.6299787005]])
+OKLAB_M2 = np.array([[0.2104542553, 0.7936177850, -0.0040720468],
+                     [1.9779984951, -2.4285922050, 0.4505937099],
+                     [0.0259040371, 0.7827717662, -0.8086757660]])
+OKLAB_M1_INV = np.linalg.inv(OKLAB_M1)
+OKLAB_M2_INV = np.linalg.inv(OKLAB_M2)
+
+_LAB_DELTA = 6 / 29
+
+
+def srgb_to_linear(rgb):
+    rgb = np.asarray(rgb, dtype=float)
+    return np.where(rgb <= 0.04045, rgb / 12.92, ((rgb + 0.055) / 1.055) ** 2.4)
+
+
+def linear_to_srgb(linear):
+    linear = np.asarray(linear, dtype=float)
+    # Clamp before the power so out-of-gamut negatives do not produce NaN
+    safe = np.maximum(linear, 0.0)
+    return np.where(linear <= 0.0031308, linear * 12.92, 1.055 * safe ** (1 / 2.4) - 0.055)
+
+
+def srgb_to_xyz(rgb):
+    return srgb_to_linear(rgb) @ RGB_TO_XYZ.T
+
+
+def xyz_to_srgb(xyz):
+    return linear_to_srgb(np.asarray(xyz, dtype=float) @ XYZ_TO_RGB.T)
+
+
+def xyz_to_lab(xyz):
+    t = np.asarray(xyz, dtype=float) / D65_WHITE
+    f = np.where(t > _LAB_DELTA ** 3, np.cbrt(t), t / (3 * _LAB_DELTA ** 2) + 4 / 29)
+    return np.stack([116 * f[..., 1] - 16,
+                     500 * (f[..., 0] - f[..., 1]),
+                     200 * (f[..., 1] - f[..., 2])], axis=-1)
+
+
+def lab_to_xyz(lab):
+    lab = np.asarray(lab, dtype=float)
+    fy = (lab[..., 0] + 16) / 116
+    f = np.stack([fy + lab[..., 1] / 500, fy, fy - lab[..., 2] / 200], axis=-1)
+    t = np.where(f > _LAB_DELTA, f ** 3, 3 * _LAB_DELTA ** 2 * (f - 4 / 29))
+    return t * D65_WHITE
+
+
+def srgb_to_lab(rgb):
+    return xyz_to_lab(srgb_to_xyz(rgb))
+
+
+def lab_to_srgb(lab):
+    return xyz_to_srgb(lab_to_xyz(lab))
+
+
+def srgb_to_oklab(rgb):
+    lms = srgb_to_linear(rgb) @ OKLAB_M1.T
+    return np.cbrt(lms) @ OKLAB_M2.T
+
+
+def oklab_to_srgb(lab):
+    lms = (np.asarray(lab, dtype=float) @ OKLAB_M2_INV.T) ** 3
+    return linear_to_srgb(lms @ OKLAB_M1_INV.T)
+
+
+def hsv_to_rgb_array(h, s, v):
+    """Vectorized colorsys.hsv_to_rgb for broadcastable arrays, returns (..., 3)"""
+    h, s, v = np.broadcast_arrays(np.asarray(h, dtype=float),
+                                  np.asarray(s, dtype=float),
+                                  np.asarray(v, dtype=float))
+    i = np.floor(h * 6.0)
+    f = h * 6.0 - i
+    p = v * (1.0 - s)
+    q = v * (1.0 - s * f)
+    t = v * (1.0 - s * (1.0 - f))
+    i = i.astype(int) % 6
+
+    # Same sector table as colorsys, selected per element
+    r = np.choose(i, [v, q, p, p, t, v])
+    g = np.choose(i, [t, v, v, q, p, p])
+    b = np.choose(i, [p, p, t, v, v, q])
+    return np.stack([r, g, b], axis=-1)
+
+
+def rgb_to_hsv_array(rgb):
+    """Vectorized colorsys.rgb_to_hsv, (..., 3) in and out"""
+    rgb = np.asarray(rgb, dtype=float)
+    r, g, b = rgb[..., 0], rgb[..., 1], rgb[..., 2]
+    v = rgb.max(axis=-1)
+    delta = v - rgb.min(axis=-1)
+    s = np.divide(delta, v, out=np.zeros_like(v), where=v > 0)
+    d = np.where(delta > 0, delta, 1.0)
+    h = np.select([delta == 0, v == r, v == g],
+                  [0.0, (g - b) / d, 2.0 + (b - r) / d],
+                  4.0 + (r - g) / d)
+    return np.stack([(h / 6.0) % 1.0, s, v], axis=-1)
+
+
+def srgb_to_hsv(rgb):
+    return rgb_to_hsv_array(rgb)
+
+
+def hsv_to_srgb(hsv):
+    hsv = np.asarray(hsv, dtype=float)
+    return hsv_to_rgb_array(hsv[..., 0] % 1.0, hsv[..., 1], hsv[..., 2])
+
+
+# (from sRGB, to sRGB) kernels for each interpolation space
+SPACES = {
+    'srgb': (lambda rgb: np.asarray(rgb, dtype=float), lambda rgb: rgb),
+    'linear': (srgb_to_linear, linear_to_srgb),
+    'lab': (srgb_to_lab, lab_to_srgb),
+    'oklab': (srgb_to_oklab, oklab_to_srgb),
+    'hsv': (srgb_to_hsv, hsv_to_srgb),
+}
+
+
+def _unwrap_hues(hsv):
+    """Make stop hues continuous so interpolation takes the shortest arc
+
+    Gray stops have no hue; they borrow the nearest colored neighbor's so a
+    fade to gray does not swing through unrelated hues.
+    """
+    hsv = hsv.copy()
+    chromatic = (hsv[:, 1] > 0) & (hsv[:, 2] > 0)
+    if chromatic.any() and not chromatic.all():
+        idx = np.flatnonzero(chromatic)
+        nearest = idx[np.clip(np.searchsorted(idx, np.arange(len(hsv))), 0, len(idx) - 1)]
+        previous = idx[np.clip(np.searchsorted(idx, np.arange(len(hsv)), 'right') - 1,
+                               0, len(idx) - 1)]
+        use_previous = np.abs(previous - np.arange(len(hsv))) <= np.abs(nearest - np.arange(len(hsv)))
+        source = np.where(use_previous, previous, nearest)
+        hsv[~chromatic, 0] = hsv[source[~chromatic], 0]
+    steps = (np.diff(hsv[:, 0]) + 0.5) % 1.0 - 0.5
+    hsv[1:, 0] = hsv[0, 0] + np.cumsum(steps)
+    return hsv
+
+
+def interpolate(positions, colors, x, space='srgb'):
+    """Piecewise-linear interpolation of sRGB stops in the given space
+
+    positions must be sorted; x outside them holds the end colors. Returns
+    (len(x), 3) sRGB clipped to [0, 1] (the gamut for Lab/OKLab results).
+    """
+    if space not in SPACES:
+        raise ValueError(f"Unknown interpolation space {space!r}, "
+                         f"expected one of {', '.join(SPACES)}")
+    to_space, from_space = SPACES[space]
+    coords = to_space(np.asarray(colors, dtype=float).reshape(-1, 3))
+    if space == 'hsv':
+        coords = _unwrap_hues(coords)
+    x = np.asarray(x, dtype=float)
+    result = np.empty(x.shape + (3,))
+    for c in range(3):
+        result[..., c] = np.interp(x, positions, coords[:, c])
+    return np.clip(from_space(result), 0.0, 1.0)
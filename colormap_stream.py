@@ -0,0 +1,250 @@
+"""
+Out-of-core Colorization
+Colorize rasters larger than memory band by band from memory-mapped input,
+writing RGB(A) output to a memory-mapped .npy/raw file or a streamed PNG
+"""
+
+import os
+import struct
+import time
+import zlib
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+
+import numpy as np
+
+from colormap_engine import Colormap, CompiledLUT, CompiledPalette
+
+# Default band size; peak memory is about workers * 2 bands of RGBA output
+TILE_BYTES = 32 * 1024 * 1024
+
+# Reported to the progress callback after each band and returned in order
+TileReport = namedtuple('TileReport', 'index total row_start row_stop seconds')
+
+
+def open_raster(filename, dtype=None, shape=None, offset=0):
+    """Memory-map a .npy file, or a raw file when dtype and shape are given"""
+    if str(filename).endswith('.npy'):
+        return np.load(filename, mmap_mode='r')
+    if dtype is None or shape is None:
+        raise ValueError("Raw rasters need an explicit dtype and shape")
+    return np.memmap(filename, dtype=dtype, mode='r', shape=tuple(shape), offset=offset)
+
+
+def _adler32_combine(adler1, adler2, length2):
+    """Adler-32 of two concatenated buffers from their checksums (zlib's algorithm)"""
+    base = 65521
+    rem = length2 % base
+    sum1 = adler1 & 0xffff
+    sum2 = (rem * sum1) % base
+    sum1 += (adler2 & 0xffff) + base - 1
+    sum2 += (adler1 >> 16) + (adler2 >> 16) + base - rem
+    sum1 %= base
+    sum2 %= base
+    return sum1 | (sum2 << 16)
+
+
+def deflate_rows(rows, compress_level=6):
+    """Compress image rows into an independent PNG data segment
+
+    Returns (deflate_bytes, adler32, raw_length). Segments are raw deflate
+    ending on a sync flush, so they can be produced in parallel and simply
+    concatenated by PNGWriter.write_segment().
+    """
+    rows = np.asarray(rows, dtype=np.uint8)
+    # Each scanline is prefixed with filter type 0 (None)
+    scanlines = np.zeros((len(rows), 1 + rows[0].size), dtype=np.uint8)
+    scanlines[:, 1:] = rows.reshape(len(rows), -1)
+    raw = scanlines.data
+    compressor = zlib.compressobj(compress_level, zlib.DEFLATED, -15)
+    data = compressor.compress(raw) + compressor.flush(zlib.Z_SYNC_FLUSH)
+    return data, zlib.adler32(raw), scanlines.nbytes
+
+
+class PNGWriter:
+    """Write an 8-bit RGB/RGBA PNG incrementally, a band of rows at a time"""
+
+    def __init__(self, filename, width, height, channels=4, compress_level=6):
+        if channels not in (3, 4):
+            raise ValueError("PNG output needs 3 (RGB) or 4 (RGBA) channels")
+        self.width, self.height, self.channels = width, height, channels
+        self.compress_level = compress_level
+        self.rows_written = 0
+        self._adler = 1
+        self._file = open(filename, 'wb')
+
+        self._file.write(b'\x89PNG\r\n\x1a\n')
+        color_type = 6 if channels == 4 else 2
+        self._chunk(b'IHDR', struct.pack('>IIBBBBB', width, height, 8, color_type, 0, 0, 0))
+        # zlib stream header (deflate, 32K window); segments follow as IDAT
+        self._chunk(b'IDAT', b'\x78\x9c')
+
+    def write_rows(self, rows):
+        """Compress and append uint8 rows shaped (k, width, channels)"""
+        rows = np.asarray(rows, dtype=np.uint8)
+        if rows.shape[1:] != (self.width, self.channels):
+            raise ValueError(f"Expected rows of shape (k, {self.width}, {self.channels})")
+        self.write_segment(*deflate_rows(rows, self.compress_level), rows=len(rows))
+
+    def write_segment(self, data, adler, length, rows):
+        """Append a segment from deflate_rows() covering the given number of rows"""
+        self._chunk(b'IDAT', data)
+        self._adler = _adler32_combine(self._adler, adler, length)
+        self.rows_written += rows
+
+    def close(self):
+        """Finish the image; raises if fewer rows than height were written"""
+        if self._file.closed:
+            return
+        try:
+            if self.rows_written != self.height:
+                raise ValueError(f"Wrote {self.rows_written} of {self.height} rows")
+            # Final empty deflate block, then the stream checksum
+            self._chunk(b'IDAT', b'\x03\x00' + struct.pack('>I', self._adler))
+            self._chunk(b'IEND', b'')
+        finally:
+            self._file.close()
+
+    def abort(self):
+        """Close the file without finishing the image"""
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+    def _chunk(self, tag, data):
+        self._file.write(struct.pack('>I', len(data)))
+        self._file.write(tag + data)
+        self._file.write(struct.pack('>I', zlib.crc32(tag + data) & 0xffffffff))
+
+
+def data_range(data, tile_rows):
+    """NaN-ignoring (min, max) of a memory-mapped array, one band at a time"""
+    vmin, vmax = np.inf, -np.inf
+    for start in range(0, len(data), tile_rows):
+        band = np.asarray(data[start:start + tile_rows])
+        finite = band[np.isfinite(band)] if band.dtype.kind == 'f' else band
+        if finite.size:
+            vmin = min(vmin, float(finite.min()))
+            vmax = max(vmax, float(finite.max()))
+    if vmin > vmax:
+        raise ValueError("Input contains no finite values")
+    return vmin, (vmax if vmax > vmin else vmin + 1.0)
+
+
+def _colorize_band(src, lut, row_start, row_stop, dst, alpha):
+    """Colorize rows [row_start, row_stop); worker entry point for both pools
+
+    src and dst are file specs rather than arrays so process workers map the
+    files themselves instead of receiving pickled data.
+    """
+    started = time.perf_counter()
+    data = open_raster(*src)
+    band = data[row_start:row_stop]
+    if dst is None:
+        # PNG output: compress here too, so deflate also runs in parallel
+        result = deflate_rows(lut.apply(band, alpha=alpha))
+    else:
+        out = _open_output(dst)
+        lut.apply(band, out=out[row_start:row_stop], alpha=alpha)
+        out.flush()
+        result = None
+    return result, time.perf_counter() - started
+
+
+def _open_output(dst):
+    """Open an output spec created by colorize_file for writing"""
+    kind, filename = dst[0], dst[1]
+    if kind == 'npy':
+        return np.load(filename, mmap_mode='r+')
+    return np.memmap(filename, dtype=np.uint8, mode='r+', shape=dst[2])
+
+
+def colorize_file(src, dst, cmap, vmin=None, vmax=None, alpha=True,
+                  tile_rows=None, workers=None, processes=False,
+                  dtype=None, shape=None, offset=0, progress=None):
+    """Colorize a memory-mapped raster into dst without loading it whole
+
+    src is a .npy file, or a raw file described by dtype/shape/offset. dst
+    ending in .npy or .png gets that format; anything else is written as raw
+    interleaved uint8 RGB(A). cmap is a Colormap (compiled over vmin/vmax,
+    which default to the data range) or a CompiledLUT used as-is; class
+    rasters (integer labels) take a CompiledPalette from compile_palette().
+
+    Bands of tile_rows rows are colorized on a thread pool (NumPy releases
+    the GIL), or a process pool when processes is True. Peak memory is set
+    by tile_rows and workers, not by the input size. progress, if given, is
+    called with a TileReport after every band; all reports are returned.
+    """
+    src_spec = (src, dtype, shape, offset)
+    data = open_raster(*src_spec)
+    channels = 4 if alpha else 3
+    height = len(data)
+    row_bytes = max(1, int(np.prod(data.shape[1:], dtype=np.int64)) * channels)
+    if tile_rows is None:
+        tile_rows = max(1, TILE_BYTES // row_bytes)
+    if workers is None:
+        workers = os.cpu_count() or 1
+
+    if isinstance(cmap, Colormap):
+        if vmin is None or vmax is None:
+            data_min, data_max = data_range(data, tile_rows)
+            vmin = data_min if vmin is None else vmin
+            vmax = data_max if vmax is None else vmax
+        lut = cmap.compile(vmin=vmin, vmax=vmax)
+    elif isinstance(cmap, (CompiledLUT, CompiledPalette)):
+        lut = cmap
+    else:
+        raise TypeError("cmap must be a Colormap, CompiledLUT or CompiledPalette")
+
+    out_shape = data.shape + (channels,)
+    dst = str(dst)
+    writer = None
+    if dst.endswith('.png'):
+        if data.ndim != 2:
+            raise ValueError("PNG output needs a 2D input raster")
+        writer = PNGWriter(dst, data.shape[1], height, channels)
+        dst_spec = None
+    elif dst.endswith('.npy'):
+        np.lib.format.open_memmap(dst, mode='w+', dtype=np.uint8, shape=out_shape).flush()
+        dst_spec = ('npy', dst)
+    else:
+        np.memmap(dst, dtype=np.uint8, mode='w+', shape=out_shape).flush()
+        dst_spec = ('raw', dst, out_shape)
+
+    bands = [(start, min(start + tile_rows, height)) for start in range(0, height, tile_rows)]
+    reports = []
+    pool_class = ProcessPoolExecutor if processes else ThreadPoolExecutor
+    try:
+        with pool_class(max_workers=workers) as pool:
+            # Keep a bounded window of bands in flight; results are consumed in
+            # order so the PNG writer can stream them
+            pending = []
+            next_band = 0
+            while next_band < len(bands) or pending:
+                while next_band < len(bands) and len(pending) < 2 * workers:
+                    start, stop = bands[next_band]
+                    pending.append(pool.submit(_colorize_band, src_spec, lut,
+                                               start, stop, dst_spec, alpha))
+                    next_band += 1
+                segment, seconds = pending.pop(0).result()
+                index = len(reports)
+                if writer is not None:
+                    writer.write_segment(*segment, rows=bands[index][1] - bands[index][0])
+                report = TileReport(index, len(bands), bands[index][0], bands[index][1], seconds)
+                reports.append(report)
+                if progress is not None:
+                    progress(report)
+    except BaseException:
+        if writer is not None:
+            writer.abort()
+        raise
+    if writer is not None:
+        writer.close()
+    return reports
@@ -0,0 +1,667 @@
+"""
+Native Tk Views
+Color wheel, brightness bar, preview strip and sample images drawn straight
+onto tk.Canvas from NumPy-filled PhotoImage buffers, with no matplotlib involved
+"""
+
+import os
+import tkinter as tk
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+
+import numpy as np
+
+from colormap_cvd import DEFICIENCIES, simulate, simulate_image
+from colormap_engine import asset_cache_dir
+from colormap_spaces import hsv_to_rgb_array
+
+WHEEL_SIZE = 500
+VALUE_BAR_ROWS = 256
+
+# Bump when the wheel rendering changes so stale cached files are ignored
+WHEEL_CACHE_VERSION = 1
+
+
+@lru_cache(maxsize=4)
+def color_wheel_image(size=WHEEL_SIZE):
+    """Hue/saturation wheel at full brightness, white outside the circle (cached by size)"""
+    center = size / 2
+    x = np.arange(size) - center
+    y = center - np.arange(size)  # Flip y-axis
+    xx, yy = np.meshgrid(x, y)
+
+    radius = np.sqrt(xx**2 + yy**2) / center
+    angle = np.mod(np.arctan2(yy, xx), 2 * np.pi)
+
+    wheel_img = hsv_to_rgb_array(angle / (2 * np.pi), radius, 1.0)
+    wheel_img[radius > 1.0] = 1.0
+    wheel_img.flags.writeable = False
+    return wheel_img
+
+
+@lru_cache(maxsize=64)
+def value_bar_image(hue, saturation, rows=VALUE_BAR_ROWS):
+    """Brightness gradient (black to full) for a hue/saturation pair, shape (rows, 1, 3)"""
+    values = np.linspace(0, 1, rows).reshape(-1, 1)
+    colors = hsv_to_rgb_array(hue, saturation, values)
+    colors.flags.writeable = False
+    return colors
+
+
+def ppm_data(rgb):
+    """Binary PPM bytes for an (h, w, 3) float [0, 1] or uint8 image
+
+    Tk decodes PPM natively, so this is the fastest way to fill a PhotoImage
+    from an array (no per-pixel Tcl strings).
+    """
+    rgb = np.asarray(rgb)
+    if rgb.dtype != np.uint8:
+        rgb = np.round(np.clip(rgb, 0.0, 1.0) * 255).astype(np.uint8)
+    height, width = rgb.shape[:2]
+    return b'P6 %d %d 255\n' % (width, height) + np.ascontiguousarray(rgb).tobytes()
+
+
+@lru_cache(maxsize=4)
+def wheel_ppm(size):
+    """PPM bytes of the color wheel, cached in memory and on disk by size
+
+    Reading the cached file is much faster than rendering the wheel, so
+    only the first start at a given size pays for it.
+    """
+    path = os.path.join(asset_cache_dir(), f"wheel-{size}-v{WHEEL_CACHE_VERSION}.ppm")
+    expected = len(b'P6 %d %d 255\n' % (size, size)) + size * size * 3
+    try:
+        with open(path, 'rb') as f:
+            data = f.read()
+        if len(data) == expected and data.startswith(b'P6 '):
+            return data
+    except OSError:
+        pass
+
+    data = ppm_data(color_wheel_image(size))
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Write then rename, so concurrent starts never read a partial file
+        temp = f"{path}.{os.getpid()}.tmp"
+        with open(temp, 'wb') as f:
+            f.write(data)
+        os.replace(temp, path)
+    except OSError:
+        pass  # Unwritable cache directory: render on every start instead
+    return data
+
+
+class PhotoLayer:
+    """A PhotoImage placed on a canvas, refilled from arrays in place"""
+
+    def __init__(self, canvas, x, y):
+        self.canvas = canvas
+        self.photo = None
+        self.item = canvas.create_image(x, y, anchor=tk.NW)
+
+    def set(self, rgb=None, data=None):
+        """Replace the pixels from an (h, w, 3) array or ready PPM bytes"""
+        data = ppm_data(rgb) if data is None else data
+        if self.photo is None:
+            self.photo = tk.PhotoImage(master=self.canvas, data=data, format='PPM')
+            self.canvas.itemconfig(self.item, image=self.photo)
+        else:
+            self.photo.configure(data=data, format='PPM')
+
+
+class DragArea:
+    """Press/drag/release handling shared by the pickable views
+
+    on_pick(x, y, clamp) gets canvas pixel coordinates and returns False to
+    refuse a press (e.g. outside the wheel); on_release ends the drag.
+    """
+
+    def __init__(self, widget, on_pick, on_release):
+        self._on_pick = on_pick
+        self._on_release = on_release
+        self._dragging = False
+        widget.bind('<ButtonPress-1>', self._press)
+        widget.bind('<B1-Motion>', self._motion)
+        widget.bind('<ButtonRelease-1>', self._release)
+
+    def _press(self, event):
+        self._dragging = bool(self._on_pick(event.x, event.y, False))
+
+    def _motion(self, event):
+        if self._dragging:
+            self._on_pick(event.x, event.y, True)
+
+    def _release(self, event):
+        if self._dragging:
+            self._dragging = False
+            self._on_release()
+
+
+class WheelView:
+    """Hue/saturation wheel: static PhotoImage plus a canvas marker
+
+    on_pick(x, y, clamp) is called with wheel coordinates (unit circle) and
+    returns False when the point is outside the wheel and clamp is off.
+    """
+
+    def __init__(self, master, on_pick, on_release, size=400, margin=30):
+        self.size = size
+        self.radius = size / 2
+        self.cx = margin + self.radius
+        self.cy = 2 * margin + self.radius
+        self._on_pick = on_pick
+        self.canvas = tk.Canvas(master, width=size + 2 * margin,
+                                height=size + 3 * margin, bg='white',
+                                highlightthickness=0)
+        self.canvas.create_text(self.cx, margin, text='Hue & Saturation',
+                                font=('TkDefaultFont', 11, 'bold'))
+        self.image = PhotoLayer(self.canvas, margin, 2 * margin)
+        self.image.set(data=wheel_ppm(size))
+        r = self.radius
+        self.canvas.create_oval(self.cx - r, self.cy - r, self.cx + r, self.cy + r,
+                                outline='black', width=2)
+        self.marker_outer = self.canvas.create_oval(0, 0, 0, 0, fill='black', outline='')
+        self.marker_inner = self.canvas.create_oval(0, 0, 0, 0, fill='white', outline='')
+        DragArea(self.canvas, self._pick, on_release)
+
+    def pack(self, **kwargs):
+        self.canvas.pack(**kwargs)
+
+    def set_marker(self, hue, saturation):
+        """Move the marker to hue/saturation (two coords calls, no redraw)"""
+        angle = hue * 2 * np.pi
+        x = self.cx + saturation * np.cos(angle) * self.radius
+        y = self.cy - saturation * np.sin(angle) * self.radius
+        for item, size in ((self.marker_outer, 0.05), (self.marker_inner, 0.03)):
+            r = size * self.radius
+            self.canvas.coords(item, x - r, y - r, x + r, y + r)
+
+    def _pick(self, x, y, clamp):
+        return self._on_pick((x - self.cx) / self.radius, (self.cy - y) / self.radius, clamp)
+
+
+class ValueBarView:
+    """Brightness bar: gradient PhotoImage for the current hue plus a marker line
+
+    on_pick(value) is called with the unclamped value under the pointer.
+    """
+
+    def __init__(self, master, on_pick, on_release, width=60, height=400, margin=10):
+        self.width, self.height, self.margin = width, height, margin
+        self._on_pick = on_pick
+        self._gradient_key = None
+        self.canvas = tk.Canvas(master, width=width + 2 * margin,
+                                height=height + 2 * margin, highlightthickness=0)
+        self.image = PhotoLayer(self.canvas, margin, margin)
+        self.canvas.create_rectangle(margin, margin, margin + width, margin + height,
+                                     outline='black', width=2)
+        self.marker_white = self.canvas.create_line(0, 0, 0, 0, fill='white', width=2)
+        self.marker_dashed = self.canvas.create_line(0, 0, 0, 0, fill='black',
+                                                     width=1, dash=(4, 4))
+        DragArea(self.canvas, self._pick, on_release)
+
+    def pack(self, **kwargs):
+        self.canvas.pack(**kwargs)
+
+    def set_gradient(self, hue, saturation):
+        """Refill the gradient when hue/saturation changed"""
+        key = (hue, saturation)
+        if key == self._gradient_key:
+            return
+        self._gradient_key = key
+        column = value_bar_image(hue, saturation, self.height)[::-1]
+        self.image.set(np.broadcast_to(column, (self.height, self.width, 3)))
+
+    def set_marker(self, value):
+        y = self.margin + (1.0 - value) * self.height
+        for item in (self.marker_white, self.marker_dashed):
+            self.canvas.coords(item, self.margin, y, self.margin + self.width, y)
+
+    def _pick(self, x, y, clamp):
+        self._on_pick(1.0 - (y - self.margin) / self.height)
+        return True
+
+
+class PreviewView:
+    """Colormap preview strip with position ticks, resampled to the canvas width"""
+
+    TICKS = ((0.0, '0.0'), (0.25, '0.25'), (0.5, '0.5'), (0.75, '0.75'), (1.0, '1.0'))
+
+    def __init__(self, master, height=80, margin=12):
+        self.margin = margin
+        self.strip_height = height - 40
+        self.colormap = None
+        self.deficiency = None
+        self.canvas = tk.Canvas(master, height=height, highlightthickness=0)
+        self.image = PhotoLayer(self.canvas, margin, margin)
+        self.canvas.bind('<Configure>', lambda event: self.show(self.colormap, self.deficiency))
+
+    def pack(self, **kwargs):
+        self.canvas.pack(**kwargs)
+
+    def show(self, colormap, deficiency=None):
+        """Draw colormap (as seen with deficiency, if given), or a hint below 2 stops"""
+        self.colormap = colormap
+        self.deficiency = deficiency
+        canvas = self.canvas
+        if canvas.winfo_width() <= 1:
+            # Not laid out yet; the first <Configure> draws at the real width
+            return
+        canvas.delete('overlay')
+        width = max(1, canvas.winfo_width() - 2 * self.margin)
+        if colormap is None or not colormap.is_complete():
+            canvas.itemconfig(self.image.item, state='hidden')
+            canvas.create_text(canvas.winfo_width() / 2, canvas.winfo_height() / 2,
+                               text='Add at least 2 colors to preview', tags='overlay')
+            return
+
+        # One cached sample per pixel column, repeated down the strip
+        strip = colormap.sample(width)
+        if deficiency is not None:
+            strip = simulate(strip, deficiency)
+        self.image.set(np.broadcast_to(strip, (self.strip_height, width, 3)))
+        canvas.itemconfig(self.image.item, state='normal')
+
+        top, bottom = self.margin, self.margin + self.strip_height
+        canvas.create_rectangle(self.margin, top, self.margin + width, bottom,
+                                outline='black', tags='overlay')
+        for tick, label in self.TICKS:
+            x = self.margin + tick * width
+            canvas.create_line(x, bottom, x, bottom + 4, tags='overlay')
+            canvas.create_text(x, bottom + 6, text=label,
+                               anchor=tk.N, font=('TkDefaultFont', 8), tags='overlay')
+        canvas.create_text(self.margin + width / 2, bottom + 20, text='Position',
+                           anchor=tk.N, font=('TkDefaultFont', 9), tags='overlay')
+
+
+class AnalysisView:
+    """L* profile and CIEDE2000 step plot with reversals and uneven steps shaded"""
+
+    SAMPLES = 256
+
+    def __init__(self, master, height=110, margin=12):
+        self.margin = margin
+        self.colormap = None
+        self.summary = tk.StringVar(value='')
+        self.canvas = tk.Canvas(master, height=height, bg='white', highlightthickness=0)
+        self.label = tk.Label(master, textvariable=self.summary, anchor=tk.W, justify=tk.LEFT)
+        self.canvas.bind('<Configure>', lambda event: self.show(self.colormap))
+
+    def pack(self, **kwargs):
+        self.canvas.pack(**kwargs)
+        self.label.pack(fill=tk.X)
+
+    def show(self, colormap):
+        """Plot the analysis of colormap (nothing below 2 stops)"""
+        from colormap_analysis import analyze_colormap, flagged_regions
+
+        self.colormap = colormap
+        canvas = self.canvas
+        if canvas.winfo_width() <= 1:
+            return
+        canvas.delete('all')
+        if colormap is None or not colormap.is_complete():
+            self.summary.set('')
+            return
+
+        result = analyze_colormap(colormap, self.SAMPLES)
+        m = self.margin
+        width = canvas.winfo_width() - 2 * m
+        height = canvas.winfo_height() - 2 * m
+        steps = len(result.delta_e)
+
+        def step_x(i):
+            return m + i / steps * width
+
+        # Shade flagged steps first so the curves stay on top
+        for mask, color in ((result.uneven, '#ffe0b0'), (result.reversals, '#ffb0b0')):
+            for start, stop in flagged_regions(mask):
+                canvas.create_rectangle(step_x(start), m, step_x(stop), m + height,
+                                        fill=color, outline='')
+        canvas.create_rectangle(m, m, m + width, m + height, outline='gray')
+
+        x = m + np.linspace(0, width, len(result.lightness))
+        y = m + height * (1 - result.lightness / 100)
+        canvas.create_line(*np.column_stack([x, y]).ravel().tolist(), fill='black', width=2)
+
+        peak = max(result.delta_e.max(), 1e-9)
+        x = m + (np.arange(steps) + 0.5) / steps * width
+        y = m + height * (1 - result.delta_e / peak)
+        canvas.create_line(*np.column_stack([x, y]).ravel().tolist(), fill='#3060d0')
+
+        canvas.create_text(m + 4, m + 2, text='L*', anchor=tk.NW, font=('TkDefaultFont', 8))
+        canvas.create_text(m + width - 4, m + 2, text='ΔE00', anchor=tk.NE,
+                           fill='#3060d0', font=('TkDefaultFont', 8))
+        flags = []
+        if not result.monotonic:
+            flags.append('lightness reverses (red)')
+        if result.uneven.any():
+            flags.append('uneven steps (orange)')
+        self.summary.set(f"Unevenness {result.unevenness:.2f} (ΔE coefficient of variation)"
+                         f" — {', '.join(flags) if flags else 'monotonic, even'}")
+
+
+@lru_cache(maxsize=4)
+def sample_field(width, height):
+    """Smooth test data in [0, 1]: MATLAB-style peaks over a left-to-right ramp"""
+    x = np.linspace(-3.0, 3.0, width)
+    y = np.linspace(2.0, -2.0, height)[:, np.newaxis]
+    peaks = (3 * (1 - x) ** 2 * np.exp(-x ** 2 - (y + 1) ** 2)
+             - 10 * (x / 5 - x ** 3 - y ** 5) * np.exp(-x ** 2 - y ** 2)
+             - np.exp(-(x + 1) ** 2 - y ** 2) / 3)
+    field = 0.7 * peaks / np.ptp(peaks) + 0.3 * (x + 3) / 6
+    field = (field - field.min()) / np.ptp(field)
+    field.flags.writeable = False
+    return field
+
+
+class CVDSampleView:
+    """The colormap applied to sample data, for normal vision and each deficiency"""
+
+    COLUMNS = 3
+
+    def __init__(self, master, panel_width=320, panel_height=200, gap=8):
+        self.panel_width, self.panel_height = panel_width, panel_height
+        self.panels = [(None, 'Normal vision')] + list(DEFICIENCIES.items())
+        rows = -(-len(self.panels) // self.COLUMNS)
+        step_x, step_y = panel_width + gap, panel_height + gap + 18
+        self.canvas = tk.Canvas(master, width=self.COLUMNS * step_x + gap,
+                                height=rows * step_y + gap, highlightthickness=0)
+        self.layers = []
+        for i, (_, label) in enumerate(self.panels):
+            x = gap + (i % self.COLUMNS) * step_x
+            y = gap + (i // self.COLUMNS) * step_y
+            self.layers.append(PhotoLayer(self.canvas, x, y))
+            self.canvas.create_text(x + panel_width / 2, y + panel_height + 2, text=label,
+                                    anchor=tk.N, font=('TkDefaultFont', 9))
+
+    def pack(self, **kwargs):
+        self.canvas.pack(**kwargs)
+
+    def show(self, colormap):
+        """Colorize the sample data with colormap (blank below 2 stops)"""
+        state = 'normal' if colormap is not None and colormap.is_complete() else 'hidden'
+        for layer in self.layers:
+            self.canvas.itemconfig(layer.item, state=state)
+        if state == 'hidden':
+            return
+        field = sample_field(self.panel_width, self.panel_height)
+        image = colormap.compile(256).apply(field, alpha=False)
+        for layer, (deficiency, _) in zip(self.layers, self.panels):
+            layer.set(image if deficiency is None else simulate_image(image, deficiency))
+
+
+class DataView:
+    """A data pyramid colorized by a CompiledLUT, with wheel zoom and drag pan
+
+    Stop edits only re-apply the LUT to the screen-sized data on display.
+    After a zoom or pan the view shows a coarser level at once, then reads
+    the proper level tile by tile on a background thread; finished tiles
+    are merged on the Tk thread, center first. A tile that fails to load
+    keeps its coarse pixels and is passed to on_error(exception).
+    """
+
+    COARSE_LEVELS = 2
+    POLL_MS = 30
+
+    def __init__(self, master, pyramid, width=800, height=600, kind='mean', on_error=None):
+        from colormap_pyramid import Viewport
+
+        self.pyramid = pyramid
+        self.viewport = Viewport(pyramid, width, height)
+        self.kind = kind
+        self.on_error = on_error
+        self.lut = None
+        self.display = None
+        self.canvas = tk.Canvas(master, width=width, height=height, bg='gray',
+                                highlightthickness=0)
+        self.image = PhotoLayer(self.canvas, 0, 0)
+        self.executor = ThreadPoolExecutor(max_workers=2)
+        self._pending = []
+        self._after_id = None
+        self._drag = None
+        self.canvas.bind('<ButtonPress-1>', self._press)
+        self.canvas.bind('<B1-Motion>', self._motion)
+        self.canvas.bind('<MouseWheel>', lambda e: self._zoom(e, 1.25 if e.delta > 0 else 0.8))
+        self.canvas.bind('<Button-4>', lambda e: self._zoom(e, 1.25))
+        self.canvas.bind('<Button-5>', lambda e: self._zoom(e, 0.8))
+        self.refresh()
+
+    def pack(self, **kwargs):
+        self.canvas.pack(**kwargs)
+
+    def set_lut(self, lut):
+        """Colorize with another CompiledLUT (normalized over the data range)"""
+        self.lut = lut
+        self.recolor()
+
+    def set_kind(self, kind):
+        """Show the 'mean' or 'min' levels"""
+        self.kind = kind
+        self.refresh()
+
+    def recolor(self):
+        if self.lut is not None and self.display is not None:
+            self.image.set(self.lut.apply(self.display, alpha=False))
+
+    def refresh(self):
+        """Show the current viewport: coarse now, refined tiles as they arrive"""
+        self._cancel()
+        viewport = self.viewport
+        level = viewport.level
+        coarse = min(level + self.COARSE_LEVELS, len(self.pyramid.levels) - 1)
+        self.display = viewport.sample(coarse, self.kind)
+        self.recolor()
+        if coarse == level:
+            return
+        for rect in viewport.tiles():
+            left, top, right, bottom = rect
+            future = self.executor.submit(
+                self.pyramid.sample, level, self.kind, viewport.x0 + left * viewport.scale,
+                viewport.y0 + top * viewport.scale, viewport.scale, right - left, bottom - top)
+            self._pending.append((rect, future))
+        self._after_id = self.canvas.after(self.POLL_MS, self._poll)
+
+    def _poll(self):
+        """Merge finished tiles and recolor once"""
+        self._after_id = None
+        done = [(rect, future) for rect, future in self._pending if future.done()]
+        for rect, future in done:
+            left, top, right, bottom = rect
+            try:
+                self.display[top:bottom, left:right] = future.result()
+            except Exception as e:  # Keep the coarse pixels and the loop alive
+                if self.on_error is not None:
+                    self.on_error(e)
+        self._pending = [item for item in self._pending if not item[1].done()]
+        if done:
+            self.recolor()
+        if self._pending:
+            self._after_id = self.canvas.after(self.POLL_MS, self._poll)
+
+    def _cancel(self):
+        for _, future in self._pending:
+            future.cancel()
+        self._pending = []
+        if self._after_id is not None:
+            self.canvas.after_cancel(self._after_id)
+            self._after_id = None
+
+    def close(self):
+        """Drop queued tiles and stop the worker threads"""
+        self._cancel()
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+    def _press(self, event):
+        self._drag = (event.x, event.y)
+
+    def _motion(self, event):
+        if self._drag is None:
+            return
+        self.viewport.pan(event.x - self._drag[0], event.y - self._drag[1])
+        self._drag = (event.x, event.y)
+        self.refresh()
+
+    def _zoom(self, event, factor):
+        self.viewport.zoom(factor, event.x, event.y)
+        self.refresh()
+
+
+class LibraryView:
+    """Scrollable thumbnail grid over a colormap Library
+
+    Only the visible rows exist: their thumbnails are composed into one
+    PhotoImage (a single PPM decode per redraw) and their names use a pool
+    of canvas text items, so the grid costs the same for 20 maps or 2,000.
+    The view polls the library for entries read in the background and
+    calls on_select(entry) when one is clicked.
+    """
+
+    PAD = 8
+    THUMB_HEIGHT = 28
+    LABEL_HEIGHT = 18
+    POLL_MS = 100
+    BACKGROUND = 245
+    SELECTED = (0, 120, 215)
+
+    def __init__(self, master, library, on_select, width=760, height=480, on_update=None):
+        self.library = library
+        self.on_select = on_select
+        self.on_update = on_update
+        self.cell_width = library.width + 2 * self.PAD
+        self.cell_height = self.PAD + self.THUMB_HEIGHT + self.LABEL_HEIGHT
+        self.query, self.order = '', 'Name'
+        self.entries = library.find(self.query, self.order)
+        self.selected = None
+        self.top = 0
+        self.columns, self.rows = 1, 1
+        self._labels = []
+        self._after_id = None
+
+        self.frame = tk.Frame(master)
+        self.scrollbar = tk.Scrollbar(self.frame, command=self.yview)
+        self.scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.canvas = tk.Canvas(self.frame, width=width, height=height, highlightthickness=0,
+                                bg='#' + f"{self.BACKGROUND:02x}" * 3)
+        self.canvas.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        self.image = PhotoLayer(self.canvas, 0, 0)
+        self.canvas.bind('<Configure>', self._on_configure)
+        self.canvas.bind('<Button-1>', self._on_click)
+        self.canvas.bind('<MouseWheel>', lambda e: self.scroll(-1 if e.delta > 0 else 1))
+        self.canvas.bind('<Button-4>', lambda e: self.scroll(-1))
+        self.canvas.bind('<Button-5>', lambda e: self.scroll(1))
+        self._after_id = self.canvas.after(self.POLL_MS, self._poll)
+
+    def pack(self, **kwargs):
+        self.frame.pack(**kwargs)
+
+    def set_filter(self, query='', order='Name'):
+        """Show the entries matching query in a colormap_library.SORT_ORDERS order"""
+        self.query, self.order = query, order
+        self.entries = self.library.find(query, order)
+        self.top = 0
+        self.redraw()
+
+    def yview(self, *args):
+        """Scrollbar command ('moveto' fraction / 'scroll' n units|pages)"""
+        if args[0] == 'moveto':
+            self._scroll_to(int(round(float(args[1]) * self._total_rows())))
+        elif args[0] == 'scroll':
+            step = int(args[1])
+            if args[2] == 'pages':
+                step *= max(1, self.rows - 1)
+            self.scroll(step)
+
+    def scroll(self, rows):
+        self._scroll_to(self.top + rows)
+
+    def _total_rows(self):
+        return -(-len(self.entries) // self.columns)
+
+    def _scroll_to(self, top):
+        full_rows = max(1, self.canvas.winfo_height() // self.cell_height)
+        top = max(0, min(top, self._total_rows() - full_rows))
+        if top != self.top:
+            self.top = top
+            self.redraw()
+
+    def redraw(self):
+        """Compose the visible thumbnails and relabel the pooled names"""
+        width, height = self.columns * self.cell_width, self.rows * self.cell_height
+        image = np.full((height, width, 3), self.BACKGROUND, dtype=np.uint8)
+        first = self.top * self.columns
+        visible = self.entries[first:first + self.rows * self.columns]
+        for slot, label in enumerate(self._labels):
+            if slot >= len(visible):
+                self.canvas.itemconfig(label, state='hidden')
+                continue
+            entry = visible[slot]
+            x = (slot % self.columns) * self.cell_width + self.PAD
+            y = (slot // self.columns) * self.cell_height + self.PAD
+            thumb = image[y:y + self.THUMB_HEIGHT, x:x + self.library.width]
+            strip = self.library.strip(entry)
+            thumb[...] = 200 if strip is None else strip
+            if entry.path == self.selected:
+                frame = image[y - 3:y + self.THUMB_HEIGHT + 3, x - 3:x + self.library.width + 3]
+                frame[:3] = frame[-3:] = frame[:, :3] = frame[:, -3:] = self.SELECTED
+            name = entry.name if len(entry.name) <= 20 else entry.name[:19] + '…'
+            self.canvas.itemconfig(label, text=name, state='normal')
+        self.image.set(image)
+        total = self._total_rows()
+        if total == 0:
+            self.scrollbar.set(0.0, 1.0)
+        else:
+            self.scrollbar.set(self.top / total, min(1.0, (self.top + self.rows) / total))
+        # Missing thumbnails are re-read in the background
+        if not self.library.done and self._after_id is None:
+            self._after_id = self.canvas.after(self.POLL_MS, self._poll)
+
+    def _poll(self):
+        """Pick up entries the library read in the background"""
+        self._after_id = None
+        if self.library.poll():
+            self.entries = self.library.find(self.query, self.order)
+            self.redraw()
+            if self.on_update is not None:
+                self.on_update()
+        if not self.library.done:
+            self._after_id = self.canvas.after(self.POLL_MS, self._poll)
+
+    def rescan(self):
+        """Look for added, changed and removed files"""
+        self.library.scan()
+        self.entries = self.library.find(self.query, self.order)
+        self.redraw()
+
+    def close(self):
+        if self._after_id is not None:
+            self.canvas.after_cancel(self._after_id)
+            self._after_id = None
+        self.library.close()
+
+    def _on_configure(self, event):
+        """Fit the grid to the canvas and resize the label pool"""
+        self.columns = max(1, event.width // self.cell_width)
+        self.rows = max(1, -(-event.height // self.cell_height))
+        cells = self.columns * self.rows
+        while len(self._labels) < cells:
+            self._labels.append(self.canvas.create_text(0, 0, anchor=tk.N,
+                                                        font=('TkDefaultFont', 9)))
+        while len(self._labels) > cells:
+            self.canvas.delete(self._labels.pop())
+        for slot, label in enumerate(self._labels):
+            x = (slot % self.columns) * self.cell_width + self.cell_width / 2
+            y = (slot // self.columns) * self.cell_height + self.PAD + self.THUMB_HEIGHT + 2
+            self.canvas.coords(label, x, y)
+        self.top = max(0, min(self.top, self._total_rows() - 1))
+        self.redraw()
+
+    def _on_click(self, event):
+        column = event.x // self.cell_width
+        if column >= self.columns:
+            return
+        idx = (self.top + event.y // self.cell_height) * self.columns + column
+        if idx < len(self.entries):
+            self.selected = self.entries[idx].path
+            self.redraw()
+            self.on_select(self.entries[idx])